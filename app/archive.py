@@ -0,0 +1,113 @@
+# app/archive.py
+import asyncio
+import logging
+import os
+
+import aiosqlite
+
+from app.db import _write
+from app.db_ranks import list_sections
+
+logger = logging.getLogger(__name__)
+
+# Проданные лоты уезжают из горячих accounts в accounts_archive того же файла БД:
+# листинги, COUNT и индексы accounts остаются размером с живой остаток.
+# Скрытие обратимо (админ может вернуть лот в продажу) — скрытые лоты остаются в accounts.
+ARCHIVE_STATUSES = ("sold",)
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_INTERVAL_S = float(os.getenv("ARCHIVE_INTERVAL_S", "3600"))
+
+
+def _schemas() -> list[str]:
+    """Схемы на соединении писателя основной БД: main + ATTACH-алиасы отдельных БД разделов."""
+    return ["main"] + [s.attach_schema for s in list_sections() if not s.in_main_db]
+
+
+def _status_sql(statuses: tuple[str, ...]) -> str:
+    return ", ".join("'" + s.replace("'", "''") + "'" for s in statuses)
+
+
+async def _move_batch(schema: str, src: str, dst: str, statuses: tuple[str, ...], limit: int) -> int:
+    """
+    Одна пачка: до limit самых старых лотов схемы со статусом из statuses — из src в dst
+    (accounts → accounts_archive или обратно). Намерение писателя: INSERT и DELETE в одной
+    транзакции, лот не теряется и не двоится.
+    """
+    status_sql = _status_sql(statuses)
+
+    async def tx(db: aiosqlite.Connection) -> int:
+        # граница пачки по id: оба оператора ниже отбирают ровно те же строки
+        async with db.execute(
+            f"SELECT MAX(id) FROM (SELECT id FROM {schema}.{src} WHERE status IN ({status_sql}) "
+            f"ORDER BY id LIMIT ?)",
+            (limit,)
+        ) as cur:
+            row = await cur.fetchone()
+        hi = row[0] if row else None
+        if hi is None:
+            return 0
+        # у accounts разделов нет updated_at, у accounts нет archived_at — переносим только общие колонки
+        async with db.execute(f"PRAGMA {schema}.table_info({src})") as cur:
+            src_cols = {r[1] for r in await cur.fetchall()}
+        async with db.execute(f"PRAGMA {schema}.table_info({dst})") as cur:
+            cols = ", ".join(r[1] for r in await cur.fetchall() if r[1] in src_cols)
+        where = f"status IN ({status_sql}) AND id <= ?"
+        # в архив — с заменой (повторный перенос того же id); обратно — без: конфликт id откатит пачку
+        insert = "INSERT OR REPLACE" if dst == "accounts_archive" else "INSERT"
+        await db.execute(
+            f"{insert} INTO {schema}.{dst}({cols}) SELECT {cols} FROM {schema}.{src} WHERE {where}",
+            (hi,)
+        )
+        cur = await db.execute(f"DELETE FROM {schema}.{src} WHERE {where}", (hi,))
+        return cur.rowcount
+
+    return await _write(tx)
+
+
+async def _move_all(src: str, dst: str, statuses: tuple[str, ...], batch: int) -> dict[str, int]:
+    moved: dict[str, int] = {}
+    for schema in _schemas():
+        total = 0
+        while True:
+            n = await _move_batch(schema, src, dst, statuses, batch)
+            total += n
+            if n < batch:
+                break
+            await asyncio.sleep(0)
+        moved[schema] = total
+    return moved
+
+
+async def archive_lots(batch: int = ARCHIVE_BATCH) -> dict[str, int]:
+    """
+    Перенести все проданные лоты в архив пачками по batch строк.
+    Каждая пачка — отдельное намерение писателя, между ними проходят записи хендлеров.
+    Возвращает {схема: перенесено строк}.
+    """
+    moved = await _move_all("accounts", "accounts_archive", ARCHIVE_STATUSES, batch)
+    if any(moved.values()):
+        logger.info("archived lots: %s", moved)
+    return moved
+
+
+async def restore_lots(statuses: tuple[str, ...] = ("hidden",), batch: int = ARCHIVE_BATCH) -> dict[str, int]:
+    """
+    Вернуть из архива в accounts лоты со статусом из statuses (по умолчанию — скрытые, которые
+    архивировались до того, как скрытие перестало уезжать в архив). Статус и id сохраняются;
+    поисковый индекс заполняют триггеры accounts, creds_index за лотом не снимался.
+    Возвращает {схема: возвращено строк}.
+    """
+    moved = await _move_all("accounts_archive", "accounts", statuses, batch)
+    if any(moved.values()):
+        logger.info("restored lots from archive: %s", moved)
+    return moved
+
+
+async def run_archiver(interval_s: float = ARCHIVE_INTERVAL_S) -> None:
+    """Фоновая задача: раз в interval_s секунд разгрузить горячие accounts в архив."""
+    while True:
+        try:
+            await archive_lots()
+        except Exception:
+            logger.exception("archiver failed")
+        await asyncio.sleep(interval_s)
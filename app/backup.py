@@ -0,0 +1,169 @@
+# app/backup.py
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+# Снимки: BACKUP_DIR/<YYYYmmdd-HHMMSS-микросекунды>/<имя файла БД>, храним BACKUP_KEEP последних полных снимков
+BACKUP_DIR = os.getenv("BACKUP_DIR", os.path.join(ROOT_DIR, "backups"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_S = float(os.getenv("BACKUP_INTERVAL_S", str(6 * 3600)))  # 0 — фоновая задача выключена
+# online backup API: копируем по PAGES страниц и отпускаем источник на SLEEP_S между шагами
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP_S = float(os.getenv("BACKUP_STEP_SLEEP_S", "0.005"))
+# запись в источник между шагами перезапускает копирование с начала; после стольких
+# перезапусков копируем одним шагом (один read-снимок; в WAL писателей он не блокирует)
+BACKUP_MAX_RESTARTS = 3
+
+
+class _Restarted(Exception):
+    pass
+
+
+def backup_file(path: str, dest: str) -> dict:
+    """
+    Снимок одной БД через sqlite3 backup API (синхронно: зовётся в потоке).
+    Снимок пишется во временный файл, проверяется integrity_check и только потом
+    переименовывается в dest — битый снимок не подменяет хороший.
+    """
+    started = time.perf_counter()
+    tmp = dest + ".part"
+    restarts = 0
+    last_remaining = None
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+
+    # mode=ro: бэкап никогда не пишет в рабочую БД
+    src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for pages in (BACKUP_PAGES_PER_STEP, -1):
+            dst = sqlite3.connect(tmp)
+            try:
+                try:
+                    src.backup(dst, pages=pages, progress=progress if pages > 0 else None,
+                               sleep=BACKUP_STEP_SLEEP_S)
+                except _Restarted:
+                    continue
+                # снимок — один самодостаточный файл, без -wal рядом
+                dst.execute("PRAGMA journal_mode = DELETE").fetchall()
+                check = [r[0] for r in dst.execute("PRAGMA integrity_check").fetchall()]
+                pages_total = dst.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                dst.close()
+            break
+    finally:
+        src.close()
+
+    result = {
+        "db": path,
+        "file": dest,
+        "pages": pages_total,
+        "restarts": restarts,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    if check != ["ok"]:
+        os.remove(tmp)
+        logger.error("backup of %s failed integrity_check: %s", path, check[:5])
+        return {**result, "status": "corrupt", "errors": check[:20]}
+    os.replace(tmp, dest)
+    return {**result, "status": "ok"}
+
+
+FAILED_SUFFIX = ".failed"
+
+
+def _snapshot_dir(backup_dir: str) -> str:
+    """
+    Создать каталог нового снимка: <YYYYmmdd-HHMMSS-микросекунды>.part — имя уникально и для
+    запусков в одну секунду, при совпадении (часы, параллельный запуск) берём следующий номер.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    for n in range(100):
+        name = stamp if not n else f"{stamp}-{n}"
+        path = os.path.join(backup_dir, name)
+        if os.path.exists(path) or os.path.exists(path + FAILED_SUFFIX):
+            continue
+        try:
+            os.makedirs(path + ".part")
+        except FileExistsError:
+            continue
+        return path
+    raise RuntimeError(f"Не удалось выбрать имя снимка в {backup_dir}")
+
+
+def _rotate(backup_dir: str, keep: int) -> list[str]:
+    """
+    Удалить самые старые снимки сверх keep. Считаются только полные снимки (каталог без
+    суффикса — все файлы прошли integrity_check); имена — время, сортируются строкой.
+    Неудачные (*.failed) старше самого старого оставленного снимка удаляются вместе с ними.
+    """
+    names = [d for d in os.listdir(backup_dir) if os.path.isdir(os.path.join(backup_dir, d))]
+    snapshots = sorted(d for d in names if "." not in d)
+    if keep <= 0 or len(snapshots) <= keep:
+        return []
+    removed = snapshots[:-keep]
+    oldest_kept = snapshots[-keep]
+    removed += sorted(d for d in names if d.endswith(FAILED_SUFFIX) and d < oldest_kept)
+    for name in removed:
+        shutil.rmtree(os.path.join(backup_dir, name), ignore_errors=True)
+    return removed
+
+
+async def backup_all(paths: Iterable[str], backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP) -> dict:
+    """
+    Снимок всех БД в новый каталог backup_dir/<время>. Каждая БД копируется в отдельном
+    потоке — event loop не ждёт копирования. Снимок собирается в <время>.part и получает
+    итоговое имя, только если все файлы прошли integrity_check; иначе остаётся как
+    <время>.failed и в keep не считается (неудачные запуски не вытесняют хорошие снимки).
+    Возвращает {"status": "ok"|"error", "dir", "files": [...], "removed": [...]}.
+    """
+    snapshot_dir = await asyncio.to_thread(_snapshot_dir, backup_dir)
+    work_dir = snapshot_dir + ".part"
+    files: list[dict] = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        dest = os.path.join(work_dir, os.path.basename(path))
+        try:
+            files.append(await asyncio.to_thread(backup_file, path, dest))
+        except Exception as e:
+            logger.exception("backup of %s failed", path)
+            files.append({"db": path, "status": "error", "error": str(e)})
+
+    ok = all(f["status"] == "ok" for f in files)
+    if not ok:
+        snapshot_dir += FAILED_SUFFIX
+    os.replace(work_dir, snapshot_dir)
+    for f in files:
+        if "file" in f:
+            f["file"] = os.path.join(snapshot_dir, os.path.basename(f["file"]))
+    removed = await asyncio.to_thread(_rotate, backup_dir, keep) if ok else []
+    logger.info("backup %s: %s", snapshot_dir, "ok" if ok else "errors")
+    return {"status": "ok" if ok else "error", "dir": snapshot_dir, "files": files, "removed": removed}
+
+
+async def run_backups(paths: Callable[[], Iterable[str]], interval_s: float = BACKUP_INTERVAL_S) -> None:
+    """Фоновая задача: снимок всех БД раз в interval_s секунд (первый — через interval_s после старта)."""
+    if interval_s <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await backup_all(paths())
+        except Exception:
+            logger.exception("backup run failed")
@@ -0,0 +1,211 @@
+# app/callbacks.py
+import logging
+from collections import namedtuple
+from typing import Any, Callable, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# callback_data: "<версия><префикс>:<поле>:<поле>..." — int упакованы в base36, пустое поле — None.
+# Версия в ключе маршрута: кнопки старых сообщений с прежней схемой не разберутся по новой.
+VERSION = "1"
+SEP = ":"
+MAX_CALLBACK_BYTES = 64  # лимит Telegram
+STALE_TEXT = "Кнопка устарела — откройте раздел заново."
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class CallbackCodecError(ValueError):
+    """callback_data не соответствует схеме (или не влезает в 64 байта)."""
+
+
+def _pack_int(value: int) -> str:
+    if value < 0:
+        return "-" + _pack_int(-value)
+    out = ""
+    while True:
+        value, r = divmod(value, 36)
+        out = _DIGITS[r] + out
+        if not value:
+            return out
+
+
+class CallbackSchema:
+    """
+    Типизированная схема callback_data: префикс + упорядоченные поля int/str.
+    pack(...) → строка для кнопки, unpack(data) → namedtuple с полями схемы.
+    Префиксы уникальны (проверяется при объявлении); str-поля не могут содержать «:».
+    """
+
+    _by_key: dict[str, "CallbackSchema"] = {}
+
+    def __init__(self, prefix: str, **fields: type):
+        key = VERSION + prefix
+        if SEP in prefix or key in self._by_key:
+            raise ValueError(f"bad or duplicate callback prefix: {prefix!r}")
+        for name, kind in fields.items():
+            if kind not in (int, str):
+                raise TypeError(f"{prefix}.{name}: only int/str fields are supported")
+        self.key = key
+        self.fields = fields
+        self.args = namedtuple(f"Cb_{prefix}", fields)
+        self._by_key[key] = self
+
+    def pack(self, *args: Any, **kwargs: Any) -> str:
+        values = self.args(*args, **kwargs)
+        parts = [self.key]
+        for (name, kind), value in zip(self.fields.items(), values):
+            if value is None:
+                parts.append("")
+            elif kind is int:
+                parts.append(_pack_int(int(value)))
+            else:
+                value = str(value)
+                if SEP in value:
+                    raise CallbackCodecError(f"{self.key}.{name}: {SEP!r} in value {value!r}")
+                parts.append(value)
+        data = SEP.join(parts)
+        if len(data.encode("utf-8")) > MAX_CALLBACK_BYTES:
+            raise CallbackCodecError(f"callback_data longer than {MAX_CALLBACK_BYTES} bytes: {data!r}")
+        return data
+
+    def unpack(self, data: str) -> tuple:
+        parts = data.split(SEP)
+        if parts[0] != self.key or len(parts) != len(self.fields) + 1:
+            raise CallbackCodecError(f"{data!r} does not match {self.key}")
+        values = []
+        for kind, raw in zip(self.fields.values(), parts[1:]):
+            if raw == "":
+                values.append(None if kind is int else "")
+            elif kind is int:
+                try:
+                    values.append(int(raw, 36))
+                except ValueError:
+                    raise CallbackCodecError(f"{data!r}: bad int {raw!r}") from None
+            else:
+                values.append(raw)
+        return self.args(*values)
+
+
+class CallbackTable:
+    """
+    Маршрутизация колбэков по префиксу за один dict-lookup вместо цепочки F.data.startswith
+    по всем роутерам. Роутер таблицы подключается первым; чужие строковые callback_data
+    он пропускает дальше (один lookup), битые — логирует и пропускает.
+
+    Через таблицу идёт только магазин (схемы WT_* и ACC_* ниже): это основная масса нажатий
+    и самые длинные цепочки фильтров. Колбэки админки и сервисов — chg:, hist:, pay:, deposit:,
+    admin: — остаются строковыми F.data.startswith в своих роутерах (после промаха таблицы).
+
+    Кнопки старого формата ("wt:...", "acc:...") в уже отправленных сообщениях переводит
+    в данные схемы переводчик пространства (legacy(prefix)) — дальше тот же маршрут с теми же
+    флагами. Непереводимые отвечают «кнопка устарела».
+
+    Хендлер маршрута получает разобранные поля как callback_data (namedtuple схемы) и обычные
+    зависимости aiogram (state, bot, ...). data["handler"] — HandlerObject маршрута:
+    флаги маршрута (route(..., flags={...})) видят middlewares через aiogram.dispatcher.flags.get_flag.
+    """
+
+    def __init__(self, name: str = "callbacks"):
+        self.router = Router(name=name)
+        self._routes: dict[str, tuple[CallbackSchema, HandlerObject]] = {}
+        self._legacy: dict[str, Callable[[list[str]], str]] = {}
+        self._stale = HandlerObject(callback=self._answer_stale)
+        self.router.callback_query.register(self._dispatch, self._match)
+
+    def route(self, schema: CallbackSchema, *, flags: Optional[dict[str, Any]] = None) -> Callable:
+        def decorator(callback: Callable) -> Callable:
+            if schema.key in self._routes:
+                raise ValueError(f"callback route {schema.key} already registered")
+            self._routes[schema.key] = (schema, HandlerObject(callback=callback, flags=dict(flags or {})))
+            return callback
+        return decorator
+
+    def legacy(self, prefix: str) -> Callable:
+        """
+        Переводчик старых строковых callback_data "<prefix>:<поля>" (поля — списком) в данные схемы
+        (schema.pack(...)). IndexError/ValueError — кнопку уже не разобрать.
+        """
+        def decorator(translate: Callable[[list[str]], str]) -> Callable[[list[str]], str]:
+            if prefix in self._legacy:
+                raise ValueError(f"legacy callback prefix {prefix!r} already registered")
+            self._legacy[prefix] = translate
+            return translate
+        return decorator
+
+    async def _match(self, callback: CallbackQuery) -> bool | dict[str, Any]:
+        data = callback.data
+        if not data:
+            return False
+        head, _, tail = data.partition(SEP)
+        route = self._routes.get(head)
+        if route is None:
+            translate = self._legacy.get(head)
+            if translate is None:
+                return False
+            try:
+                data = translate(tail.split(SEP))
+            except (IndexError, ValueError):
+                logger.info("stale callback %r", callback.data)
+                return {"handler": self._stale}
+            route = self._routes.get(data.partition(SEP)[0])
+            if route is None:
+                return {"handler": self._stale}
+        schema, handler = route
+        try:
+            args = schema.unpack(data)
+        except CallbackCodecError as e:
+            logger.warning("callback %s", e)
+            return False
+        # фильтры отрабатывают до middlewares: подменяем handler на маршрут
+        return {"callback_data": args, "handler": handler}
+
+    async def _dispatch(self, callback: CallbackQuery, **data: Any) -> Any:
+        return await data["handler"].call(callback, **data)
+
+    @staticmethod
+    async def _answer_stale(callback: CallbackQuery) -> None:
+        await callback.answer(STALE_TEXT, show_alert=True)
+
+
+# общая таблица бота: хендлеры регистрируют маршруты, main.py подключает table.router первым
+table = CallbackTable()
+route = table.route
+legacy = table.legacy
+
+
+# ---------------------------------------------------------------------
+# СХЕМЫ МАГАЗИНА
+# ---------------------------------------------------------------------
+# курсор keyset-страницы (app.db.SORTS): cdir "n"/"p" ("" — первая страница), cprice, cid граничного лота
+WT_RANKS = CallbackSchema("wk")                                          # назад к разделам
+WT_NOP = CallbackSchema("wn")                                            # счётчик страниц
+WT_PAGE = CallbackSchema("wp", rank=str, page=int, sort=str, cdir=str, cprice=int, cid=int)
+WT_ALL = CallbackSchema("wa", page=int)                                  # все лоты всех разделов
+WT_SEARCH = CallbackSchema("ws")                                         # ввод запроса
+WT_RESULTS = CallbackSchema("wr", page=int)                              # страница результатов поиска
+# src: откуда открыта карточка — "r" список раздела (с курсором), "a" все лоты, "s" поиск, "" — без списка
+WT_ITEM = CallbackSchema("wi", rank=str, id=int, src=str, page=int, sort=str, cdir=str, cprice=int, cid=int)
+WT_BUY = CallbackSchema("wb", rank=str, id=int)
+
+ACC_NOP = CallbackSchema("an")
+ACC_PAGE = CallbackSchema("ap", page=int, sort=str, cdir=str, cprice=int, cid=int)
+ACC_PICK = CallbackSchema("ai", id=int, page=int, sort=str, cdir=str, cprice=int, cid=int)
+ACC_BUY = CallbackSchema("ab", id=int)
+
+
+def cursor_of(args: tuple) -> Optional[tuple[str, int, int]]:
+    """Курсор app.db.list_* из полей cdir/cprice/cid схемы (None — первая страница)."""
+    if args.cdir not in ("n", "p") or args.cprice is None or args.cid is None:
+        return None
+    return args.cdir, args.cprice, args.cid
+
+
+def cursor_fields(cursor: Optional[tuple[str, int, int]]) -> dict:
+    """Поля cdir/cprice/cid для pack() из курсора app.db (None — первая страница)."""
+    if cursor is None:
+        return {"cdir": "", "cprice": None, "cid": None}
+    return {"cdir": cursor[0], "cprice": cursor[1], "cid": cursor[2]}
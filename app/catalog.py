@@ -0,0 +1,252 @@
+# app/catalog.py
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Optional
+
+import aiosqlite
+
+from app.db_pool import ConnectionPool, get_pool
+from app.db_profile import apply_profile
+from app.db_ranks import MAIN_DB, list_sections
+
+logger = logging.getLogger(__name__)
+
+CATALOG_POOL_SIZE = 2
+# результаты поиска в памяти: ключ — (запрос, страница), актуальность — по версии каталога
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class CatalogPool(ConnectionPool):
+    """
+    Read-пул каталога: основная БД + ATTACH всех БД разделов на одном соединении
+    и TEMP VIEW поверх них. Сквозные выборки (все лоты, итоги на /start, статистика)
+    идут одним запросом вместо N соединений и слияния в Python.
+    """
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await super()._connect()
+
+        arms: list[str] = []
+        for section in list_sections():
+            schema = section.attach_schema
+            if not section.in_main_db:
+                await conn.execute(f"ATTACH DATABASE ? AS {schema}", (section.db_path,))
+                await apply_profile(conn, schema)
+            where = f" WHERE category = {_quote(section.category)}" if section.category else ""
+            arms.append(
+                f"SELECT {_quote(section.key)} AS rank, id, category, button_title, caption, photo_file_id, "
+                f"price_rub, status, created_at FROM {schema}.accounts{where}"
+            )
+
+        # все лоты всех разделов + только доступные
+        await conn.execute("CREATE TEMP VIEW lots AS " + " UNION ALL ".join(arms))
+        await conn.execute("CREATE TEMP VIEW available_lots AS SELECT * FROM lots WHERE status = 'available'")
+        await conn.execute("PRAGMA query_only = ON")  # дальше каталог только читает
+        return conn
+
+
+def _pool() -> ConnectionPool:
+    return get_pool("catalog", MAIN_DB, size=CATALOG_POOL_SIZE, pool_cls=CatalogPool)
+
+
+def _version_pool() -> ConnectionPool:
+    # PRAGMA data_version сравним только на одном и том же соединении — отдельный пул из одного
+    return get_pool("catalog_version", MAIN_DB, size=1, pool_cls=CatalogPool)
+
+
+# ---------------------------------------------------------------------
+# АГРЕГАТЫ
+# ---------------------------------------------------------------------
+async def inventory_by_rank() -> dict[str, dict]:
+    """
+    Остатки по разделам одним запросом: {rank: {"cnt", "min_price", "total_rub"}}.
+    Разделы без доступных лотов в словарь не попадают.
+    """
+    async with _pool().acquire() as db:
+        async with db.execute(
+            """
+            SELECT rank, COUNT(*) AS cnt, MIN(price_rub) AS min_price, SUM(price_rub) AS total_rub
+            FROM available_lots
+            GROUP BY rank
+            """
+        ) as cur:
+            rows = await cur.fetchall()
+            return {r["rank"]: dict(r) for r in rows}
+
+
+async def count_all_available() -> int:
+    """Всего доступных лотов во всех разделах."""
+    async with _pool().acquire() as db:
+        async with db.execute("SELECT COUNT(*) FROM available_lots") as cur:
+            row = await cur.fetchone()
+            return int(row[0]) if row else 0
+
+
+# ---------------------------------------------------------------------
+# СПИСКИ
+# ---------------------------------------------------------------------
+async def list_all_available(limit: int = 10, offset: int = 0) -> list[dict]:
+    """Новые лоты всех разделов одной выборкой (rank, id, button_title, price_rub)."""
+    async with _pool().acquire() as db:
+        async with db.execute(
+            """
+            SELECT rank, id, button_title, price_rub
+            FROM available_lots
+            ORDER BY created_at DESC, id DESC
+            LIMIT ? OFFSET ?
+            """,
+            (limit, offset)
+        ) as cur:
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
+
+
+
+# ---------------------------------------------------------------------
+# ПОИСК
+# ---------------------------------------------------------------------
+_WORD_RE = re.compile(r"\w+")
+_RANGE_RE = re.compile(r"(\d+)\s*(?:₽|р|руб)?\.?\s*[-–—]\s*(\d+)\s*(?:₽|р|руб)?\.?", re.IGNORECASE)
+_FROM_RE = re.compile(r"\bот\s*(\d+)\s*(?:₽|р\b|руб\b)?\.?", re.IGNORECASE)
+_TO_RE = re.compile(r"\bдо\s*(\d+)\s*(?:₽|р\b|руб\b)?\.?", re.IGNORECASE)
+
+
+def parse_search(raw: str) -> tuple[str, Optional[int], Optional[int]]:
+    """
+    Строка поиска пользователя: «ис-7 100-300», «тигр до 500», «от 200» → (слова, min_price, max_price).
+    Диапазон — только отдельное «число-число»; «ис-7», «т-34-85» остаются словами.
+    """
+    text = raw or ""
+    min_price = max_price = None
+    # диапазон — отдельное слово: в «т-34-85» цифры принадлежат названию
+    m = next((m for m in _RANGE_RE.finditer(text) if m.start() == 0 or text[m.start() - 1].isspace()), None)
+    if m:
+        min_price, max_price = sorted((int(m.group(1)), int(m.group(2))))
+        text = text[:m.start()] + " " + text[m.end():]
+    else:
+        if m := _FROM_RE.search(text):
+            min_price = int(m.group(1))
+            text = text[:m.start()] + " " + text[m.end():]
+        if m := _TO_RE.search(text):
+            max_price = int(m.group(1))
+            text = text[:m.start()] + " " + text[m.end():]
+        if min_price is not None and max_price is not None and min_price > max_price:
+            min_price, max_price = max_price, min_price
+    return " ".join(text.split()), min_price, max_price
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Текст пользователя → запрос FTS5: каждое слово — префикс в кавычках, слова через AND.
+    Кавычки гасят синтаксис FTS5 (AND/OR/NEAR, «-», «:»), так что запрос всегда валиден.
+    Нет ни одного слова — None (поиск только по цене).
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+def _search_sql(text: bool, min_price: bool, max_price: bool) -> str:
+    """
+    Один запрос по всем разделам: в каждой ветке UNION ALL фильтр по цене идёт по индексу
+    (status, price_rub), текст — rowid из accounts_fts той же схемы. COUNT(*) OVER () отдаёт
+    общее число совпадений вместе со страницей — отдельный COUNT не нужен.
+    """
+    arms: list[str] = []
+    for section in list_sections():
+        schema = section.attach_schema
+        where = ["a.status = 'available'"]
+        if section.category:
+            where.append(f"a.category = {_quote(section.category)}")
+        if min_price:
+            where.append("a.price_rub >= :min_price")
+        if max_price:
+            where.append("a.price_rub <= :max_price")
+        if text:
+            where.append(f"a.id IN (SELECT rowid FROM {schema}.accounts_fts WHERE accounts_fts MATCH :q)")
+        arms.append(
+            f"SELECT {_quote(section.key)} AS rank, a.id, a.button_title, a.price_rub, a.photo_file_id "
+            f"FROM {schema}.accounts AS a WHERE " + " AND ".join(where)
+        )
+    return (
+        "SELECT rank, id, button_title, price_rub, photo_file_id, COUNT(*) OVER () AS total "
+        "FROM (" + " UNION ALL ".join(arms) + ") "
+        "ORDER BY price_rub, rank, id LIMIT :limit OFFSET :offset"
+    )
+
+
+async def search_available(
+    text: Optional[str] = None,
+    *,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    limit: int = 10,
+    offset: int = 0,
+) -> dict:
+    """
+    Доступные лоты всех разделов по словам из button_title/caption и/или диапазону цены,
+    от дешёвых к дорогим. Страница и общее число — одним запросом к каталогу.
+    Возвращает {"total": int, "items": [{"rank", "id", "button_title", "price_rub", "photo_file_id"}, ...]}.
+    """
+    q = fts_query(text) if text else None
+    sql = _search_sql(q is not None, min_price is not None, max_price is not None)
+    params = {"q": q, "min_price": min_price, "max_price": max_price, "limit": limit, "offset": offset}
+    async with _pool().acquire() as db:
+        async with db.execute(sql, params) as cur:
+            rows = await cur.fetchall()
+    if not rows:
+        return {"total": 0, "items": []}
+    return {
+        "total": int(rows[0]["total"]),
+        "items": [{k: r[k] for k in ("rank", "id", "button_title", "price_rub", "photo_file_id")} for r in rows],
+    }
+
+
+async def catalog_version() -> tuple[int, ...]:
+    """
+    Версия каталога: PRAGMA data_version основной БД и каждой БД раздела на одном соединении.
+    Меняется после любого коммита другого соединения (писатель бота, tools/*) — таблицы не читаются.
+    """
+    schemas = ["main"] + [s.attach_schema for s in list_sections() if not s.in_main_db]
+    version: list[int] = []
+    async with _version_pool().acquire() as db:
+        for schema in schemas:
+            async with db.execute(f"PRAGMA {schema}.data_version") as cur:
+                version.append((await cur.fetchone())[0])
+    return tuple(version)
+
+
+_search_cache: "OrderedDict[tuple, tuple[tuple[int, ...], dict]]" = OrderedDict()
+
+
+async def search_cached(
+    text: Optional[str] = None,
+    *,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    limit: int = 10,
+    offset: int = 0,
+) -> dict:
+    """
+    search_available с LRU-кэшем на SEARCH_CACHE_SIZE запросов. Ключ — нормализованный запрос
+    (слова FTS, цены, страница); запись годна, пока не сменилась catalog_version().
+    Повторный запрос при неизменном складе — только проверка версии, без выборки.
+    """
+    key = (fts_query(text) if text else None, min_price, max_price, limit, offset)
+    version = await catalog_version()
+    hit = _search_cache.get(key)
+    if hit is not None and hit[0] == version:
+        _search_cache.move_to_end(key)
+        return hit[1]
+
+    found = await search_available(text, min_price=min_price, max_price=max_price, limit=limit, offset=offset)
+    _search_cache[key] = (version, found)
+    _search_cache.move_to_end(key)
+    while len(_search_cache) > SEARCH_CACHE_SIZE:
+        _search_cache.popitem(last=False)
+    return found
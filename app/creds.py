@@ -0,0 +1,28 @@
+# app/creds.py
+import hashlib
+from typing import Optional
+
+
+def normalize_creds(creds: str) -> str:
+    """
+    Канонический вид login:password для поиска дублей: пробелы по краям убраны,
+    логин (почта/ник) без учёта регистра, пароль — как есть.
+    """
+    login, sep, password = (creds or "").strip().partition(":")
+    return f"{login.strip().lower()}{sep}{password.strip()}"
+
+
+def creds_hash(creds: Optional[str]) -> Optional[bytes]:
+    """Ключ creds_index: 16 байт blake2b от нормализованных creds (SQL-функция creds_hash у писателя)."""
+    if creds is None:
+        return None
+    return hashlib.blake2b(normalize_creds(creds).encode("utf-8"), digest_size=16).digest()
+
+
+class DuplicateCredsError(ValueError):
+    """Такие creds уже есть в инвентаре (в этом или другом разделе)."""
+
+    def __init__(self, rank: str, account_id: int):
+        super().__init__(f"creds already present: rank {rank}, id {account_id}")
+        self.rank = rank
+        self.account_id = account_id
@@ -1,7 +1,22 @@
 # app/db.py
 import os
+import asyncio
+import logging
+import sqlite3
 import aiosqlite
-from typing import Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, AsyncIterator, TypeVar
+
+from app.creds import DuplicateCredsError, creds_hash
+from app.db_migrate import Migration, add_column, migrate_async
+from app.db_pool import ConnectionPool, get_pool
+from app.db_profile import apply_profile
+from app.db_writer import DbWriter, WriteIntent, get_writer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 # Путь к базе: по умолчанию ../db.sqlite3 от этого файла; можно переопределить через .env (DB_PATH)
 DB_PATH = os.getenv(
@@ -9,104 +24,359 @@ DB_PATH = os.getenv(
     os.path.join(os.path.dirname(os.path.dirname(__file__)), "db.sqlite3")
 )
 
-# -------------------- INIT --------------------
+# Соединений в пуле основной БД: каждое занято только на время одного чтения
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+# -------------------- СОЕДИНЕНИЯ / СЕССИИ --------------------
+
+def _pool() -> ConnectionPool:
+    return get_pool("main", DB_PATH, size=POOL_SIZE)
 
-async def init_db():
+@asynccontextmanager
+async def _connect() -> AsyncIterator[aiosqlite.Connection]:
     """
-    Инициализация БД и таблиц.
+    Read-соединение из пула на один вызов: пока хендлер ждёт Telegram, пул свободен.
+    Все записи идут через единственного писателя основной БД (_write).
     """
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    async with aiosqlite.connect(DB_PATH) as db:
-        # users
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                balance_rub INTEGER NOT NULL DEFAULT 0,
-                created_at TEXT DEFAULT (datetime('now')),
-                updated_at TEXT DEFAULT (datetime('now'))
-            )
-            """
+    async with _pool().acquire() as db:
+        yield db
+
+async def _attach_sections(conn: aiosqlite.Connection) -> None:
+    """
+    Писатель основной БД подключает БД разделов: покупка лота 7/6 rank — одна транзакция на обе БД.
+    """
+    from app.db_ranks import list_sections  # app.db_ranks сам импортирует app.db
+    for section in list_sections():
+        if not section.in_main_db:
+            await conn.execute(f"ATTACH DATABASE ? AS {section.attach_schema}", (section.db_path,))
+            await apply_profile(conn, section.attach_schema)
+
+def _main_ranks() -> dict[str, Optional[str]]:
+    """Разделы, живущие в основной БД: {ключ: category}."""
+    from app.db_ranks import list_sections
+    return {s.key: s.category for s in list_sections() if s.in_main_db}
+
+def _writer() -> DbWriter:
+    return get_writer("main", DB_PATH, on_connect=_attach_sections)
+
+async def _write(intent: WriteIntent[T]) -> T:
+    """Выполнить намерение записи через писателя основной БД (group commit) и дождаться результата."""
+    return await _writer().submit(intent)
+
+# -------------------- SCHEMA / MIGRATIONS --------------------
+
+def _m1_baseline(db: sqlite3.Connection) -> None:
+    """
+    Базовая схема — то, что раньше init_db досоздавал на каждом старте.
+    Идемпотентна: на старых БД (user_version=0) таблицы уже есть, досоздаётся только недостающее.
+    """
+    # users
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            balance_rub INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT DEFAULT (datetime('now')),
+            updated_at TEXT DEFAULT (datetime('now'))
         )
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(lower(username))")
-        
-                # sales (история покупок)
-        await db.execute(
+        """
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(lower(username))")
+
+    # balance_ledger (append-only история изменений баланса; users.balance_rub — материализованная сумма)
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS balance_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            delta_rub INTEGER NOT NULL,
+            kind TEXT NOT NULL,                -- opening / deposit / purchase / admin_give / admin_take / refund / adjust
+            ref TEXT,                          -- comment платежа, rank:id лота, @админ и т.п.
+            balance_after INTEGER NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    # (user_id, delta_rub) покрывает и SUM для сверки, и выборку по пользователю
+    db.execute("CREATE INDEX IF NOT EXISTS idx_ledger_user ON balance_ledger(user_id, delta_rub)")
+    # балансы, появившиеся до леджера, фиксируем одной стартовой записью 'opening'
+    db.execute(
+        """
+        INSERT INTO balance_ledger(user_id, delta_rub, kind, balance_after)
+        SELECT u.user_id, u.balance_rub, 'opening', u.balance_rub
+        FROM users u
+        WHERE u.balance_rub != 0
+          AND NOT EXISTS (SELECT 1 FROM balance_ledger l WHERE l.user_id = u.user_id)
+        """
+    )
+
+    # sales (история покупок)
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            price_rub INTEGER NOT NULL,
+            rank TEXT NOT NULL DEFAULT '8',   -- раздел лота: account_id уникален только внутри ранга
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    add_column(db, "sales", "rank", "TEXT NOT NULL DEFAULT '8'")
+    # снимок лота на момент покупки: /history показывает данные, не трогая БД рангов
+    add_column(db, "sales", "title", "TEXT")
+    backfill_sales = add_column(db, "sales", "creds", "TEXT")
+    # история пользователя (keyset по id) и выборки по дням
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sales_user ON sales(user_id, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sales_created ON sales(created_at, rank, price_rub)")
+
+    # payments (для пополнений по comment)
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            method TEXT NOT NULL,
+            amount_rub INTEGER NOT NULL,
+            comment TEXT NOT NULL UNIQUE,
+            status TEXT NOT NULL,             -- pending / success / failed / expired
+            ext_operation_id INTEGER,         -- id операции на стороне провайдера
+            raw_json TEXT,                    -- полный ответ провайдера
+            created_at TEXT DEFAULT (datetime('now')),
+            updated_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    # (status, created_at): свипер просроченных и выборки pending идут range-scan'ом по живым счетам;
+    # одиночный индекс по status им покрывается как префикс
+    db.execute("CREATE INDEX IF NOT EXISTS idx_payments_status_created ON payments(status, created_at)")
+    db.execute("DROP INDEX IF EXISTS idx_payments_status")
+
+    # accounts (товары)
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,            -- например, 'WarThunder'
+            button_title TEXT NOT NULL,        -- текст кнопки (название)
+            creds TEXT NOT NULL,               -- "login:password"
+            photo_file_id TEXT,                -- file_id фото из Telegram (опционально)
+            caption TEXT,                      -- описание (подпись к фото)
+            price_rub INTEGER NOT NULL,        -- цена в рублях
+            status TEXT DEFAULT 'available',   -- available / sold / hidden
+            created_by INTEGER,                -- Telegram user_id админа
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_accounts_cat_status ON accounts(category, status, id)")
+    # остатки/агрегаты по цене для каталога (app/catalog.py) — index-only
+    db.execute("CREATE INDEX IF NOT EXISTS idx_accounts_cat_status_price ON accounts(category, status, price_rub)")
+
+    # старые продажи 8 rank: снимок title/creds берём из accounts (один раз, при добавлении колонок)
+    if backfill_sales:
+        db.execute(
             """
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                account_id INTEGER NOT NULL,
-                price_rub INTEGER NOT NULL,
-                created_at TEXT DEFAULT (datetime('now'))
-            )
+            UPDATE sales SET
+                title = (SELECT a.button_title FROM accounts a WHERE a.id = sales.account_id),
+                creds = (SELECT a.creds FROM accounts a WHERE a.id = sales.account_id)
+            WHERE rank = '8'
             """
         )
 
+def _m2_accounts_updated_at(db: sqlite3.Connection) -> None:
+    # update_account_caption пишет updated_at, а в accounts такой колонки не было.
+    # ALTER ADD COLUMN не принимает DEFAULT (datetime('now')) — NULL значит «не редактировался»
+    add_column(db, "accounts", "updated_at", "TEXT")
 
-        # payments (для пополнений по comment)
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                method TEXT NOT NULL,
-                amount_rub INTEGER NOT NULL,
-                comment TEXT NOT NULL UNIQUE,
-                status TEXT NOT NULL,             -- pending / success / failed
-                ext_operation_id INTEGER,         -- id операции на стороне провайдера
-                raw_json TEXT,                    -- полный ответ провайдера
-                created_at TEXT DEFAULT (datetime('now')),
-                updated_at TEXT DEFAULT (datetime('now'))
-            )
-            """
+def create_accounts_archive(db: sqlite3.Connection) -> None:
+    """
+    Архив проданных лотов (app/archive.py): те же колонки, что у accounts, и те же id —
+    sales(rank, account_id) джойнится с архивом так же, как с горячей таблицей.
+    id без AUTOINCREMENT: их выдаёт accounts (AUTOINCREMENT не переиспользует id ушедших в архив строк).
+    Общая для основной БД и БД разделов (app.db_ranks.RANK_MIGRATIONS).
+    """
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS accounts_archive (
+            id INTEGER PRIMARY KEY,
+            category TEXT,
+            button_title TEXT NOT NULL,
+            creds TEXT NOT NULL,
+            photo_file_id TEXT,
+            caption TEXT,
+            price_rub INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            created_by INTEGER,
+            created_at TEXT,
+            updated_at TEXT,
+            archived_at TEXT DEFAULT (datetime('now'))
         )
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(status)")
-
-        # accounts (товары)
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,            -- например, 'WarThunder'
-                button_title TEXT NOT NULL,        -- текст кнопки (название)
-                creds TEXT NOT NULL,               -- "login:password"
-                photo_file_id TEXT,                -- file_id фото из Telegram (опционально)
-                caption TEXT,                      -- описание (подпись к фото)
-                price_rub INTEGER NOT NULL,        -- цена в рублях
-                status TEXT DEFAULT 'available',   -- available / sold / hidden
-                created_by INTEGER,                -- Telegram user_id админа
-                created_at TEXT DEFAULT (datetime('now'))
-            )
-            """
+        """
+    )
+
+def _m4_creds_index(db: sqlite3.Connection) -> None:
+    # общий для основной БД и БД разделов индекс creds: один и тот же login:password не попадёт
+    # в продажу дважды. Заполняется на старте (app.db_ranks.ensure_creds_index), дальше — вставками лотов
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS creds_index (
+            creds_hash BLOB PRIMARY KEY,       -- app.creds.creds_hash(нормализованные creds)
+            rank TEXT NOT NULL,
+            account_id INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    # снятие лота (удаление/перенос) — по (rank, account_id)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_creds_index_lot ON creds_index(rank, account_id)")
+
+def create_accounts_fts(db: sqlite3.Connection) -> None:
+    """
+    Полнотекстовый индекс FTS5 по button_title и caption (поиск в каталоге, app.catalog.search_available).
+    External content: текст хранится только в accounts, индекс держат в синхроне триггеры.
+    Смена статуса (покупка, скрытие) индекс не трогает — триггер обновления только на button_title/caption.
+    Общая для основной БД и БД разделов (app.db_ranks.RANK_MIGRATIONS).
+    """
+    db.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(
+            button_title, caption,
+            content='accounts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
         )
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_accounts_cat_status ON accounts(category, status, id)")
-        await db.commit()
+        """
+    )
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_ai AFTER INSERT ON accounts BEGIN
+            INSERT INTO accounts_fts(rowid, button_title, caption) VALUES (new.id, new.button_title, new.caption);
+        END
+        """
+    )
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_ad AFTER DELETE ON accounts BEGIN
+            INSERT INTO accounts_fts(accounts_fts, rowid, button_title, caption)
+            VALUES ('delete', old.id, old.button_title, old.caption);
+        END
+        """
+    )
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_au AFTER UPDATE OF button_title, caption ON accounts BEGIN
+            INSERT INTO accounts_fts(accounts_fts, rowid, button_title, caption)
+            VALUES ('delete', old.id, old.button_title, old.caption);
+            INSERT INTO accounts_fts(rowid, button_title, caption) VALUES (new.id, new.button_title, new.caption);
+        END
+        """
+    )
+    # уже лежащие лоты — в индекс одним проходом
+    db.execute("INSERT INTO accounts_fts(accounts_fts) VALUES ('rebuild')")
+
+def _m6_listing_indexes(db: sqlite3.Connection) -> None:
+    # листинги по сортировкам (SORTS): keyset-страница — range-scan по индексу без сортировки и без
+    # обращения к таблице (id, button_title, price_rub лежат в индексе). Старые индексы — их префиксы
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_accounts_list_new ON accounts(category, status, id, button_title, price_rub)"
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_accounts_list_price ON accounts(category, status, price_rub, id, button_title)"
+    )
+    db.execute("DROP INDEX IF EXISTS idx_accounts_cat_status")
+    db.execute("DROP INDEX IF EXISTS idx_accounts_cat_status_price")
+
+# Схема основной БД: новые изменения — только новым элементом в конце списка
+MIGRATIONS: list[Migration] = [
+    _m1_baseline,
+    _m2_accounts_updated_at,
+    create_accounts_archive,
+    _m4_creds_index,
+    create_accounts_fts,
+    _m6_listing_indexes,
+]
+
+async def init_db() -> int:
+    """
+    Довести схему основной БД до актуальной версии (см. app/db_migrate.py).
+    Схема актуальна — одно чтение PRAGMA user_version.
+    """
+    return await migrate_async(DB_PATH, MIGRATIONS, name="main")
 
 # -------------------- USERS --------------------
 
+# Write-behind для ensure_user: он зовётся почти на каждое действие пользователя, а меняет что-то редко.
+# _known_users — что уже лежит в БД (LRU на KNOWN_USERS_MAX записей); новые/сменившие username
+# копятся в _pending_users и пишутся пачкой.
+USERS_FLUSH_INTERVAL_S = float(os.getenv("USERS_FLUSH_INTERVAL_S", "2"))
+KNOWN_USERS_MAX = int(os.getenv("KNOWN_USERS_MAX", "50000"))
+_known_users: "OrderedDict[int, str]" = OrderedDict()
+_pending_users: dict[int, str] = {}
+
 async def ensure_user(user_id: int, username: Optional[str]) -> None:
     """
     Создать пользователя, если нет. Обновить username при необходимости.
+    Запись отложенная: без изменений — ничего не делаем, иначе ставим в очередь на flush.
+    Функции, читающие users, сначала досбрасывают очередь (_flush_users), так что пользователь
+    «виден» сразу.
     """
     uname = (username or "").lstrip("@")
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    if _known_users.get(user_id) == uname:
+        _known_users.move_to_end(user_id)
+        return
+    _pending_users[user_id] = uname
+
+async def _flush_users(user_id: Optional[int] = None) -> None:
+    """
+    Записать очередь ensure_user одним намерением писателя (executemany).
+    user_id — сбрасываем, только если в очереди есть именно он (для точечных чтений).
+    """
+    if not _pending_users or (user_id is not None and user_id not in _pending_users):
+        return
+    # из очереди убираем только после COMMIT: пока пачка в полёте, точечное чтение её пользователя
+    # снова зовёт flush и ждёт своей записи (писатель коммитит по порядку), а не читает пустоту
+    batch = list(_pending_users.items())
+
+    async def tx(db: aiosqlite.Connection) -> None:
+        await db.executemany(
             """
             INSERT INTO users(user_id, username)
             VALUES (?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 username=excluded.username,
                 updated_at=datetime('now')
+            WHERE users.username IS NOT excluded.username
             """,
-            (user_id, uname)
+            batch
         )
-        await db.commit()
+
+    await _write(tx)
+    for uid, uname in batch:
+        # за время записи username мог смениться ещё раз — такой остаётся в очереди
+        if _pending_users.get(uid) == uname:
+            del _pending_users[uid]
+        _known_users[uid] = uname
+        _known_users.move_to_end(uid)
+    while len(_known_users) > KNOWN_USERS_MAX:
+        _known_users.popitem(last=False)
+
+async def flush_users() -> None:
+    """Сбросить очередь ensure_user сейчас (фоновая задача, остановка бота, скрипты)."""
+    await _flush_users()
+
+async def run_users_flusher(interval_s: float = USERS_FLUSH_INTERVAL_S) -> None:
+    """Фоновая задача: раз в interval_s секунд пишет накопленных пользователей одной транзакцией."""
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await flush_users()
+        except Exception:
+            logger.exception("users flush failed")
 
 async def get_user(user_id: int) -> Optional[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await _flush_users(user_id)
+    async with _connect() as db:
         async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cur:
             row = await cur.fetchone()
             return dict(row) if row else None
@@ -114,8 +384,8 @@ async def get_user(user_id: int) -> Optional[dict]:
 async def get_user_by_username(username: str) -> Optional[dict]:
     """Найти пользователя по username (без @), регистронезависимо."""
     uname = (username or "").lstrip("@").lower()
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await _flush_users()
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM users WHERE lower(username) = ?", (uname,)
         ) as cur:
@@ -123,88 +393,176 @@ async def get_user_by_username(username: str) -> Optional[dict]:
             return dict(row) if row else None
 
 async def get_balance_rub(user_id: int) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    await _flush_users(user_id)
+    async with _connect() as db:
         async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
             row = await cur.fetchone()
             return int(row[0]) if row else 0
 
-async def add_balance_rub(user_id: int, delta_rub: int) -> int:
+async def _apply_balance_delta(db: aiosqlite.Connection, user_id: int, delta_rub: int,
+                               kind: str, ref: Optional[str]) -> tuple[Optional[int], int]:
     """
-    Изменить баланс по user_id. Возвращает новый баланс.
-    Списания не опускают ниже 0.
+    Изменить баланс внутри УЖЕ открытой write-транзакции вызывающего (намерение писателя, _write):
+    UPDATE users.balance_rub + запись в balance_ledger. Списания не опускают ниже 0.
+    Возвращает (new_balance, applied_delta); (None, 0) — пользователя нет.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
-            row = await cur.fetchone()
-            current = int(row[0]) if row else 0
-        if delta_rub >= 0:
-            new_balance = current + delta_rub
-        else:
-            new_balance = max(0, current + delta_rub)
-        await db.execute(
+    async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
+        row = await cur.fetchone()
+    if not row:
+        return None, 0
+    current = int(row[0])
+    applied = delta_rub if delta_rub >= 0 else -min(current, -delta_rub)
+    new_balance = current + applied
+    if applied:
+        cur = await db.execute(
             "UPDATE users SET balance_rub = ?, updated_at = datetime('now') WHERE user_id = ?",
             (new_balance, user_id)
         )
-        await db.commit()
-        return new_balance
+        if cur.rowcount != 1:
+            return None, 0
+        await db.execute(
+            "INSERT INTO balance_ledger(user_id, delta_rub, kind, ref, balance_after) VALUES (?, ?, ?, ?, ?)",
+            (user_id, applied, kind, ref, new_balance)
+        )
+    return new_balance, applied
+
+async def add_balance_rub(user_id: int, delta_rub: int, kind: str = "adjust", ref: Optional[str] = None) -> int:
+    """
+    Изменить баланс по user_id атомарно (одна транзакция: баланс + запись в леджер).
+    Возвращает новый баланс. Списания не опускают ниже 0.
+    """
+    await _flush_users(user_id)
+
+    async def tx(db: aiosqlite.Connection) -> int:
+        new_balance, _ = await _apply_balance_delta(db, user_id, delta_rub, kind, ref)
+        return new_balance or 0
 
-async def add_balance_rub_by_username(username: str, delta_rub: int) -> tuple[Optional[int], int]:
+    return await _write(tx)
+
+async def add_balance_rub_by_username(username: str, delta_rub: int,
+                                      ref: Optional[str] = None) -> tuple[Optional[int], int]:
     """
-    Изменить баланс по username. Возвращает (new_balance, applied_delta).
+    Изменить баланс по username (админские дать/забрать). Возвращает (new_balance, applied_delta).
     Если delta отрицательная — не уходим ниже 0 (кэпим).
     """
     uname = (username or "").lstrip("@").lower()
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await _flush_users()
+
+    async def tx(db: aiosqlite.Connection) -> tuple[Optional[int], int]:
         async with db.execute(
-            "SELECT user_id, balance_rub FROM users WHERE lower(username)=?", (uname,)
+            "SELECT user_id FROM users WHERE lower(username)=?", (uname,)
         ) as cur:
             row = await cur.fetchone()
-            if not row:
-                return None, 0
-            user_id = row["user_id"]
-            current = int(row["balance_rub"])
-
-        if delta_rub >= 0:
-            new_balance = current + delta_rub
-            applied = delta_rub
-        else:
-            applied = -min(current, -delta_rub)
-            new_balance = current + applied
+        if not row:
+            return None, 0
+        kind = "admin_give" if delta_rub >= 0 else "admin_take"
+        return await _apply_balance_delta(db, int(row[0]), delta_rub, kind, ref)
 
-        await db.execute(
-            "UPDATE users SET balance_rub = ?, updated_at = datetime('now') WHERE user_id = ?",
-            (new_balance, user_id)
-        )
-        await db.commit()
-        return new_balance, applied
+    return await _write(tx)
 
-# -------------------- PAYMENTS --------------------
+async def list_ledger(user_id: int, limit: int = 20) -> list[dict]:
+    """Последние записи леджера пользователя (новые сверху)."""
+    async with _connect() as db:
+        async with db.execute(
+            "SELECT * FROM balance_ledger WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, limit)
+        ) as cur:
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
 
-async def create_payment(user_id: int, method: str, amount_rub: int,
-                         comment: str, status: str, raw_json: Optional[str]) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
-        cur = await db.execute(
+async def reconcile_balances() -> list[dict]:
+    """
+    Сверка леджера с материализованными балансами одним проходом (SUM по индексу idx_ledger_user).
+    Возвращает расхождения: [{"user_id", "balance_rub", "ledger_rub"}]; пустой список — всё сходится.
+    """
+    await _flush_users()
+    async with _connect() as db:
+        async with db.execute(
             """
-            INSERT INTO payments(user_id, method, amount_rub, comment, status, raw_json)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, method, amount_rub, comment, status, raw_json)
-        )
-        await db.commit()
-        return cur.lastrowid
+            SELECT u.user_id, u.balance_rub, COALESCE(l.total, 0) AS ledger_rub
+            FROM users u
+            LEFT JOIN (
+                SELECT user_id, SUM(delta_rub) AS total FROM balance_ledger GROUP BY user_id
+            ) l ON l.user_id = u.user_id
+            WHERE u.balance_rub != COALESCE(l.total, 0)
+            """
+        ) as cur:
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
+
+# -------------------- PAYMENTS --------------------
+
+async def create_payment_unique(user_id: int, method: str, amount_rub: int, status: str,
+                                make_comment: Callable[[], str], attempts: int = 8) -> tuple[int, str]:
+    """
+    Создать платёж с уникальным comment одной записью: уникальность держит UNIQUE(comment),
+    при конфликте генерируем новый код и повторяем INSERT в том же намерении записи.
+    Возвращает (payment_id, comment) — уже после COMMIT, код можно сразу показывать.
+    """
+    async def tx(db: aiosqlite.Connection) -> tuple[int, str]:
+        for _ in range(attempts):
+            comment = make_comment()
+            try:
+                cur = await db.execute(
+                    """
+                    INSERT INTO payments(user_id, method, amount_rub, comment, status)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (user_id, method, amount_rub, comment, status)
+                )
+            except aiosqlite.IntegrityError:
+                # comment уже занят — пробуем следующий
+                continue
+            return cur.lastrowid, comment
+        raise RuntimeError(f"Не удалось выделить уникальный comment за {attempts} попыток")
+
+    return await _write(tx)
 
 async def get_payment_by_comment(comment: str) -> Optional[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM payments WHERE comment = ?", (comment,)
         ) as cur:
             row = await cur.fetchone()
             return dict(row) if row else None
 
-async def mark_payment_success(comment: str, ext_operation_id: int, raw_json: Optional[str]) -> None:
-    async with aiosqlite.connect(DB_PATH) as db:
+async def expire_stale_payments(expire_hours: int) -> int:
+    """
+    Пометить все pending-платежи старше expire_hours как expired — одним UPDATE
+    по индексу (status, created_at). Возвращает число помеченных счетов.
+    """
+    async def tx(db: aiosqlite.Connection) -> int:
+        cur = await db.execute(
+            """
+            UPDATE payments
+            SET status='expired',
+                updated_at=datetime('now')
+            WHERE status='pending'
+              AND created_at < datetime('now', ?)
+            """,
+            (f"-{int(expire_hours)} hours",)
+        )
+        return cur.rowcount
+
+    return await _write(tx)
+
+async def credit_payment(comment: str, ext_operation_id: int, raw_json: Optional[str]) -> Optional[int]:
+    """
+    Зачислить оплаченный счёт атомарно: payments → success, баланс + запись 'deposit' в леджер
+    в одной транзакции. Повторная проверка уже зачисленного счёта ничего не меняет.
+    Возвращает новый баланс или None, если счёт не найден / уже зачислен.
+    Если баланс пользователя не обновился, намерение откатывается (RuntimeError).
+    """
+    await _flush_users()
+
+    async def tx(db: aiosqlite.Connection) -> Optional[int]:
+        async with db.execute(
+            "SELECT user_id, amount_rub FROM payments WHERE comment = ? AND status != 'success'", (comment,)
+        ) as cur:
+            row = await cur.fetchone()
+        if not row:
+            return None
+        user_id, amount = int(row[0]), int(row[1])
         await db.execute(
             """
             UPDATE payments
@@ -216,14 +574,99 @@ async def mark_payment_success(comment: str, ext_operation_id: int, raw_json: Op
             """,
             (ext_operation_id, raw_json, comment)
         )
-        await db.commit()
+        new_balance, _ = await _apply_balance_delta(db, user_id, amount, "deposit", comment)
+        if new_balance is None:
+            # баланс не изменён — исключение откатывает намерение, счёт остаётся pending
+            raise RuntimeError(f"Платёж {comment}: пользователь {user_id} не найден, зачисление отменено")
+        return new_balance
+
+    return await _write(tx)
 
 # -------------------- ACCOUNTS (товары) --------------------
 
+# Сортировки листингов: порядок → (ORDER BY, условие «после курсора») для страницы вперёд и назад.
+# Курсор — ключ граничного лота страницы (price_rub, id); страница назад читается в обратном
+# порядке и разворачивается. Каждый вариант — range-scan по индексу листинга (_m6_listing_indexes).
+SORTS: dict[str, dict[str, tuple[str, str]]] = {
+    "new": {
+        "n": ("id DESC", "id < :cur_id"),
+        "p": ("id ASC", "id > :cur_id"),
+    },
+    "cheap": {
+        "n": ("price_rub ASC, id ASC", "(price_rub, id) > (:cur_price, :cur_id)"),
+        "p": ("price_rub DESC, id DESC", "(price_rub, id) < (:cur_price, :cur_id)"),
+    },
+    "dear": {
+        "n": ("price_rub DESC, id DESC", "(price_rub, id) < (:cur_price, :cur_id)"),
+        "p": ("price_rub ASC, id ASC", "(price_rub, id) > (:cur_price, :cur_id)"),
+    },
+}
+DEFAULT_SORT = "new"
+
+def listing_sql(select: str, table: str, where: str, sort: str, direction: Optional[str]) -> str:
+    """
+    SELECT листинга: direction None — первая страница (или OFFSET), "n"/"p" — keyset от курсора.
+    Параметры: :limit, :offset, :cur_price, :cur_id (+ те, что в where).
+    """
+    order, after = SORTS[sort][direction or "n"]
+    if direction:
+        return f"SELECT {select} FROM {table} WHERE {where} AND {after} ORDER BY {order} LIMIT :limit"
+    return f"SELECT {select} FROM {table} WHERE {where} ORDER BY {order} LIMIT :limit OFFSET :offset"
+
+def edge_cursor(direction: str, row: dict) -> tuple[str, int, int]:
+    """Курсор соседней страницы: "n" — после последнего лота row, "p" — до первого."""
+    return direction, row["price_rub"], row["id"]
+
+def parse_cursor(token: Optional[str]) -> Optional[tuple[str, int, int]]:
+    """Курсор из старых строковых кнопок: "n150.42" → ("n", 150, 42); пустой или битый — None."""
+    if not token or token[0] not in ("n", "p"):
+        return None
+    price, _, acc_id = token[1:].partition(".")
+    try:
+        return token[0], int(price), int(acc_id)
+    except ValueError:
+        return None
+
+def _cursor_params(cursor: Optional[tuple[str, int, int]]) -> dict:
+    if cursor is None:
+        return {"cur_price": None, "cur_id": None}
+    return {"cur_price": cursor[1], "cur_id": cursor[2]}
+
+async def _index_creds(db: aiosqlite.Connection, creds: str, rank: str, account_id: int) -> None:
+    """
+    Внутри намерения писателя: занять creds в creds_index за лотом (rank, account_id).
+    Уже заняты — DuplicateCredsError (SAVEPOINT намерения откатывает и вставку лота).
+    """
+    h = creds_hash(creds)
+    async with db.execute("SELECT rank, account_id FROM main.creds_index WHERE creds_hash = ?", (h,)) as cur:
+        row = await cur.fetchone()
+    if row:
+        raise DuplicateCredsError(row[0], row[1])
+    await db.execute(
+        "INSERT INTO main.creds_index(creds_hash, rank, account_id) VALUES (?, ?, ?)",
+        (h, rank, int(account_id))
+    )
+
+async def _unindex_lot(db: aiosqlite.Connection, rank: str, account_id: int) -> None:
+    """Освободить creds удаляемого лота."""
+    await db.execute("DELETE FROM main.creds_index WHERE rank = ? AND account_id = ?", (rank, int(account_id)))
+
+async def find_creds(creds: str) -> Optional[dict]:
+    """Где уже лежат такие creds (нормализованные): {"rank", "account_id"} или None. O(1) по creds_index."""
+    async with _connect() as db:
+        async with db.execute(
+            "SELECT rank, account_id FROM creds_index WHERE creds_hash = ?", (creds_hash(creds),)
+        ) as cur:
+            row = await cur.fetchone()
+            return dict(row) if row else None
+
 async def add_account(category: str, button_title: str, creds: str,
                       photo_file_id: Optional[str], caption: Optional[str],
                       price_rub: int, created_by: Optional[int]) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Новый лот в основной БД. creds уже в инвентаре — DuplicateCredsError."""
+    rank = next((k for k, c in _main_ranks().items() if c == category), category)
+
+    async def tx(db: aiosqlite.Connection) -> int:
         cur = await db.execute(
             """
             INSERT INTO accounts(category, button_title, creds, photo_file_id, caption, price_rub, status, created_by)
@@ -231,27 +674,29 @@ async def add_account(category: str, button_title: str, creds: str,
             """,
             (category, button_title, creds, photo_file_id, caption, int(price_rub), created_by)
         )
-        await db.commit()
+        await _index_creds(db, creds, rank, cur.lastrowid)
         return cur.lastrowid
 
-async def list_accounts(category: str, limit: int, offset: int = 0) -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            """
-            SELECT id, button_title, price_rub
-            FROM accounts
-            WHERE category = ? AND status = 'available'
-            ORDER BY id DESC
-            LIMIT ? OFFSET ?
-            """,
-            (category, limit, offset)
-        ) as cur:
-            rows = await cur.fetchall()
-            return [dict(r) for r in rows]
+    return await _write(tx)
+
+async def list_accounts(category: str, limit: int, offset: int = 0, *,
+                        sort: str = DEFAULT_SORT, cursor: Optional[tuple[str, int, int]] = None) -> list[dict]:
+    """
+    Страница доступных лотов категории в порядке sort. cursor (см. parse_cursor) — keyset-страница
+    до/после граничного лота: цена страницы не зависит от её номера. Без курсора — LIMIT/OFFSET.
+    """
+    direction = cursor[0] if cursor else None
+    sql = listing_sql("id, button_title, price_rub", "accounts",
+                      "category = :category AND status = 'available'", sort, direction)
+    params = {"category": category, "limit": limit, "offset": offset, **_cursor_params(cursor)}
+    async with _connect() as db:
+        async with db.execute(sql, params) as cur:
+            rows = [dict(r) for r in await cur.fetchall()]
+    # страница назад прочитана в обратном порядке
+    return rows[::-1] if direction == "p" else rows
 
 async def count_accounts(category: str) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         async with db.execute(
             "SELECT COUNT(*) FROM accounts WHERE category = ? AND status = 'available'",
             (category,)
@@ -260,8 +705,7 @@ async def count_accounts(category: str) -> int:
             return int(row[0]) if row else 0
 
 async def get_account_by_id(acc_id: int) -> Optional[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM accounts WHERE id = ?", (int(acc_id),)
         ) as cur:
@@ -280,49 +724,88 @@ async def purchase_account(user_id: int, acc_id: int) -> dict:
                       {"status": "not_available"} |
                       {"status": "error", "reason": "..."}
     """
+    async def tx(db: aiosqlite.Connection) -> dict:
+        # тянем аккаунт
+        async with db.execute("SELECT * FROM accounts WHERE id = ?", (acc_id,)) as cur:
+            acc = await cur.fetchone()
+        if not acc or acc["status"] != "available":
+            return {"status": "not_available"}
+
+        price = int(acc["price_rub"])
+        title = acc["button_title"]
+        creds = acc["creds"]
+
+        # баланс пользователя
+        async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
+            row = await cur.fetchone()
+        balance = int(row[0]) if row else 0
+
+        if balance < price:
+            return {"status": "insufficient"}
+
+        # списываем (с записью в леджер) и отмечаем SOLD
+        await _apply_balance_delta(db, user_id, -price, "purchase", f"8:{acc_id}")
+        await db.execute("UPDATE accounts SET status='sold' WHERE id=? AND status='available'", (acc_id,))
+        # запись о продаже
+        await db.execute(
+            "INSERT INTO sales(user_id, account_id, price_rub, rank, title, creds) VALUES (?, ?, ?, '8', ?, ?)",
+            (user_id, acc_id, price, title, creds)
+        )
+        return {"status": "ok", "creds": creds, "price_rub": price, "title": title}
+
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            db.row_factory = aiosqlite.Row
-            await db.execute("BEGIN IMMEDIATE")  # блокируем для гонок
-
-            # тянем аккаунт
-            async with db.execute("SELECT * FROM accounts WHERE id = ?", (acc_id,)) as cur:
-                acc = await cur.fetchone()
-            if not acc or acc["status"] != "available":
-                await db.execute("ROLLBACK")
-                return {"status": "not_available"}
-
-            price = int(acc["price_rub"])
-            title = acc["button_title"]
-            creds = acc["creds"]
-
-            # баланс пользователя
-            async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
-                row = await cur.fetchone()
-            balance = int(row[0]) if row else 0
-
-            if balance < price:
-                await db.execute("ROLLBACK")
-                return {"status": "insufficient"}
-
-            # списываем и отмечаем SOLD
-            new_balance = balance - price
-            await db.execute("UPDATE users SET balance_rub=?, updated_at=datetime('now') WHERE user_id=?", (new_balance, user_id))
-            # доп.защита от гонки: статус меняем только если ещё available
-            await db.execute("UPDATE accounts SET status='sold' WHERE id=? AND status='available'", (acc_id,))
-            # запись о продаже
-            await db.execute("INSERT INTO sales(user_id, account_id, price_rub) VALUES (?, ?, ?)", (user_id, acc_id, price))
-
-            await db.commit()
-            return {"status": "ok", "creds": creds, "price_rub": price, "title": title}
+        await _flush_users(user_id)
+        # писатель один — гонок за лот нет: намерения выполняются строго по очереди
+        return await _write(tx)
     except Exception as e:
-        try:
-            async with aiosqlite.connect(DB_PATH) as db2:
-                await db2.execute("ROLLBACK")
-        except Exception:
-            pass
         return {"status": "error", "reason": str(e)}
 
+# -------------------- SALES (история покупок) --------------------
+
+async def list_user_purchases(user_id: int, before_id: Optional[int] = None, limit: int = 10) -> list[dict]:
+    """
+    Покупки пользователя, новые сверху. Keyset-пагинация: следующая страница — before_id = id последней строки.
+    Идёт по индексу idx_sales_user(user_id, id) без OFFSET.
+    """
+    async with _connect() as db:
+        async with db.execute(
+            """
+            SELECT id, rank, account_id, price_rub, title, created_at
+            FROM sales
+            WHERE user_id = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (user_id, before_id if before_id else 2**63 - 1, limit)
+        ) as cur:
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
+
+async def get_user_purchase(user_id: int, sale_id: int) -> Optional[dict]:
+    """Одна покупка пользователя (с creds) — только своя."""
+    async with _connect() as db:
+        async with db.execute(
+            "SELECT * FROM sales WHERE id = ? AND user_id = ?", (int(sale_id), user_id)
+        ) as cur:
+            row = await cur.fetchone()
+            return dict(row) if row else None
+
+async def sales_by_day(days: int = 7) -> list[dict]:
+    """Продажи по дням и рангам за последние days дней (covering-индекс idx_sales_created)."""
+    async with _connect() as db:
+        async with db.execute(
+            """
+            SELECT DATE(created_at) AS day, rank, COUNT(*) AS cnt, SUM(price_rub) AS total_rub
+            FROM sales
+            WHERE created_at >= DATE('now', ?)
+            GROUP BY day, rank
+            ORDER BY day DESC, rank DESC
+            """,
+            (f"-{int(days) - 1} days",)
+        ) as cur:
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
+
 # ---------------------------------------------------------------------
 # УДАЛЕНИЕ АККАУНТА (8 rank)
 # ---------------------------------------------------------------------
@@ -331,11 +814,14 @@ async def delete_account(acc_id: int) -> bool:
     Удаляет аккаунт из основной (8 rank) базы.
     Возвращает True, если запись реально удалена.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def tx(db: aiosqlite.Connection) -> bool:
         cur = await db.execute("DELETE FROM accounts WHERE id=?", (int(acc_id),))
-        await db.commit()
+        for rank in _main_ranks():
+            await _unindex_lot(db, rank, acc_id)
         return cur.rowcount > 0
 
+    return await _write(tx)
+
 
 # ---------------------------------------------------------------------
 # ОБНОВЛЕНИЕ ОПИСАНИЯ (8 rank)
@@ -344,19 +830,19 @@ async def update_account_caption(acc_id: int, caption: str) -> bool:
     """
     Обновляет описание (caption) для аккаунта в основной базе.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def tx(db: aiosqlite.Connection) -> bool:
         cur = await db.execute(
             "UPDATE accounts SET caption=?, updated_at=datetime('now') WHERE id=?",
             (caption, int(acc_id))
         )
-        await db.commit()
         return cur.rowcount > 0
-    
+
+    return await _write(tx)
 # --- STATS: users ---
 
 async def count_users_total() -> int:
-    import aiosqlite
-    async with aiosqlite.connect(DB_PATH) as db:
+    await _flush_users()
+    async with _connect() as db:
         async with db.execute("SELECT COUNT(*) FROM users") as cur:
             row = await cur.fetchone()
             return int(row[0]) if row else 0
@@ -367,8 +853,8 @@ async def count_users_this_week() -> int:
     Считает пользователей, зарегистрированных за последние 7 дней (включая сегодня).
     Поле регистрации: created_at (UTC), по умолчанию datetime('now') в init_db.
     """
-    import aiosqlite
-    async with aiosqlite.connect(DB_PATH) as db:
+    await _flush_users()
+    async with _connect() as db:
         # >= DATE('now','-6 days')  → сегодня и 6 предыдущих дней = 7 дней
         async with db.execute("""
             SELECT COUNT(*) FROM users
@@ -382,8 +868,8 @@ async def count_users_this_month() -> int:
     """
     Считает пользователей, зарегистрированных с начала текущего месяца (UTC).
     """
-    import aiosqlite
-    async with aiosqlite.connect(DB_PATH) as db:
+    await _flush_users()
+    async with _connect() as db:
         async with db.execute("""
             SELECT COUNT(*) FROM users
             WHERE DATE(created_at) >= DATE('now','start of month')
@@ -0,0 +1,80 @@
+# app/db_migrate.py
+import asyncio
+import logging
+import os
+import sqlite3
+from typing import Callable, Sequence, Union
+
+from app.db_profile import BUSY_TIMEOUT_MS, apply_profile_sync
+
+logger = logging.getLogger(__name__)
+
+# Миграция — либо список SQL-операторов, либо функция над sqlite3-соединением.
+# Выполняется внутри общей транзакции раннера: сама не коммитит и не вызывает executescript
+# (он делает неявный COMMIT). Номер миграции = её позиция в списке, начиная с 1.
+Migration = Union[Sequence[str], Callable[[sqlite3.Connection], None]]
+
+
+def column_names(conn: sqlite3.Connection, table: str) -> set[str]:
+    """Колонки таблицы (для идемпотентных ALTER в базовой миграции)."""
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> bool:
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет. True — колонка добавлена."""
+    if column in column_names(conn, table):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path: str, migrations: Sequence[Migration], name: str = "") -> int:
+    """
+    Довести схему БД до версии len(migrations) (PRAGMA user_version).
+    Схема актуальна — это одно чтение PRAGMA. Иначе все недостающие миграции и новый
+    user_version пишутся одной транзакцией: ошибка любой откатывает всё, версия не меняется.
+    Возвращает версию схемы после запуска.
+    """
+    target = len(migrations)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # isolation_level=None — транзакцией управляем сами (DDL внутри BEGIN ... COMMIT)
+    conn = sqlite3.connect(path, isolation_level=None, timeout=int(BUSY_TIMEOUT_MS or 5000) / 1000.0)
+    try:
+        version = _user_version(conn)
+        if version == target:
+            return version
+        if version > target:
+            raise RuntimeError(f"{name or path}: schema version {version} is newer than code ({target})")
+
+        # journal_mode нельзя менять внутри транзакции — профиль до BEGIN (новый файл сразу в WAL)
+        apply_profile_sync(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = _user_version(conn)  # могли мигрировать параллельно, пока ждали блокировку
+            for number in range(version + 1, target + 1):
+                step = migrations[number - 1]
+                if callable(step):
+                    step(conn)
+                else:
+                    for sql in step:
+                        conn.execute(sql)
+            # user_version транзакционный: фиксируется тем же COMMIT, что и схема
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if version < target:
+            logger.info("%s: schema migrated %d -> %d", name or path, version, target)
+        return target
+    finally:
+        conn.close()
+
+
+async def migrate_async(path: str, migrations: Sequence[Migration], name: str = "") -> int:
+    """migrate в отдельном потоке — при старте бота не держит event loop."""
+    return await asyncio.to_thread(migrate, path, migrations, name)
@@ -0,0 +1,85 @@
+# app/db_pool.py
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiosqlite
+
+from app.db_profile import apply_profile
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Небольшой пул aiosqlite-соединений к одному файлу БД.
+    Соединения живут долго, поэтому sqlite3 переиспользует подготовленные (prepared) запросы
+    из своего кэша, а не компилирует SQL на каждый вызов.
+    Соединение, возвращённое с незакрытой транзакцией, откатывается.
+    """
+
+    def __init__(self, path: str, size: int = 4, name: str | None = None):
+        self.path = path
+        self.size = max(1, size)
+        self.name = name or path
+        self._idle: asyncio.LifoQueue[aiosqlite.Connection] = asyncio.LifoQueue()
+        self._created = 0
+        self._closed = False
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path)
+        conn.row_factory = aiosqlite.Row
+        await apply_profile(conn)
+        return conn
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._closed:
+            raise RuntimeError(f"pool {self.name} is closed")
+        if self._idle.empty() and self._created < self.size:
+            self._created += 1
+            try:
+                conn = await self._connect()
+            except Exception:
+                self._created -= 1
+                raise
+        else:
+            conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+            except Exception:
+                logger.exception("pool %s: rollback on release failed", self.name)
+            if self._closed:
+                await conn.close()
+            else:
+                self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        self._closed = True
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            await conn.close()
+
+
+_pools: dict[str, ConnectionPool] = {}
+
+
+def get_pool(key: str, path: str, size: int = 4, pool_cls: type[ConnectionPool] = ConnectionPool) -> ConnectionPool:
+    """Пул по ключу (раздел/имя БД). Создаётся лениво при первом обращении."""
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = pool_cls(path, size=size, name=key)
+    return pool
+
+
+async def close_pools() -> None:
+    """Закрыть все пулы (вызывать при остановке бота: потоки aiosqlite не daemon)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        await pool.close()
@@ -0,0 +1,118 @@
+# app/db_profile.py
+import asyncio
+import logging
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+def _env(name: str, default: str) -> Optional[str]:
+    # пустое значение в .env — не трогать PRAGMA (оставить значение SQLite/драйвера)
+    value = os.getenv(name, default).strip()
+    return value or None
+
+
+# Профиль хранения: применяется на КАЖДОМ соединении ко всем БД (основная, разделы, рассылка).
+#   journal_mode=WAL     — читатели не блокируют писателя и наоборот (persistent: пишется в файл БД)
+#   synchronous=NORMAL   — в WAL безопасно для целостности, fsync только на checkpoint
+#   busy_timeout         — ждать блокировку, а не падать сразу с «database is locked»
+#   mmap_size            — чтение страниц через mmap без копирования в page cache SQLite
+#   cache_size           — отрицательное значение = KiB на соединение
+#   temp_store=MEMORY    — временные B-tree (ORDER BY/GROUP BY без индекса) в памяти
+JOURNAL_MODE = _env("SQLITE_JOURNAL_MODE", "WAL")
+SYNCHRONOUS = _env("SQLITE_SYNCHRONOUS", "NORMAL")
+BUSY_TIMEOUT_MS = _env("SQLITE_BUSY_TIMEOUT_MS", "5000")
+MMAP_SIZE = _env("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+CACHE_SIZE = _env("SQLITE_CACHE_SIZE", "-16000")
+TEMP_STORE = _env("SQLITE_TEMP_STORE", "MEMORY")
+
+# Checkpoint-планировщик: PASSIVE раз в интервал; TRUNCATE, если -wal разросся
+CHECKPOINT_INTERVAL_S = float(os.getenv("SQLITE_CHECKPOINT_INTERVAL_S", "60"))
+WAL_TRUNCATE_BYTES = int(os.getenv("SQLITE_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+
+
+def _pragmas(schema: Optional[str] = None) -> list[str]:
+    """
+    PRAGMA профиля. schema — для ATTACH-нутых БД: у них свои journal_mode/synchronous/кэш,
+    а busy_timeout и temp_store действуют на всё соединение (ставятся только для main).
+    """
+    prefix = f"{schema}." if schema else ""
+    items: list[str] = []
+    if JOURNAL_MODE:
+        items.append(f"PRAGMA {prefix}journal_mode = {JOURNAL_MODE}")
+    if SYNCHRONOUS:
+        items.append(f"PRAGMA {prefix}synchronous = {SYNCHRONOUS}")
+    if MMAP_SIZE:
+        items.append(f"PRAGMA {prefix}mmap_size = {int(MMAP_SIZE)}")
+    if CACHE_SIZE:
+        items.append(f"PRAGMA {prefix}cache_size = {int(CACHE_SIZE)}")
+    if schema is None:
+        if BUSY_TIMEOUT_MS:
+            items.append(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+        if TEMP_STORE:
+            items.append(f"PRAGMA temp_store = {TEMP_STORE}")
+    return items
+
+
+async def apply_profile(conn: aiosqlite.Connection, schema: Optional[str] = None) -> None:
+    """Применить профиль к aiosqlite-соединению (или к ATTACH-нутой схеме на нём)."""
+    for pragma in _pragmas(schema):
+        async with conn.execute(pragma):
+            pass
+
+
+def apply_profile_sync(conn: sqlite3.Connection, schema: Optional[str] = None) -> None:
+    """То же для синхронного sqlite3 (init_rank_db, tools)."""
+    for pragma in _pragmas(schema):
+        conn.execute(pragma).fetchall()
+
+
+@asynccontextmanager
+async def connect(path: str, **kwargs) -> AsyncIterator[aiosqlite.Connection]:
+    """aiosqlite.connect + профиль: `async with connect(path) as db:`."""
+    async with aiosqlite.connect(path, **kwargs) as conn:
+        await apply_profile(conn)
+        yield conn
+
+
+# ---------------------------------------------------------------------
+# WAL CHECKPOINT
+# ---------------------------------------------------------------------
+def checkpoint(path: str) -> Optional[tuple[int, int, int]]:
+    """
+    Перенести WAL в файл БД. PASSIVE не ждёт читателей/писателя; если -wal больше
+    WAL_TRUNCATE_BYTES — TRUNCATE (ждёт busy_timeout и обнуляет -wal).
+    Возвращает (busy, log_frames, checkpointed_frames) или None, если БД не в WAL.
+    """
+    wal = path + "-wal"
+    if not os.path.exists(wal):
+        return None
+    mode = "TRUNCATE" if os.path.getsize(wal) > WAL_TRUNCATE_BYTES else "PASSIVE"
+    conn = sqlite3.connect(path, timeout=int(BUSY_TIMEOUT_MS or 5000) / 1000.0)
+    try:
+        row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        conn.close()
+    if mode == "TRUNCATE":
+        logger.info("wal checkpoint TRUNCATE %s: %s", path, row)
+    return tuple(row) if row else None
+
+
+async def run_checkpointer(paths: Callable[[], Iterable[str]],
+                           interval_s: float = CHECKPOINT_INTERVAL_S) -> None:
+    """
+    Фоновая задача: раз в interval_s секунд checkpoint всех БД (в отдельном потоке,
+    чтобы не держать event loop). paths — функция, отдающая актуальный список файлов.
+    """
+    while True:
+        await asyncio.sleep(interval_s)
+        for path in paths():
+            try:
+                await asyncio.to_thread(checkpoint, path)
+            except Exception:
+                logger.exception("wal checkpoint failed: %s", path)
@@ -1,64 +1,239 @@
 # app/db_ranks.py
 import os
+import json
+import logging
+import sqlite3
 import aiosqlite
-from typing import Optional, Literal
+from typing import Optional
 
-# Разделы (ранги), с которыми работаем
-Rank = Literal["8", "7", "6"]
+from app.creds import creds_hash
+from app.db import (
+    DEFAULT_SORT, SORTS,
+    _apply_balance_delta, _connect, _cursor_params, _flush_users, _index_creds, _unindex_lot, _write,
+    create_accounts_archive, create_accounts_fts, listing_sql,
+)
+from app.db_pool import get_pool, ConnectionPool
+from app.db_migrate import Migration, add_column, migrate, migrate_async
+
+logger = logging.getLogger(__name__)
+
+# Раздел (ранг) — строковый ключ из реестра: "8", "7", "6", ...
+Rank = str
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 # Пути к БД
 # 8 rank хранится в основной БД (как и раньше), 7/6 — в отдельных файлах
 MAIN_DB = os.getenv(
     "DB_PATH",
-    os.path.join(os.path.dirname(os.path.dirname(__file__)), "db.sqlite3")
+    os.path.join(ROOT_DIR, "db.sqlite3")
 )
 RANK7_DB = os.getenv(
     "RANK7_DB_PATH",
-    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "accounts_rank7.sqlite3")
+    os.path.join(ROOT_DIR, "data", "accounts_rank7.sqlite3")
 )
 RANK6_DB = os.getenv(
     "RANK6_DB_PATH",
-    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "accounts_rank6.sqlite3")
+    os.path.join(ROOT_DIR, "data", "accounts_rank6.sqlite3")
 )
 
+# Реестр разделов можно переопределить JSON-файлом (RANK_SECTIONS_FILE), например:
+# [{"key": "8", "title": "💥8 rank", "db_path": "db.sqlite3", "category": "WarThunder"},
+#  {"key": "5", "title": "🛩5 rank", "db_path": "data/accounts_rank5.sqlite3"}]
+# Относительные пути считаются от корня проекта. Новый раздел не требует правок кода:
+# его БД создаётся при старте (init_sections), кнопки строятся из реестра.
+SECTIONS_FILE = os.getenv("RANK_SECTIONS_FILE", os.path.join(ROOT_DIR, "data", "sections.json"))
+POOL_SIZE = int(os.getenv("RANK_POOL_SIZE", "4"))
+
+# Схема отдельной БД раздела (для основной БД схему держит app.db.MIGRATIONS)
+def _m1_rank_baseline(conn: sqlite3.Connection) -> None:
+    """Базовая схема раздела; идемпотентна для БД, созданных до версионирования (user_version=0)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT,
+            button_title TEXT NOT NULL,
+            creds TEXT NOT NULL,
+            photo_file_id TEXT,
+            caption TEXT,
+            price_rub INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'available',
+            created_by INTEGER,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    add_column(conn, "accounts", "created_by", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_status ON accounts(status)")
+    # остатки/агрегаты по цене (каталог) читаются только из индекса
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_status_price ON accounts(status, price_rub)")
+
+
+def _m4_rank_listing_indexes(conn: sqlite3.Connection) -> None:
+    # листинги по сортировкам (app.db.SORTS) — index-only range-scan; старые индексы — их префиксы
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_list_new ON accounts(status, id, button_title, price_rub)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_list_price ON accounts(status, price_rub, id, button_title)")
+    conn.execute("DROP INDEX IF EXISTS idx_accounts_status")
+    conn.execute("DROP INDEX IF EXISTS idx_accounts_status_price")
+
+
+RANK_MIGRATIONS: list[Migration] = [
+    _m1_rank_baseline,
+    create_accounts_archive,
+    create_accounts_fts,
+    _m4_rank_listing_indexes,
+]
+
+
+class RankSection:
+    """
+    Раздел витрины: где лежат лоты и как их фильтровать.
+    category задан — раздел делит таблицу accounts с другими (8 rank в основной БД);
+    None — вся таблица accounts файла принадлежит разделу.
+    SQL собирается один раз на раздел; чтение — из собственного пула раздела,
+    запись — через писателя основной БД (БД раздела у него подключена через ATTACH).
+    """
+
+    def __init__(self, key: str, title: str, db_path: str, category: Optional[str] = None):
+        self.key = str(key)
+        self.title = title
+        self.db_path = db_path if os.path.isabs(db_path) else os.path.join(ROOT_DIR, db_path)
+        self.category = category
+        # категория для новых лотов раздела
+        self.insert_category = category or f"{self.key} rank"
+
+        # именованные параметры: :category подставляется params() только там, где раздел её фильтрует
+        where = "status='available'" + (" AND category=:category" if category else "")
+        by_id = "id=:id" + (" AND category=:category" if category else "")
+        # массовые операции /change: id лежат во временной таблице писателя (см. _load_bulk_ids)
+        bulk = "id IN (SELECT id FROM temp.bulk_ids)" + (" AND category=:category" if category else "")
+        self._templates = {
+            "count": f"SELECT COUNT(*) FROM {{t}} WHERE {where}",
+            "get": f"SELECT * FROM {{t}} WHERE {by_id}",
+            "mark_sold": f"UPDATE {{t}} SET status='sold' WHERE {by_id} AND status='available'",
+            "delete": f"DELETE FROM {{t}} WHERE {by_id}",
+            "update_caption": f"UPDATE {{t}} SET caption=:caption WHERE {by_id}",
+            "bulk_delete": f"DELETE FROM {{t}} WHERE {bulk} RETURNING id",
+            "bulk_price": f"UPDATE {{t}} SET price_rub=:price WHERE {bulk} AND status='available'",
+            "bulk_price_pct": f"UPDATE {{t}} SET price_rub=MAX(1, CAST(ROUND(price_rub * (100 + :pct) / 100.0) AS INTEGER)) "
+                              f"WHERE {bulk} AND status='available'",
+            "bulk_select": f"SELECT id, button_title, creds, photo_file_id, caption, price_rub, created_by, created_at "
+                           f"FROM {{t}} WHERE {bulk} AND status='available' ORDER BY id",
+            "insert": "INSERT INTO {t}(category, button_title, creds, photo_file_id, caption, price_rub, status, created_by) "
+                      "VALUES (:category, :button_title, :creds, :photo_file_id, :caption, :price_rub, 'available', :created_by)",
+        }
+        # листинги: list:<sort>[:n|p] — первая страница и keyset вперёд/назад (app.db.SORTS)
+        for sort in SORTS:
+            for direction in (None, "n", "p"):
+                key = f"list:{sort}" + (f":{direction}" if direction else "")
+                self._templates[key] = listing_sql("id, button_title, price_rub", "{t}", where, sort, direction)
+        self._sql_by_schema: dict[str, dict[str, str]] = {}
+        self.sql = self.sql_in("main")
+
+    def sql_in(self, schema: str) -> dict[str, str]:
+        """Запросы раздела с таблицей <schema>.accounts (для ATTACH-соединений). Строятся один раз."""
+        sql = self._sql_by_schema.get(schema)
+        if sql is None:
+            table = "accounts" if schema == "main" else f"{schema}.accounts"
+            sql = self._sql_by_schema[schema] = {k: v.format(t=table) for k, v in self._templates.items()}
+        return sql
+
+    @property
+    def in_main_db(self) -> bool:
+        return os.path.abspath(self.db_path) == os.path.abspath(MAIN_DB)
+
+    @property
+    def attach_schema(self) -> str:
+        """Имя схемы раздела на соединениях основной БД (писатель, каталог): main или ATTACH-алиас."""
+        return "main" if self.in_main_db else f"sec_{self.key}"
+
+    @property
+    def write_sql(self) -> dict[str, str]:
+        """Запросы раздела для писателя основной БД (app.db._write), где БД разделов подключены через ATTACH."""
+        return self.sql_in(self.attach_schema)
+
+    def params(self, **params) -> dict:
+        """Параметры запроса + category раздела (лишние именованные параметры sqlite игнорирует)."""
+        params.setdefault("category", self.category)
+        return params
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(f"rank:{self.key}", self.db_path, size=POOL_SIZE)
+
+
+def _default_sections() -> list[RankSection]:
+    return [
+        RankSection("8", "💥8 rank", MAIN_DB, category="WarThunder"),
+        RankSection("7", "👾7 rank", RANK7_DB),
+        RankSection("6", "🤖6 rank", RANK6_DB),
+    ]
+
+
+def _load_sections() -> dict[str, RankSection]:
+    sections = _default_sections()
+    if os.path.exists(SECTIONS_FILE):
+        with open(SECTIONS_FILE, encoding="utf-8") as f:
+            sections = [RankSection(**item) for item in json.load(f)]
+        logger.info("rank sections loaded from %s: %s", SECTIONS_FILE, [s.key for s in sections])
+    return {s.key: s for s in sections}
+
+
+SECTIONS: dict[str, RankSection] = _load_sections()
+
+
+def get_section(rank: Rank) -> RankSection:
+    try:
+        return SECTIONS[str(rank)]
+    except KeyError:
+        raise ValueError(f"Unsupported rank: {rank}")
+
+
+def list_sections() -> list[RankSection]:
+    """Разделы в порядке реестра (для клавиатур)."""
+    return list(SECTIONS.values())
+
 
 def _db_path_for_rank(rank: Rank) -> str:
-    if rank == "8":
-        # текущие лоты 8 ранга — в основной БД
-        return MAIN_DB
-    if rank == "7":
-        return RANK7_DB
-    if rank == "6":
-        return RANK6_DB
-    raise ValueError("Unsupported rank")
+    return get_section(rank).db_path
+
+
+def init_rank_db(path: str) -> int:
+    """Довести схему отдельной БД раздела до актуальной версии (синхронно: вызывается из tools)."""
+    return migrate(path, RANK_MIGRATIONS, name=path)
+
+
+async def init_sections() -> None:
+    """Мигрировать БД всех разделов, кроме живущих в основной БД (её схему ведёт app.db.init_db)."""
+    for section in SECTIONS.values():
+        if not section.in_main_db:
+            await migrate_async(section.db_path, RANK_MIGRATIONS, name=f"rank:{section.key}")
 
 
 # ---------------------------------------------------------------------
 # LIST / COUNT
 # ---------------------------------------------------------------------
-async def list_available(rank: Rank, limit: int = 10, offset: int = 0) -> list[dict]:
+async def list_available(rank: Rank, limit: int = 10, offset: int = 0, *,
+                         sort: str = DEFAULT_SORT, cursor: Optional[tuple[str, int, int]] = None) -> list[dict]:
     """
-    Список доступных (status='available') аккаунтов для ранга.
-    Для 8 ранга это тоже сработает, но обычно вы используете функции из app.db.
+    Список доступных (status='available') аккаунтов раздела в порядке sort.
+    cursor (app.db.parse_cursor) — keyset-страница до/после граничного лота; без него — LIMIT/OFFSET.
     """
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            "SELECT id, button_title, price_rub FROM accounts "
-            "WHERE status='available' ORDER BY id DESC LIMIT ? OFFSET ?",
-            (limit, offset)
-        ) as cur:
-            rows = await cur.fetchall()
-            return [dict(r) for r in rows]
+    section = get_section(rank)
+    direction = cursor[0] if cursor else None
+    key = f"list:{sort}" + (f":{direction}" if direction else "")
+    async with section.pool.acquire() as db:
+        async with db.execute(section.sql[key], section.params(limit=limit, offset=offset, **_cursor_params(cursor))) as cur:
+            rows = [dict(r) for r in await cur.fetchall()]
+    # страница назад прочитана в обратном порядке
+    return rows[::-1] if direction == "p" else rows
 
 
 async def count_available(rank: Rank) -> int:
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
-        async with db.execute(
-            "SELECT COUNT(*) FROM accounts WHERE status='available'"
-        ) as cur:
+    section = get_section(rank)
+    async with section.pool.acquire() as db:
+        async with db.execute(section.sql["count"], section.params()) as cur:
             row = await cur.fetchone()
             return int(row[0]) if row else 0
 
@@ -67,22 +242,62 @@ async def count_available(rank: Rank) -> int:
 # GET / MARK SOLD / INSERT
 # ---------------------------------------------------------------------
 async def get_account(rank: Rank, acc_id: int) -> Optional[dict]:
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute("SELECT * FROM accounts WHERE id=?", (int(acc_id),)) as cur:
+    section = get_section(rank)
+    async with section.pool.acquire() as db:
+        async with db.execute(section.sql["get"], section.params(id=int(acc_id))) as cur:
             row = await cur.fetchone()
             return dict(row) if row else None
 
 
 async def mark_sold(rank: Rank, acc_id: int) -> None:
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
+    section = get_section(rank)
+
+    async def tx(db: aiosqlite.Connection) -> None:
+        await db.execute(section.write_sql["mark_sold"], section.params(id=int(acc_id)))
+
+    await _write(tx)
+
+
+async def purchase_account(rank: Rank, user_id: int, acc_id: int) -> dict:
+    """
+    Атомарная покупка лота любого раздела одним намерением писателя основной БД: БД раздела
+    у писателя подключена через ATTACH, и вся цепочка «проверить лот → проверить баланс →
+    списать (леджер) → пометить sold → записать в sales» идёт одной транзакцией на обе БД.
+    Возвращает:
+      {"status": "ok", "creds", "price_rub", "title"} | {"status": "insufficient"} |
+      {"status": "not_available"} | {"status": "error", "reason": "..."}
+    """
+    section = get_section(rank)
+    sql = section.write_sql
+
+    async def tx(db: aiosqlite.Connection) -> dict:
+        async with db.execute(sql["get"], section.params(id=int(acc_id))) as cur:
+            acc = await cur.fetchone()
+        if not acc or acc["status"] != "available":
+            return {"status": "not_available"}
+
+        price = int(acc["price_rub"])
+        async with db.execute("SELECT balance_rub FROM users WHERE user_id = ?", (user_id,)) as cur:
+            row = await cur.fetchone()
+        if not row or int(row[0]) < price:
+            return {"status": "insufficient"}
+
+        cur = await db.execute(sql["mark_sold"], section.params(id=int(acc_id)))
+        if cur.rowcount != 1:
+            return {"status": "not_available"}
+
+        await _apply_balance_delta(db, user_id, -price, "purchase", f"{section.key}:{acc_id}")
         await db.execute(
-            "UPDATE accounts SET status='sold' WHERE id=? AND status='available'",
-            (int(acc_id),)
+            "INSERT INTO sales(user_id, account_id, price_rub, rank, title, creds) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, int(acc_id), price, section.key, acc["button_title"], acc["creds"])
         )
-        await db.commit()
+        return {"status": "ok", "creds": acc["creds"], "price_rub": price, "title": acc["button_title"]}
+
+    try:
+        await _flush_users(user_id)  # покупатель мог ещё лежать в очереди ensure_user
+        return await _write(tx)
+    except Exception as e:
+        return {"status": "error", "reason": str(e)}
 
 
 async def insert_account(
@@ -94,43 +309,294 @@ async def insert_account(
     caption: str | None,
     price_rub: int,
     category: str | None = None,
+    created_by: int | None = None,
 ) -> int:
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
+    """Новый лот раздела. creds уже в инвентаре (любого раздела) — app.creds.DuplicateCredsError."""
+    section = get_section(rank)
+
+    async def tx(db: aiosqlite.Connection) -> int:
         cur = await db.execute(
-            "INSERT INTO accounts(category, button_title, creds, photo_file_id, caption, price_rub, status) "
-            "VALUES (?, ?, ?, ?, ?, ?, 'available')",
-            (category, button_title, creds, photo_file_id, caption, int(price_rub))
+            section.write_sql["insert"],
+            dict(category=category or section.insert_category, button_title=button_title, creds=creds,
+                 photo_file_id=photo_file_id, caption=caption, price_rub=int(price_rub), created_by=created_by)
         )
-        await db.commit()
+        await _index_creds(db, creds, section.key, cur.lastrowid)
         return cur.lastrowid
 
+    return await _write(tx)
+
+
+async def insert_accounts_bulk(rank: Rank, rows: list[dict], created_by: int | None = None) -> dict:
+    """
+    Пачка лотов в раздел одним намерением писателя (одна транзакция).
+    rows — dict с button_title/creds/price_rub и опционально caption/photo_file_id/category.
+    Лоты, чьи creds уже есть в инвентаре любого раздела (creds_index) или повторяются в пачке,
+    не вставляются. Возвращает {"inserted": int, "duplicates": set[str]} (creds как в rows).
+    """
+    section = get_section(rank)
+    hashes = [creds_hash(r["creds"]) for r in rows]
+
+    async def tx(db: aiosqlite.Connection) -> dict:
+        marks = ",".join("?" * len(hashes))
+        async with db.execute(f"SELECT creds_hash FROM main.creds_index WHERE creds_hash IN ({marks})", hashes) as cur:
+            taken = {r[0] for r in await cur.fetchall()}
+        duplicates: set[str] = set()
+        index_rows: list[tuple[bytes, str, int]] = []
+        for r, h in zip(rows, hashes):
+            if h in taken:
+                duplicates.add(r["creds"])
+                continue
+            taken.add(h)
+            cur = await db.execute(section.write_sql["insert"], dict(
+                category=r.get("category") or section.insert_category, button_title=r["button_title"],
+                creds=r["creds"], photo_file_id=r.get("photo_file_id"), caption=r.get("caption"),
+                price_rub=int(r["price_rub"]), created_by=created_by
+            ))
+            # id вставленной строки — её запись в creds_index (хеш уже посчитан выше)
+            index_rows.append((h, section.key, cur.lastrowid))
+        await db.executemany(
+            "INSERT INTO main.creds_index(creds_hash, rank, account_id) VALUES (?, ?, ?)", index_rows
+        )
+        return {"inserted": len(index_rows), "duplicates": duplicates}
+
+    if not rows:
+        return {"inserted": 0, "duplicates": set()}
+    return await _write(tx)
+
 
 # ---------------------------------------------------------------------
-# DELETE / UPDATE CAPTION  ← ЭТИХ ФУНКЦИЙ У ТЕБЯ НЕ ХВАТАЛО
+# DELETE / UPDATE CAPTION
 # ---------------------------------------------------------------------
 async def delete_account(rank: Rank, acc_id: int) -> bool:
     """
-    Удаление аккаунта (hard delete) для 7/6 рангов.
-    Для 8 ранга обычно используем app.db.delete_account, но тут тоже работает.
+    Удаление аккаунта (hard delete) из раздела.
     """
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
-        cur = await db.execute("DELETE FROM accounts WHERE id=?", (int(acc_id),))
-        await db.commit()
+    section = get_section(rank)
+
+    async def tx(db: aiosqlite.Connection) -> bool:
+        cur = await db.execute(section.write_sql["delete"], section.params(id=int(acc_id)))
+        if cur.rowcount > 0:
+            await _unindex_lot(db, section.key, acc_id)
         return cur.rowcount > 0
 
+    return await _write(tx)
+
 
 async def update_caption(rank: Rank, acc_id: int, caption: str) -> bool:
     """
-    Обновление описания аккаунта для 7/6 рангов.
-    Для 8 ранга обычно используем app.db.update_account_caption, но тут тоже работает.
+    Обновление описания аккаунта раздела.
     """
-    path = _db_path_for_rank(rank)
-    async with aiosqlite.connect(path) as db:
-        cur = await db.execute(
-            "UPDATE accounts SET caption=? WHERE id=?",
-            (caption, int(acc_id))
-        )
-        await db.commit()
+    section = get_section(rank)
+
+    async def tx(db: aiosqlite.Connection) -> bool:
+        cur = await db.execute(section.write_sql["update_caption"], section.params(id=int(acc_id), caption=caption))
         return cur.rowcount > 0
+
+    return await _write(tx)
+
+
+# ---------------------------------------------------------------------
+# CREDS INDEX (дубли login:password во всём инвентаре)
+# ---------------------------------------------------------------------
+CREDS_INDEX_BATCH = 1000  # строк на одно намерение писателя при наполнении черновика индекса
+
+
+async def scan_creds(rebuild: bool = True) -> dict:
+    """
+    Один проход по лотам всех разделов (accounts + архив): нормализованные creds -> группы дублей.
+    Чтение — на соединении каталога (все разделы ATTACH, одна read-транзакция), писателя не держит.
+    rebuild=True — заодно пересобрать creds_index (первый лот каждой группы занимает creds):
+    новый индекс копится во временной таблице писателя пачками по CREDS_INDEX_BATCH (между ними
+    проходят покупки и прочие записи), а подменяет рабочий одно намерение — creds_index ни на миг
+    не пустеет и продолжает отсекать дубли.
+    Возвращает {"lots": int, "duplicates": [[{"rank", "id", "status"}, ...], ...]}.
+    """
+    from app.catalog import _pool as catalog_pool  # app.catalog сам импортирует app.db_ranks
+
+    first: dict[bytes, tuple[str, int, dict]] = {}     # creds_hash -> первый лот (он и в индексе)
+    groups: dict[bytes, list[dict]] = {}
+    max_id: dict[str, int] = {}                         # раздел -> наибольший id в снимке
+    lots = 0
+    async with catalog_pool().acquire() as db:
+        await db.execute("BEGIN")  # один снимок на все разделы
+        try:
+            for section in list_sections():
+                schema = section.attach_schema
+                where = " WHERE category = :category" if section.category else ""
+                for table in ("accounts", "accounts_archive"):
+                    async with db.execute(
+                        f"SELECT id, status, creds FROM {schema}.{table}{where} ORDER BY id",
+                        {"category": section.category}
+                    ) as cur:
+                        async for acc_id, status, creds in cur:
+                            lots += 1
+                            max_id[section.key] = max(max_id.get(section.key, 0), acc_id)
+                            h = creds_hash(creds)
+                            lot = {"rank": section.key, "id": acc_id, "status": status}
+                            if h in groups:
+                                groups[h].append(lot)
+                            elif h in first:
+                                groups[h] = [first[h][2], lot]
+                            else:
+                                first[h] = (section.key, acc_id, lot)
+        finally:
+            await db.execute("COMMIT")
+
+    if rebuild:
+        await _rebuild_creds_index([(h, rank, acc_id) for h, (rank, acc_id, _) in first.items()], max_id)
+    return {"lots": lots, "duplicates": list(groups.values())}
+
+
+async def _rebuild_creds_index(rows: list[tuple[bytes, str, int]], max_id: dict[str, int]) -> None:
+    """
+    Подменить creds_index строками rows (снимок scan_creds). Черновик — temp.creds_index_rebuild
+    на соединении писателя (живёт вместе с ним, как temp.bulk_ids).
+    Лоты, занявшие creds уже после снимка (id выше max_id своего раздела: AUTOINCREMENT), переносятся
+    из рабочего индекса в черновик с приоритетом — их в снимке нет.
+    """
+    async def prepare(db: aiosqlite.Connection) -> None:
+        await db.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS creds_index_rebuild("
+            "creds_hash BLOB PRIMARY KEY, rank TEXT NOT NULL, account_id INTEGER NOT NULL)"
+        )
+        await db.execute("DELETE FROM temp.creds_index_rebuild")
+
+    await _write(prepare)
+    for i in range(0, len(rows), CREDS_INDEX_BATCH):
+        chunk = rows[i:i + CREDS_INDEX_BATCH]
+
+        async def fill(db: aiosqlite.Connection, chunk=chunk) -> None:
+            await db.executemany(
+                "INSERT OR IGNORE INTO temp.creds_index_rebuild(creds_hash, rank, account_id) VALUES (?, ?, ?)",
+                chunk
+            )
+
+        await _write(fill)
+
+    async def swap(db: aiosqlite.Connection) -> None:
+        for section in list_sections():
+            await db.execute(
+                "INSERT OR REPLACE INTO temp.creds_index_rebuild(creds_hash, rank, account_id) "
+                "SELECT creds_hash, rank, account_id FROM main.creds_index WHERE rank = ? AND account_id > ?",
+                (section.key, max_id.get(section.key, 0))
+            )
+        await db.execute("DELETE FROM main.creds_index")
+        await db.execute(
+            "INSERT INTO main.creds_index(creds_hash, rank, account_id) "
+            "SELECT creds_hash, rank, account_id FROM temp.creds_index_rebuild"
+        )
+        await db.execute("DELETE FROM temp.creds_index_rebuild")
+
+    await _write(swap)
+
+
+async def ensure_creds_index() -> None:
+    """
+    На старте: пустой creds_index (только что созданный миграцией) заполняется одним проходом.
+    Заполненный — одно чтение по первичному ключу.
+    """
+    async with _connect() as db:
+        async with db.execute("SELECT EXISTS(SELECT 1 FROM creds_index)") as cur:
+            filled = bool((await cur.fetchone())[0])
+    if not filled:
+        res = await scan_creds(rebuild=True)
+        if res["lots"]:
+            logger.info("creds_index built: %s lots, %s duplicate groups", res["lots"], len(res["duplicates"]))
+
+
+# ---------------------------------------------------------------------
+# BULK (/change: выбранные лоты одной транзакцией)
+# ---------------------------------------------------------------------
+async def _load_bulk_ids(db: aiosqlite.Connection, ids: list[int]) -> None:
+    """id выбранных лотов — во временную таблицу писателя (executemany); дальше работают set-based запросы."""
+    await db.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_ids(id INTEGER PRIMARY KEY)")
+    await db.execute("DELETE FROM temp.bulk_ids")
+    await db.executemany("INSERT OR IGNORE INTO temp.bulk_ids(id) VALUES (?)", [(int(i),) for i in ids])
+
+
+async def bulk_delete(rank: Rank, ids: list[int]) -> int:
+    """Удалить выбранные лоты раздела (hard delete) одним намерением писателя. Возвращает число удалённых."""
+    section = get_section(rank)
+
+    async def tx(db: aiosqlite.Connection) -> int:
+        await _load_bulk_ids(db, ids)
+        # RETURNING — creds освобождаем только у реально удалённых (чужая категория/раздел не трогается)
+        async with db.execute(section.write_sql["bulk_delete"], section.params()) as cur:
+            deleted = [r[0] for r in await cur.fetchall()]
+        await db.executemany(
+            "DELETE FROM main.creds_index WHERE rank = ? AND account_id = ?",
+            [(section.key, acc_id) for acc_id in deleted]
+        )
+        return len(deleted)
+
+    return await _write(tx) if ids else 0
+
+
+async def bulk_reprice(rank: Rank, ids: list[int], *, price: int | None = None, pct: int | None = None) -> int:
+    """
+    Новая цена выбранных доступных лотов: price — одна цена для всех, pct — изменение в процентах (+10 / -15).
+    Возвращает число изменённых лотов.
+    """
+    section = get_section(rank)
+    if price is not None:
+        sql, params = section.write_sql["bulk_price"], section.params(price=int(price))
+    elif pct is not None:
+        sql, params = section.write_sql["bulk_price_pct"], section.params(pct=int(pct))
+    else:
+        raise ValueError("price or pct required")
+
+    async def tx(db: aiosqlite.Connection) -> int:
+        await _load_bulk_ids(db, ids)
+        cur = await db.execute(sql, params)
+        return cur.rowcount
+
+    return await _write(tx) if ids else 0
+
+
+async def bulk_move(rank: Rank, to_rank: Rank, ids: list[int]) -> int:
+    """
+    Перенести выбранные доступные лоты в другой раздел одной транзакцией (обе БД на соединении писателя).
+    В новом разделе лоты получают новые id; запись creds_index лота переезжает вместе с ним.
+    Лот, чьи creds в индексе числятся за другим лотом, пропускается (остаётся на месте).
+    Возвращает число перенесённых лотов.
+    """
+    src, dst = get_section(rank), get_section(to_rank)
+    if src.key == dst.key:
+        return 0
+    dst_schema = dst.attach_schema
+
+    async def tx(db: aiosqlite.Connection) -> int:
+        await _load_bulk_ids(db, ids)
+        async with db.execute(src.write_sql["bulk_select"], src.params()) as cur:
+            rows = [dict(r) for r in await cur.fetchall()]
+        moved = 0
+        for r in rows:
+            h = creds_hash(r["creds"])
+            async with db.execute("SELECT rank, account_id FROM main.creds_index WHERE creds_hash = ?", (h,)) as cur:
+                owner = await cur.fetchone()
+            if owner is not None and (owner[0], owner[1]) != (src.key, r["id"]):
+                # creds числятся за другим лотом — этот не переносим и чужую запись индекса не трогаем
+                logger.warning("bulk move %s -> %s: lot %s skipped, creds held by rank %s id %s",
+                               src.key, dst.key, r["id"], owner[0], owner[1])
+                continue
+            cur = await db.execute(
+                f"INSERT INTO {dst_schema}.accounts(category, button_title, creds, photo_file_id, caption, price_rub, "
+                f"status, created_by, created_at) VALUES (:category, :button_title, :creds, :photo_file_id, :caption, "
+                f":price_rub, 'available', :created_by, :created_at)",
+                {**r, "category": dst.insert_category}
+            )
+            await db.execute(src.write_sql["delete"], src.params(id=r["id"]))
+            if owner is None:
+                await db.execute(
+                    "INSERT INTO main.creds_index(creds_hash, rank, account_id) VALUES (?, ?, ?)",
+                    (h, dst.key, cur.lastrowid)
+                )
+            else:
+                await db.execute(
+                    "UPDATE main.creds_index SET rank = ?, account_id = ? WHERE rank = ? AND account_id = ?",
+                    (dst.key, cur.lastrowid, src.key, r["id"])
+                )
+            moved += 1
+        return moved
+
+    return await _write(tx) if ids else 0
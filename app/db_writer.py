@@ -0,0 +1,150 @@
+# app/db_writer.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import aiosqlite
+
+from app.db_profile import apply_profile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# Намерение записи: корутина-функция, получает write-соединение и работает внутри уже открытой транзакции.
+# Сама не коммитит и не откатывает; исключение откатывает только её собственные изменения.
+WriteIntent = Callable[[aiosqlite.Connection], Awaitable[T]]
+
+MAX_BATCH = 64
+
+
+class DbWriter:
+    """
+    Единственный писатель файла БД: отдельная задача владеет write-соединением и забирает
+    намерения записи из очереди. Всё, что накопилось в очереди, идёт одной транзакцией
+    (group commit: один BEGIN IMMEDIATE и один fsync на пачку), каждое намерение — под своим
+    SAVEPOINT, чтобы ошибка одного не откатывала соседей. Вызывающий ждёт свой Future,
+    который завершается только после COMMIT.
+    Конкурирующих писателей нет — нет и «database is locked» между хендлерами.
+    """
+
+    def __init__(self, path: str, name: Optional[str] = None, max_batch: int = MAX_BATCH,
+                 on_connect: Optional[Callable[[aiosqlite.Connection], Awaitable[None]]] = None):
+        self.path = path
+        self.name = name or path
+        self.max_batch = max(1, max_batch)
+        self._on_connect = on_connect
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        # для бенчмарков/логов: сколько транзакций и намерений прошло
+        self.stats = {"batches": 0, "intents": 0}
+
+    async def submit(self, intent: WriteIntent[T]) -> T:
+        """Поставить намерение в очередь и дождаться его результата (после COMMIT пачки)."""
+        if self._closed:
+            raise RuntimeError(f"writer {self.name} is closed")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"db-writer:{self.name}")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((intent, fut))
+        return await fut
+
+    async def close(self) -> None:
+        """Дописать очередь и закрыть соединение."""
+        self._closed = True
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # isolation_level=None — транзакциями управляем сами (BEGIN/SAVEPOINT/COMMIT)
+        conn = await aiosqlite.connect(self.path, isolation_level=None)
+        conn.row_factory = aiosqlite.Row
+        await apply_profile(conn)
+        if self._on_connect:
+            await self._on_connect(conn)
+        return conn
+
+    async def _run(self) -> None:
+        try:
+            conn = await self._connect()
+        except Exception as e:
+            # не смогли открыть БД — ждущие получают ошибку, следующая запись попробует снова
+            self._task = None
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None and not item[1].done():
+                    item[1].set_exception(e)
+            return
+        try:
+            stop = False
+            while not stop:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                # group commit: забираем всё, что уже ждёт, не дожидаясь новых
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    nxt = self._queue.get_nowait()
+                    if nxt is None:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                await self._commit_batch(conn, batch)
+        finally:
+            await conn.close()
+
+    async def _commit_batch(self, conn: aiosqlite.Connection, batch: list) -> None:
+        outcomes: list[tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            for intent, fut in batch:
+                await conn.execute("SAVEPOINT intent")
+                try:
+                    result = await intent(conn)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO intent")
+                    await conn.execute("RELEASE intent")
+                    outcomes.append((fut, None, e))
+                else:
+                    await conn.execute("RELEASE intent")
+                    outcomes.append((fut, result, None))
+            await conn.execute("COMMIT")
+        except Exception as e:
+            logger.exception("writer %s: batch of %d failed", self.name, len(batch))
+            if conn.in_transaction:
+                await conn.execute("ROLLBACK")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["intents"] += len(batch)
+        for fut, result, exc in outcomes:
+            if fut.done():  # вызывающий отменён — результат никому не нужен
+                continue
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)
+
+
+_writers: dict[str, DbWriter] = {}
+
+
+def get_writer(key: str, path: str, **kwargs) -> DbWriter:
+    """Писатель по ключу (один на файл БД). Задача стартует при первой записи."""
+    writer = _writers.get(key)
+    if writer is None:
+        writer = _writers[key] = DbWriter(path, name=key, **kwargs)
+    return writer
+
+
+async def close_writers() -> None:
+    """Дописать очереди и закрыть писателей (при остановке бота, до close_pools)."""
+    writers = list(_writers.values())
+    _writers.clear()
+    for writer in writers:
+        await writer.close()
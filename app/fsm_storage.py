@@ -0,0 +1,215 @@
+# app/fsm_storage.py
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.db_migrate import Migration, migrate_async
+from app.db_pool import ConnectionPool, get_pool
+from app.db_writer import get_writer
+
+logger = logging.getLogger(__name__)
+
+# Отдельный файл: частые записи FSM не трогают писателя основной БД и не сбрасывают
+# кэш каталога (PRAGMA data_version основной БД, см. app/catalog.py)
+DB_PATH = os.getenv(
+    "FSM_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "fsm.sqlite3")
+)
+FSM_TTL_S = int(os.getenv("FSM_TTL_S", str(2 * 24 * 3600)))          # брошенное состояние живёт двое суток
+FSM_FLUSH_INTERVAL_S = float(os.getenv("FSM_FLUSH_INTERVAL_S", "1"))
+FSM_SWEEP_INTERVAL_S = float(os.getenv("FSM_SWEEP_INTERVAL_S", "600"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS fsm_states(
+      key        TEXT PRIMARY KEY,   -- bot:chat:user[:thread[:business[:destiny]]]
+      state      TEXT,
+      data       TEXT,               -- компактный JSON; пустые данные — NULL
+      updated_at INTEGER NOT NULL    -- unix-время последней записи (для TTL)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states(updated_at)",
+]
+
+# версии схемы (PRAGMA user_version): новые изменения — в конец списка
+MIGRATIONS: list[Migration] = [
+    BASELINE,
+]
+
+
+async def init() -> int:
+    return await migrate_async(DB_PATH, MIGRATIONS, name="fsm")
+
+
+def _key(key: StorageKey) -> str:
+    """Ключ строки: хвостовые поля по умолчанию (нет темы/бизнес-чата, destiny=default) не пишем."""
+    parts = [key.bot_id, key.chat_id, key.user_id, key.thread_id or "", key.business_connection_id or "",
+             "" if key.destiny == "default" else key.destiny]
+    while parts[-1] == "":
+        parts.pop()
+    return ":".join(map(str, parts))
+
+
+def _dumps(data: Mapping[str, Any]) -> Optional[str]:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")) if data else None
+
+
+# запись: (state, data JSON, updated_at)
+_Record = tuple[Optional[str], Optional[str], int]
+_EMPTY: _Record = (None, None, 0)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram на SQLite: состояния и черновики переживают перезапуск бота.
+
+    Процесс бота — единственный, кто пишет в fsm_states, поэтому своё состояние он знает точно:
+    - чтения — из LRU-кэша записей (FSM_CACHE_SIZE), промах — одно чтение по первичному ключу;
+    - записи сразу видны в кэше и копятся в _pending; фоновая задача (run_flusher) раз в
+      FSM_FLUSH_INTERVAL_S пишет всю пачку одним намерением писателя (upsert/delete через executemany).
+      Остановка бота досбрасывает пачку (close); при падении теряется не больше одного интервала;
+    - состояние без записей дольше FSM_TTL_S считается брошенным: при чтении его нет,
+      из файла его раз в FSM_SWEEP_INTERVAL_S удаляет тот же flusher.
+    """
+
+    def __init__(self, path: str = DB_PATH, ttl_s: int = FSM_TTL_S, cache_size: int = FSM_CACHE_SIZE):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._pending: Dict[str, _Record] = {}
+
+    # ---------- соединения ----------
+    def _pool(self) -> ConnectionPool:
+        return get_pool("fsm", self.path, size=2)
+
+    async def _write(self, intent) -> Any:
+        return await get_writer("fsm", self.path).submit(intent)
+
+    # ---------- записи ----------
+    def _alive(self, rec: _Record) -> _Record:
+        if rec[2] and rec[2] < time.time() - self.ttl_s:
+            return _EMPTY
+        return rec
+
+    def _remember(self, k: str, rec: _Record) -> None:
+        self._cache[k] = rec
+        self._cache.move_to_end(k)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _get(self, key: StorageKey) -> _Record:
+        k = _key(key)
+        rec = self._pending.get(k) or self._cache.get(k)
+        if rec is not None:
+            self._remember(k, rec)
+            return self._alive(rec)
+
+        async with self._pool().acquire() as db:
+            async with db.execute("SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (k,)) as cur:
+                row = await cur.fetchone()
+        rec = (row[0], row[1], row[2]) if row else _EMPTY
+        # пока читали, хендлер мог записать новое значение — оно главнее прочитанного
+        if k not in self._cache and k not in self._pending:
+            self._remember(k, rec)
+        return self._alive(self._pending.get(k) or self._cache.get(k) or rec)
+
+    async def _set(self, key: StorageKey, state: Optional[str], data: Optional[str]) -> None:
+        k = _key(key)
+        rec = (state, data, int(time.time()))
+        self._remember(k, rec)
+        self._pending[k] = rec
+
+    # ---------- BaseStorage ----------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data, _ = await self._get(key)
+        await self._set(key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        state, _, _ = await self._get(key)
+        # сериализуем здесь: несериализуемое значение — ошибка в хендлере, а не во flusher
+        await self._set(key, state, _dumps(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = (await self._get(key))[1]
+        return json.loads(data) if data else {}
+
+    async def close(self) -> None:
+        await self.flush()
+
+    # ---------- запись пачкой / TTL ----------
+    async def flush(self) -> int:
+        """Записать накопленные изменения одним намерением писателя. Возвращает число ключей."""
+        if not self._pending:
+            return 0
+        batch = list(self._pending.items())
+        self._pending.clear()
+        upserts = [(k, s, d, ts) for k, (s, d, ts) in batch if s is not None or d is not None]
+        deletes = [(k,) for k, (s, d, _) in batch if s is None and d is None]
+
+        async def tx(db) -> None:
+            if upserts:
+                await db.executemany(
+                    """
+                    INSERT INTO fsm_states(key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        state=excluded.state, data=excluded.data, updated_at=excluded.updated_at
+                    """,
+                    upserts
+                )
+            if deletes:
+                await db.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+
+        try:
+            await self._write(tx)
+        except Exception:
+            # вернуть в очередь то, что не перезаписано более свежим значением
+            for k, rec in batch:
+                self._pending.setdefault(k, rec)
+            raise
+        return len(batch)
+
+    async def sweep(self) -> int:
+        """Удалить брошенные состояния (без записей дольше ttl_s). Возвращает число удалённых строк."""
+        cutoff = int(time.time()) - self.ttl_s
+
+        async def tx(db) -> int:
+            cur = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (cutoff,))
+            return cur.rowcount
+
+        removed = await self._write(tx)
+        for k in [k for k, rec in self._cache.items() if rec[2] and rec[2] < cutoff]:
+            del self._cache[k]
+        if removed:
+            logger.info("fsm: swept %s abandoned states", removed)
+        return removed
+
+    async def run_flusher(self, interval_s: float = FSM_FLUSH_INTERVAL_S,
+                          sweep_interval_s: float = FSM_SWEEP_INTERVAL_S) -> None:
+        """Фоновая задача: пачка изменений раз в interval_s, чистка по TTL раз в sweep_interval_s."""
+        next_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.flush()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + sweep_interval_s
+                    await self.sweep()
+            except Exception:
+                logger.exception("fsm flush failed")
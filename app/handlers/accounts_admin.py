@@ -1,4 +1,5 @@
 # app/handlers/accounts_admin.py
+import io
 import os
 import re
 import logging
@@ -6,13 +7,15 @@ from dotenv import load_dotenv
 
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from aiogram.fsm.context import FSMContext
 
-from app.states.accounts import AddAccountStates
-from app.db import add_account  # для 8 rank (основная БД)
+from app.states.accounts import AddAccountStates, ImportAccountsStates
 from app.keyboards.admin_wt import admin_choose_rank_kb
-from app.db_ranks import insert_account as insert_account_rank  # для 7/6 rank
+from app.creds import DuplicateCredsError
+from app.db import find_creds
+from app.db_ranks import SECTIONS, get_section, insert_account as insert_account_rank, scan_creds
+from app.services.importer import import_accounts, report_csv
 
 # Подхватываем .env сразу (важно для ADMIN_USERNAMES)
 load_dotenv()
@@ -49,8 +52,11 @@ async def cmd_addacc(message: Message, state: FSMContext):
 
 @router.callback_query(F.data.startswith("admin:add:rank:"))
 async def admin_pick_rank(cb: CallbackQuery, state: FSMContext):
-    rank = cb.data.split(":")[-1]  # '8' | '7' | '6'
-    category = "WarThunder" if rank == "8" else f"{rank} rank"
+    rank = cb.data.split(":")[-1]  # ключ раздела из реестра
+    try:
+        category = get_section(rank).insert_category
+    except ValueError:
+        return await cb.answer("Раздел не найден — начните /addacc заново.", show_alert=True)
     await state.update_data(rank=rank, category=category)
     await state.set_state(AddAccountStates.waiting_creds)
     await cb.message.edit_text("Отправь логин и пароль в формате: <code>login:password</code>", parse_mode="HTML")
@@ -69,6 +75,12 @@ async def addacc_creds(message: Message, state: FSMContext):
     text = (message.text or "").strip()
     if ":" not in text or len(text.split(":", 1)) < 2:
         return await message.reply("Некорректно. Формат: <code>login:password</code>")
+    found = await find_creds(text)
+    if found:
+        return await message.reply(
+            f"⚠️ Такие данные уже есть: <b>{found['rank']} rank</b>, ID <code>{found['account_id']}</code>. "
+            "Отправь другие или /addacc заново."
+        )
     await state.update_data(creds=text)
     await message.reply("Теперь отправь НАЗВАНИЕ для кнопки (коротко).")
     await state.set_state(AddAccountStates.waiting_button_title)
@@ -101,7 +113,7 @@ async def addacc_photo_required(message: Message, state: FSMContext):
 
 # -------------------- Шаг 4: цена --------------------
 
-@router.message(AddAccountStates.waiting_price)
+@router.message(AddAccountStates.waiting_price, flags={"serialize": True})
 async def addacc_price(message: Message, state: FSMContext):
     try:
         price = int((message.text or "").strip())
@@ -121,17 +133,7 @@ async def addacc_price(message: Message, state: FSMContext):
     logger.info("Creating account: rank=%s cat=%s title=%r price=%s by=%s",
                 rank, category, button_title, price, message.from_user.id)
 
-    if rank == "8":
-        acc_id = await add_account(
-            category=category,
-            button_title=button_title,
-            creds=creds,
-            photo_file_id=photo_file_id,
-            caption=caption,
-            price_rub=price,
-            created_by=message.from_user.id
-        )
-    else:
+    try:
         acc_id = await insert_account_rank(
             rank,
             button_title=button_title,
@@ -139,7 +141,14 @@ async def addacc_price(message: Message, state: FSMContext):
             photo_file_id=photo_file_id,
             caption=caption,
             price_rub=price,
-            category=category
+            category=category,
+            created_by=message.from_user.id
+        )
+    except DuplicateCredsError as e:
+        # успели добавить те же creds, пока шёл диалог
+        await state.clear()
+        return await message.reply(
+            f"⚠️ Не добавлено: такие данные уже есть в <b>{e.rank} rank</b>, ID <code>{e.account_id}</code>."
         )
 
     await state.clear()
@@ -151,3 +160,115 @@ async def addacc_price(message: Message, state: FSMContext):
         f"Название: <b>{button_title}</b>\n"
         f"Цена: <b>{price} ₽</b>"
     )
+
+# -------------------- Массовая загрузка: /importacc --------------------
+
+IMPORT_MAX_BYTES = 5 * 1024 * 1024
+
+def _import_help(rank: str) -> str:
+    return (
+        f"Раздел: <b>{rank} rank</b>. Пришли документ .txt или .csv.\n"
+        "Строки: <code>login:password | название | цена</code> (разделитель | ; или таб),\n"
+        "или CSV с заголовком <code>creds,title,price[,caption]</code>.\n"
+        "Подпись к документу <code>название | цена</code> — для строк, где их нет."
+    )
+
+@router.message(Command("importacc"))
+async def cmd_importacc(message: Message, state: FSMContext):
+    """/importacc [rank] → документ .txt/.csv (подпись «название | цена» — значения по умолчанию)."""
+    if not _is_admin(message):
+        return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
+    await state.clear()
+    parts = (message.text or "").split()
+    if len(parts) > 1 and parts[1] in SECTIONS:
+        await state.update_data(rank=parts[1])
+        await state.set_state(ImportAccountsStates.waiting_document)
+        return await message.reply(_import_help(parts[1]))
+    await state.set_state(ImportAccountsStates.waiting_rank)
+    await message.reply("Выбери раздел (rank) для загрузки:", reply_markup=admin_choose_rank_kb("import"))
+
+@router.callback_query(F.data.startswith("admin:import:rank:"))
+async def admin_import_pick_rank(cb: CallbackQuery, state: FSMContext):
+    rank = cb.data.split(":")[-1]
+    try:
+        get_section(rank)
+    except ValueError:
+        return await cb.answer("Раздел не найден — начните /importacc заново.", show_alert=True)
+    await state.update_data(rank=rank)
+    await state.set_state(ImportAccountsStates.waiting_document)
+    await cb.message.edit_text(_import_help(rank), parse_mode="HTML")
+    await cb.answer()
+
+@router.callback_query(F.data == "admin:import:cancel")
+async def admin_import_cancel(cb: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await cb.message.edit_text("Отменено.")
+    await cb.answer()
+
+@router.message(ImportAccountsStates.waiting_document, F.document, flags={"serialize": True})
+async def importacc_document(message: Message, state: FSMContext):
+    doc = message.document
+    if doc.file_size and doc.file_size > IMPORT_MAX_BYTES:
+        return await message.reply(f"Файл больше {IMPORT_MAX_BYTES // (1024 * 1024)} МБ — раздели на части.")
+
+    rank = (await state.get_data()).get("rank", "8")
+    default_title, default_price = None, None
+    if message.caption:
+        title, _, price = message.caption.partition("|")
+        default_title = title.strip() or None
+        default_price = int(price) if price.strip().isdigit() else None
+
+    buf = await message.bot.download(doc, destination=io.BytesIO())
+    # декодируем целиком до вставки: пачки коммитятся по одной, ошибка посреди файла
+    # оставила бы часть лотов в инвентаре
+    try:
+        text = buf.getvalue().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return await message.reply("Файл должен быть в UTF-8.")
+    res = await import_accounts(
+        rank,
+        io.StringIO(text),
+        default_title=default_title,
+        default_price=default_price,
+        created_by=message.from_user.id,
+    )
+
+    logger.info("Bulk import: rank=%s file=%r by=%s -> %s", rank, doc.file_name, message.from_user.id,
+                {k: v for k, v in res.items() if k != "report"})
+    await state.clear()
+    await message.reply(
+        "📥 Загрузка завершена.\n"
+        f"Раздел: <b>{rank} rank</b>\n"
+        f"Строк: <b>{res['total']}</b>\n"
+        f"Добавлено: <b>{res['added']}</b>\n"
+        f"Дубли: <b>{res['duplicates']}</b>\n"
+        f"Ошибки: <b>{res['errors']}</b>"
+    )
+    if res["report"]:
+        await message.reply_document(
+            BufferedInputFile(report_csv(res["report"]).encode("utf-8"), filename=f"import_report_{rank}.csv"),
+            caption="Отчёт по строкам, которые не загружены",
+        )
+
+@router.message(ImportAccountsStates.waiting_document)
+async def importacc_document_required(message: Message, state: FSMContext):
+    await message.reply("Нужен документ .txt или .csv со строками лотов.")
+
+# -------------------- Дубли creds: /dupes --------------------
+
+@router.message(Command("dupes"))
+async def cmd_dupes(message: Message):
+    """Один проход по инвентарю всех разделов: одинаковые login:password в разных лотах."""
+    if not _is_admin(message):
+        return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
+    res = await scan_creds(rebuild=False)
+    groups = res["duplicates"]
+    if not groups:
+        return await message.reply(f"✅ Дублей нет. Проверено лотов: <b>{res['lots']}</b>.")
+
+    lines = [f"⚠️ Групп дублей: <b>{len(groups)}</b> (лотов проверено: {res['lots']})"]
+    for group in groups[:20]:
+        lines.append(" = ".join(f"{g['rank']}:{g['id']} ({g['status']})" for g in group))
+    if len(groups) > 20:
+        lines.append(f"… и ещё {len(groups) - 20}")
+    await message.reply("\n".join(lines))
@@ -31,6 +31,10 @@ def _is_admin(msg: Message) -> bool:
     uname = (msg.from_user.username or "").lower()
     return uname in admins
 
+def _admin_ref(msg: Message) -> str:
+    """Кто из админов изменил баланс — пишется в ref записи леджера."""
+    return f"@{msg.from_user.username or msg.from_user.id}"
+
 def _parse_text_args(text: str):
     # Форматы: "дать username 100" или "забрать @username 50"
     m = re.match(r"^\s*(?:дать|забрать)\s+@?([A-Za-z0-9_]{5,32})\s+(\d+)\s*$", text, flags=re.IGNORECASE)
@@ -41,7 +45,7 @@ def _parse_text_args(text: str):
     return uname, amount
 
 # ---------- /give ----------
-@router.message(Command("give"))
+@router.message(Command("give"), flags={"serialize": True})
 async def cmd_give(message: Message):
     if not _is_admin(message):
         return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
@@ -60,11 +64,11 @@ async def cmd_give(message: Message):
     if not user:
         return await message.reply(f"Пользователь @{uname} не найден (не писал боту).")
 
-    new_balance, applied = await add_balance_rub_by_username(uname, amount)
+    new_balance, applied = await add_balance_rub_by_username(uname, amount, ref=_admin_ref(message))
     await message.reply(f"✅ Выдал @{uname} +{applied} ₽\nНовый баланс: {new_balance} ₽")
 
 # ---------- /take ----------
-@router.message(Command("take"))
+@router.message(Command("take"), flags={"serialize": True})
 async def cmd_take(message: Message):
     if not _is_admin(message):
         return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
@@ -83,11 +87,11 @@ async def cmd_take(message: Message):
     if not user:
         return await message.reply(f"Пользователь @{uname} не найден (не писал боту).")
 
-    new_balance, applied = await add_balance_rub_by_username(uname, -amount)  # applied отрицательный
+    new_balance, applied = await add_balance_rub_by_username(uname, -amount, ref=_admin_ref(message))  # applied отрицательный
     await message.reply(f"✅ Забрал у @{uname} {-applied} ₽\nНовый баланс: {new_balance} ₽")
 
 # ---------- Текст «дать ...» ----------
-@router.message(F.text.regexp(re.compile(r"(?i)^дать\s+@?[A-Za-z0-9_]{5,32}\s+\d+$")))
+@router.message(F.text.regexp(re.compile(r"(?i)^дать\s+@?[A-Za-z0-9_]{5,32}\s+\d+$")), flags={"serialize": True})
 async def txt_give(message: Message):
     if not _is_admin(message):
         return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
@@ -99,11 +103,11 @@ async def txt_give(message: Message):
     if not user:
         return await message.reply(f"Пользователь @{uname} не найден (не писал боту).")
 
-    new_balance, applied = await add_balance_rub_by_username(uname, amount)
+    new_balance, applied = await add_balance_rub_by_username(uname, amount, ref=_admin_ref(message))
     await message.reply(f"✅ Выдал @{uname} +{applied} ₽\nНовый баланс: {new_balance} ₽")
 
 # ---------- Текст «забрать ...» ----------
-@router.message(F.text.regexp(re.compile(r"(?i)^забрать\s+@?[A-Za-z0-9_]{5,32}\s+\d+$")))
+@router.message(F.text.regexp(re.compile(r"(?i)^забрать\s+@?[A-Za-z0-9_]{5,32}\s+\d+$")), flags={"serialize": True})
 async def txt_take(message: Message):
     if not _is_admin(message):
         return await message.reply("⛔ Нет доступа. Настрой ADMIN_USERNAMES в .env")
@@ -115,5 +119,5 @@ async def txt_take(message: Message):
     if not user:
         return await message.reply(f"Пользователь @{uname} не найден (не писал боту).")
 
-    new_balance, applied = await add_balance_rub_by_username(uname, -amount)
+    new_balance, applied = await add_balance_rub_by_username(uname, -amount, ref=_admin_ref(message))
     await message.reply(f"✅ Забрал у @{uname} {-applied} ₽\nНовый баланс: {new_balance} ₽")
@@ -69,7 +69,7 @@ async def cancel_broadcast(cq: CallbackQuery, state: FSMContext):
     await cq.message.edit_text("Рассылка отменена.")
     await cq.answer()
 
-@router.callback_query(BroadcastStates.confirm, F.data == "broadcast:send")
+@router.callback_query(BroadcastStates.confirm, F.data == "broadcast:send", flags={"serialize": "drop"})
 async def do_broadcast(cq: CallbackQuery, state: FSMContext):
     if not await is_admin(cq.from_user.id):
         return await cq.answer("Только для админов", show_alert=True)
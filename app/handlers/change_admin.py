@@ -10,20 +10,18 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.exceptions import TelegramBadRequest
 
+from app.db import edge_cursor, parse_cursor
 from app.keyboards.wt import wt_ranks_keyboard
-from app.db import (
-    list_accounts as list_rank8_accounts,
-    count_accounts as count_rank8_accounts,
-    get_account_by_id as get_rank8_account,
-    delete_account as delete_rank8_account,
-    update_account_caption as update_rank8_caption,
-)
 from app.db_ranks import (
     list_available as list_rank_accounts,
     count_available as count_rank_accounts,
     get_account as get_rank_account,
     delete_account as delete_rank_account,
     update_caption as update_rank_caption,
+    bulk_delete,
+    bulk_move,
+    bulk_reprice,
+    list_sections,
 )
 logger = logging.getLogger(__name__)
 router = Router(name="change_admin")
@@ -33,6 +31,7 @@ router = Router(name="change_admin")
 class ChangeLotFSM(StatesGroup):
     waiting_rank = State()
     waiting_new_caption = State()
+    waiting_bulk_price = State()
 
 
 # -------------------- checks --------------------
@@ -41,94 +40,200 @@ def _admin_unames() -> set[str]:
     parts = re.split(r"[\s,]+", raw.strip())
     return {p.lower() for p in parts if p}
 
-def _is_admin(msg: Message) -> bool:
+def _is_admin(event: Message | CallbackQuery) -> bool:
     admins = _admin_unames()
     if not admins:
         logger.error("ADMIN_USERNAMES пуст — /change недоступна.")
         return False
-    uname = (msg.from_user.username or "").lower()
+    uname = (event.from_user.username or "").lower()
     return uname in admins
 
+async def _admin_or_alert(cb: CallbackQuery) -> bool:
+    """Массовые действия (chg:b*): callback_data подделывается, поэтому права проверяем у каждого нажатия."""
+    if _is_admin(cb):
+        return True
+    logger.warning("chg bulk callback %r from non-admin user=%s", cb.data, cb.from_user.id)
+    await cb.answer("⛔ Нет доступа.", show_alert=True)
+    return False
+
 
 # -------------------- keyboards --------------------
-def _lots_kb(rank: str, items: list[dict], page: int, pages: int) -> InlineKeyboardMarkup:
+# Режим выбора: отмеченные лоты (FSM data "selected") можно собирать по всем страницам раздела
+# и затем удалить / переоценить / перенести одной транзакцией.
+SEL_ON, SEL_OFF = "✅ ", "⬜ "
+
+# Место в списке в callback_data: "<page>" или "<page>:<курсор>" (n<price>.<id> / p<price>.<id>,
+# app.db.parse_cursor) — keyset как у витрины: пока лоты раскупают, страница не сдвигается.
+def _loc(page: int, cursor: tuple[str, int, int] | None) -> str:
+    return f"{page}:{cursor[0]}{cursor[1]}.{cursor[2]}" if cursor else str(page)
+
+def _parse_loc(loc: str) -> tuple[int, tuple[str, int, int] | None]:
+    page_str, _, token = loc.partition(":")
+    return int(page_str), parse_cursor(token)
+
+def _lots_kb(rank: str, items: list[dict], page: int, pages: int,
+             selected: set[int] | None = None,
+             cursor: tuple[str, int, int] | None = None) -> InlineKeyboardMarkup:
+    loc = _loc(page, cursor)
     rows: list[list[InlineKeyboardButton]] = []
     for it in items:
-        rows.append([InlineKeyboardButton(
-            text=f"#{it['id']} — {it.get('button_title','')} — {it.get('price_rub','')}₽",
-            callback_data=f"chg:item:{rank}:{it['id']}:{page}"
-        )])
+        text = f"#{it['id']} — {it.get('button_title','')} — {it.get('price_rub','')}₽"
+        if selected is None:
+            rows.append([InlineKeyboardButton(text=text, callback_data=f"chg:item:{rank}:{it['id']}:{loc}")])
+        else:
+            mark = SEL_ON if it["id"] in selected else SEL_OFF
+            rows.append([InlineKeyboardButton(text=mark + text, callback_data=f"chg:tog:{rank}:{it['id']}:{loc}")])
+    # соседние страницы — keyset от крайних лотов этой
     nav = []
     if page > 1:
-        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"chg:page:{rank}:{page-1}"))
+        prev_loc = _loc(page - 1, edge_cursor("p", items[0]))
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"chg:page:{rank}:{prev_loc}"))
     nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data="chg:nop"))
     if page < pages:
-        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"chg:page:{rank}:{page+1}"))
+        next_loc = _loc(page + 1, edge_cursor("n", items[-1]))
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"chg:page:{rank}:{next_loc}"))
     if nav:
         rows.append(nav)
+    if selected is None:
+        rows.append([InlineKeyboardButton(text="☑️ Выбрать несколько", callback_data=f"chg:selmode:{rank}:{loc}")])
+    else:
+        n = len(selected)
+        rows.append([
+            InlineKeyboardButton(text="☑️ Вся страница", callback_data=f"chg:selpage:{rank}:{loc}"),
+            InlineKeyboardButton(text="✖️ Снять всё", callback_data=f"chg:selnone:{rank}:{loc}"),
+        ])
+        rows.append([
+            InlineKeyboardButton(text=f"🗑 Удалить ({n})", callback_data=f"chg:bdel:{rank}:{loc}"),
+            InlineKeyboardButton(text=f"💰 Цена ({n})", callback_data=f"chg:bprice:{rank}:{loc}"),
+            InlineKeyboardButton(text=f"📦 Перенести ({n})", callback_data=f"chg:bmove:{rank}:{loc}"),
+        ])
+        rows.append([InlineKeyboardButton(text="↩️ Выйти из выбора", callback_data=f"chg:selexit:{rank}:{loc}")])
     rows.append([InlineKeyboardButton(text="⬅️ Ранги", callback_data="chg:ranks")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
-def _lot_actions_kb(rank: str, acc_id: int, page: int) -> InlineKeyboardMarkup:
+def _remark_kb(kb: InlineKeyboardMarkup, selected: set[int]) -> InlineKeyboardMarkup:
+    """Перерисовать отметки и счётчики в уже показанной клавиатуре — без запросов к БД."""
+    rows = []
+    for row in kb.inline_keyboard:
+        new_row = []
+        for b in row:
+            data, text = b.callback_data or "", b.text
+            if data.startswith("chg:tog:"):
+                acc_id = int(data.split(":")[3])
+                text = (SEL_ON if acc_id in selected else SEL_OFF) + text[len(SEL_ON):]
+            elif data.startswith(("chg:bdel:", "chg:bprice:", "chg:bmove:")):
+                text = re.sub(r"\(\d+\)$", f"({len(selected)})", text)
+            new_row.append(InlineKeyboardButton(text=text, callback_data=data))
+        rows.append(new_row)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def _page_ids(kb: InlineKeyboardMarkup) -> list[int]:
+    return [int(b.callback_data.split(":")[3]) for row in kb.inline_keyboard for b in row
+            if (b.callback_data or "").startswith("chg:tog:")]
+
+def _move_kb(rank: str, loc: str) -> InlineKeyboardMarkup:
+    rows = [
+        [InlineKeyboardButton(text=f"→ {s.title}", callback_data=f"chg:bmoveto:{rank}:{s.key}:{loc}")]
+        for s in list_sections() if s.key != rank
+    ]
+    rows.append([InlineKeyboardButton(text="❌ Отмена", callback_data=f"chg:page:{rank}:{loc}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def _lot_actions_kb(rank: str, acc_id: int, loc: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📝 Изменить описание", callback_data=f"chg:editcap:{rank}:{acc_id}:{page}")],
-        [InlineKeyboardButton(text="🗑 Удалить", callback_data=f"chg:del:{rank}:{acc_id}:{page}")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data=f"chg:page:{rank}:{page}")]
+        [InlineKeyboardButton(text="📝 Изменить описание", callback_data=f"chg:editcap:{rank}:{acc_id}:{loc}")],
+        [InlineKeyboardButton(text="🗑 Удалить", callback_data=f"chg:del:{rank}:{acc_id}:{loc}")],
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data=f"chg:page:{rank}:{loc}")]
     ])
 
 
+def _ranks_kb() -> InlineKeyboardMarkup:
+    # свои callback_data: кнопки витрины (WT_PAGE) перехватил бы роутер магазина
+    return wt_ranks_keyboard(rank_cb=lambda key: f"chg:rank:{key}")
+
+
 # -------------------- entry --------------------
 @router.message(Command("change"))
 async def change_entry(msg: Message, state: FSMContext):
     if not _is_admin(msg):
         return await msg.reply("⛔ Нет доступа.")
     await state.set_state(ChangeLotFSM.waiting_rank)
-    await msg.answer("Выбери раздел (rank) для редактирования:", reply_markup=wt_ranks_keyboard())
+    await state.update_data(select_mode=False, selected=[])
+    await msg.answer("Выбери раздел (rank) для редактирования:", reply_markup=_ranks_kb())
 
 
 @router.callback_query(F.data == "chg:ranks")
 async def back_to_ranks(cb: CallbackQuery, state: FSMContext):
     await state.set_state(ChangeLotFSM.waiting_rank)
     try:
-        await cb.message.edit_text("Выбери раздел (rank) для редактирования:", reply_markup=wt_ranks_keyboard())
+        await cb.message.edit_text("Выбери раздел (rank) для редактирования:", reply_markup=_ranks_kb())
     except TelegramBadRequest:
-        await cb.message.answer("Выбери раздел (rank) для редактирования:", reply_markup=wt_ranks_keyboard())
+        await cb.message.answer("Выбери раздел (rank) для редактирования:", reply_markup=_ranks_kb())
     await cb.answer()
 
 
 # -------------------- list pages --------------------
-@router.callback_query(F.data.startswith("wt:rank:"), ChangeLotFSM.waiting_rank)
+@router.callback_query(F.data.startswith("chg:rank:"), ChangeLotFSM.waiting_rank)
 async def chg_pick_rank(cb: CallbackQuery, state: FSMContext):
     _, _, rank = cb.data.split(":")
     await state.update_data(rank=rank)
     await _render_list(cb, rank=rank, page=1)
 
 @router.callback_query(F.data.startswith("chg:page:"))
-async def chg_page(cb: CallbackQuery):
-    _, _, rank, page_str = cb.data.split(":")
-    await _render_list(cb, rank=rank, page=int(page_str))
+async def chg_page(cb: CallbackQuery, state: FSMContext):
+    _, _, rank, loc = cb.data.split(":", 3)
+    page, cursor = _parse_loc(loc)
+    await _render_list(cb, rank=rank, page=page, cursor=cursor, state=state)
 
 
-async def _render_list(cb: CallbackQuery, *, rank: str, page: int):
+async def _selection(state: FSMContext | None, rank: str) -> set[int] | None:
+    """Отмеченные лоты раздела, если включён режим выбора (иначе None)."""
+    if state is None:
+        return None
+    data = await state.get_data()
+    if not data.get("select_mode") or data.get("sel_rank") != rank:
+        return None
+    return set(data.get("selected") or [])
+
+
+async def _list_view(rank: str, page: int, selected: set[int] | None,
+                     cursor: tuple[str, int, int] | None = None) -> tuple[str, InlineKeyboardMarkup, int] | None:
+    """
+    (заголовок, клавиатура, всего страниц) страницы списка или None, если раздел пуст.
+    cursor — keyset от соседней страницы (app.db.edge_cursor); без него (первая страница,
+    старые кнопки) — OFFSET.
+    """
     per_page = 10
-    if rank == "8":
-        total = await count_rank8_accounts("WarThunder")
-        items = await list_rank8_accounts("WarThunder", limit=per_page, offset=(page-1)*per_page)
-    else:
-        total = await count_rank_accounts(rank)
-        items = await list_rank_accounts(rank, limit=per_page, offset=(page-1)*per_page)
-
+    total = await count_rank_accounts(rank)
     if total == 0:
-        await cb.answer(f"Раздел {rank} rank пуст.", show_alert=True)
-        return
-
+        return None
     pages = max(1, (total + per_page - 1)//per_page)
+    page = min(page, pages)
+    offset = 0 if cursor else (page-1)*per_page
+    items = await list_rank_accounts(rank, limit=per_page, offset=offset, cursor=cursor)
+    if cursor and (not items or (cursor[0] == "p" and len(items) < per_page)):
+        # лоты раскупили или назад упёрлись в начало — показываем первую страницу
+        page, cursor = 1, None
+        items = await list_rank_accounts(rank, limit=per_page)
+    if not items:
+        return None
+    header = f"Редактирование: {rank} rank ({total} шт.)"
+    if selected is not None:
+        header += "\nРежим выбора: отметь лоты на любых страницах, затем выбери действие."
+    return header, _lots_kb(rank, items, page, pages, selected, cursor), pages
+
+
+async def _render_list(cb: CallbackQuery, *, rank: str, page: int, cursor: tuple[str, int, int] | None = None,
+                       state: FSMContext | None = None, notice: str | None = None):
+    view = await _list_view(rank, page, await _selection(state, rank), cursor)
+    if view is None:
+        await cb.answer(notice or f"Раздел {rank} rank пуст.", show_alert=True)
+        return
+    header, kb, pages = view
     if page > pages:
         await cb.answer(f"Страницы {page} не существует", show_alert=True)
         return
 
-    kb = _lots_kb(rank, items, page, pages)
-    header = f"Редактирование: {rank} rank ({total} шт.)"
     try:
         if (cb.message.text or ""):
             if cb.message.text == header:
@@ -139,17 +244,16 @@ async def _render_list(cb: CallbackQuery, *, rank: str, page: int):
             await cb.message.answer(header, reply_markup=kb)
     except TelegramBadRequest:
         await cb.message.answer(header, reply_markup=kb)
-    await cb.answer()
+    await cb.answer(notice, show_alert=bool(notice))
 
 
 # -------------------- lot card with admin actions --------------------
 @router.callback_query(F.data.startswith("chg:item:"))
 async def chg_item(cb: CallbackQuery):
-    _, _, rank, acc_id_str, page_str = cb.data.split(":")
+    _, _, rank, acc_id_str, loc = cb.data.split(":", 4)
     acc_id = int(acc_id_str)
-    page = int(page_str)
 
-    row = await (get_rank8_account(acc_id) if rank == "8" else get_rank_account(rank, acc_id))
+    row = await get_rank_account(rank, acc_id)
     if not row:
         await cb.answer("Лот не найден.", show_alert=True)
         return
@@ -163,7 +267,7 @@ async def chg_item(cb: CallbackQuery):
         f"Rank: {rank}\n\n"
         f"{caption or '<i>Описание отсутствует</i>'}"
     )
-    kb = _lot_actions_kb(rank, acc_id, page)
+    kb = _lot_actions_kb(rank, acc_id, loc)
 
     try:
         if (cb.message.text or ""):
@@ -176,17 +280,14 @@ async def chg_item(cb: CallbackQuery):
 
 
 # -------------------- delete --------------------
-@router.callback_query(F.data.startswith("chg:del:"))
+@router.callback_query(F.data.startswith("chg:del:"), flags={"serialize": True})
 async def chg_delete(cb: CallbackQuery):
-    _, _, rank, acc_id_str, page_str = cb.data.split(":")
+    _, _, rank, acc_id_str, loc = cb.data.split(":", 4)
     acc_id = int(acc_id_str)
-    page = int(page_str)
+    page, cursor = _parse_loc(loc)
 
     # реальное удаление (hard delete). Если хочешь soft — поменяй на статус hidden.
-    if rank == "8":
-        ok = await delete_rank8_account(acc_id)
-    else:
-        ok = await delete_rank_account(rank, acc_id)
+    ok = await delete_rank_account(rank, acc_id)
 
     if not ok:
         await cb.answer("Не удалось удалить (возможно, уже удалён).", show_alert=True)
@@ -194,19 +295,161 @@ async def chg_delete(cb: CallbackQuery):
 
     await cb.answer("Лот удалён.", show_alert=True)
     # перерисуем список
-    await _render_list(cb, rank=rank, page=page)
+    await _render_list(cb, rank=rank, page=page, cursor=cursor)
+
+
+# -------------------- multi-select --------------------
+@router.callback_query(F.data.startswith("chg:selmode:"))
+async def chg_select_mode(cb: CallbackQuery, state: FSMContext):
+    _, _, rank, loc = cb.data.split(":", 3)
+    page, cursor = _parse_loc(loc)
+    await state.update_data(select_mode=True, sel_rank=rank, selected=[])
+    await _render_list(cb, rank=rank, page=page, cursor=cursor, state=state)
+
+@router.callback_query(F.data.startswith("chg:selexit:"))
+async def chg_select_exit(cb: CallbackQuery, state: FSMContext):
+    _, _, rank, loc = cb.data.split(":", 3)
+    page, cursor = _parse_loc(loc)
+    await state.update_data(select_mode=False, selected=[])
+    await _render_list(cb, rank=rank, page=page, cursor=cursor, state=state)
+
+async def _update_selection(cb: CallbackQuery, state: FSMContext, selected: set[int]) -> None:
+    await state.update_data(selected=sorted(selected))
+    try:
+        await cb.message.edit_reply_markup(reply_markup=_remark_kb(cb.message.reply_markup, selected))
+    except TelegramBadRequest:
+        pass  # отметки не изменились
+    await cb.answer(f"Выбрано: {len(selected)}")
+
+@router.callback_query(F.data.startswith("chg:tog:"), flags={"serialize": True})
+async def chg_toggle(cb: CallbackQuery, state: FSMContext):
+    acc_id = int(cb.data.split(":")[3])
+    selected = set((await state.get_data()).get("selected") or [])
+    selected ^= {acc_id}
+    await _update_selection(cb, state, selected)
+
+@router.callback_query(F.data.startswith("chg:selpage:"), flags={"serialize": True})
+async def chg_select_page(cb: CallbackQuery, state: FSMContext):
+    selected = set((await state.get_data()).get("selected") or [])
+    selected |= set(_page_ids(cb.message.reply_markup))
+    await _update_selection(cb, state, selected)
+
+@router.callback_query(F.data.startswith("chg:selnone:"), flags={"serialize": True})
+async def chg_select_none(cb: CallbackQuery, state: FSMContext):
+    await _update_selection(cb, state, set())
+
+async def _selected_or_alert(cb: CallbackQuery, state: FSMContext) -> list[int]:
+    selected = (await state.get_data()).get("selected") or []
+    if not selected:
+        await cb.answer("Ничего не выбрано.", show_alert=True)
+    return selected
+
+async def _bulk_done(cb: CallbackQuery, state: FSMContext, rank: str, text: str) -> None:
+    await state.update_data(select_mode=False, selected=[])
+    await _render_list(cb, rank=rank, page=1, state=state, notice=text)
+
+@router.callback_query(F.data.startswith("chg:bdel:"))
+async def chg_bulk_delete_confirm(cb: CallbackQuery, state: FSMContext):
+    if not await _admin_or_alert(cb):
+        return
+    _, _, rank, loc = cb.data.split(":", 3)
+    selected = await _selected_or_alert(cb, state)
+    if not selected:
+        return
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"🗑 Да, удалить {len(selected)}", callback_data=f"chg:bdelok:{rank}:{loc}")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data=f"chg:page:{rank}:{loc}")],
+    ])
+    await cb.message.edit_reply_markup(reply_markup=kb)
+    await cb.answer()
+
+@router.callback_query(F.data.startswith("chg:bdelok:"), flags={"serialize": True})
+async def chg_bulk_delete(cb: CallbackQuery, state: FSMContext):
+    if not await _admin_or_alert(cb):
+        return
+    _, _, rank, _ = cb.data.split(":", 3)
+    selected = await _selected_or_alert(cb, state)
+    if not selected:
+        return
+    n = await bulk_delete(rank, selected)
+    logger.info("bulk delete rank=%s ids=%s by=%s -> %s", rank, len(selected), cb.from_user.id, n)
+    await _bulk_done(cb, state, rank, f"Удалено лотов: {n}")
+
+@router.callback_query(F.data.startswith("chg:bmove:"))
+async def chg_bulk_move_pick(cb: CallbackQuery, state: FSMContext):
+    if not await _admin_or_alert(cb):
+        return
+    _, _, rank, loc = cb.data.split(":", 3)
+    selected = await _selected_or_alert(cb, state)
+    if not selected:
+        return
+    await cb.message.edit_reply_markup(reply_markup=_move_kb(rank, loc))
+    await cb.answer()
+
+@router.callback_query(F.data.startswith("chg:bmoveto:"), flags={"serialize": True})
+async def chg_bulk_move(cb: CallbackQuery, state: FSMContext):
+    if not await _admin_or_alert(cb):
+        return
+    _, _, rank, to_rank, _ = cb.data.split(":", 4)
+    selected = await _selected_or_alert(cb, state)
+    if not selected:
+        return
+    n = await bulk_move(rank, to_rank, selected)
+    logger.info("bulk move %s -> %s ids=%s by=%s -> %s", rank, to_rank, len(selected), cb.from_user.id, n)
+    await _bulk_done(cb, state, rank, f"Перенесено в {to_rank} rank: {n}")
+
+@router.callback_query(F.data.startswith("chg:bprice:"))
+async def chg_bulk_price_start(cb: CallbackQuery, state: FSMContext):
+    if not await _admin_or_alert(cb):
+        return
+    _, _, rank, loc = cb.data.split(":", 3)
+    selected = await _selected_or_alert(cb, state)
+    if not selected:
+        return
+    await state.update_data(rank=rank, page=_parse_loc(loc)[0])
+    await state.set_state(ChangeLotFSM.waiting_bulk_price)
+    await cb.message.answer(
+        f"Новая цена для {len(selected)} лотов: число (<code>500</code>) "
+        "или изменение в процентах (<code>+10%</code>, <code>-15%</code>)."
+    )
+    await cb.answer()
+
+@router.message(ChangeLotFSM.waiting_bulk_price, flags={"serialize": True})
+async def chg_bulk_price_apply(msg: Message, state: FSMContext):
+    if not _is_admin(msg):
+        return await msg.reply("⛔ Нет доступа.")
+    text = (msg.text or "").replace(" ", "")
+    m_pct = re.fullmatch(r"([+-]\d{1,3})%", text)
+    if m_pct:
+        kwargs = {"pct": int(m_pct.group(1))}
+    elif text.isdigit() and int(text) > 0:
+        kwargs = {"price": int(text)}
+    else:
+        return await msg.answer("Нужна цена (целое > 0) или процент: <code>+10%</code> / <code>-15%</code>.")
+
+    data = await state.get_data()
+    rank, selected = data["rank"], data.get("selected") or []
+    n = await bulk_reprice(rank, selected, **kwargs)
+    logger.info("bulk reprice rank=%s ids=%s %s by=%s -> %s", rank, len(selected), kwargs, msg.from_user.id, n)
+
+    await state.set_state(ChangeLotFSM.waiting_rank)
+    await state.update_data(select_mode=False, selected=[])
+    await msg.answer(f"Цена изменена у {n} лотов ✅")
+    view = await _list_view(rank, 1, None)
+    if view:
+        await msg.answer(view[0], reply_markup=view[1])
 
 
 # -------------------- edit caption --------------------
 @router.callback_query(F.data.startswith("chg:editcap:"))
 async def chg_edit_caption_start(cb: CallbackQuery, state: FSMContext):
-    _, _, rank, acc_id_str, page_str = cb.data.split(":")
-    await state.update_data(rank=rank, acc_id=int(acc_id_str), page=int(page_str))
+    _, _, rank, acc_id_str, loc = cb.data.split(":", 4)
+    await state.update_data(rank=rank, acc_id=int(acc_id_str), page=loc)
     await state.set_state(ChangeLotFSM.waiting_new_caption)
     await cb.message.answer("Отправь новое описание (текст).")
     await cb.answer()
 
-@router.message(ChangeLotFSM.waiting_new_caption)
+@router.message(ChangeLotFSM.waiting_new_caption, flags={"serialize": True})
 async def chg_edit_caption_apply(msg: Message, state: FSMContext):
     data = await state.get_data()
     rank = data["rank"]
@@ -214,10 +457,7 @@ async def chg_edit_caption_apply(msg: Message, state: FSMContext):
     page = data["page"]
     new_caption = (msg.text or "").strip()
 
-    if rank == "8":
-        ok = await update_rank8_caption(acc_id, new_caption)
-    else:
-        ok = await update_rank_caption(rank, acc_id, new_caption)
+    ok = await update_rank_caption(rank, acc_id, new_caption)
 
     await state.clear()
     if not ok:
@@ -1,6 +1,5 @@
 # app/handlers/deposit.py
 import logging
-import json
 import random
 import string
 import re
@@ -13,19 +12,17 @@ from aiogram.fsm.context import FSMContext
 from app.states.deposit import DepositStates
 from app.keyboards.balance import back_kb, pay_methods_kb, pay_lolz_kb
 from app.db import (
-    create_payment,
-    get_payment_by_comment,
-    mark_payment_success,
+    create_payment_unique,
     ensure_user,
-    add_balance_rub,
 )
-from app.services import lolz  # build_pay_url / find_payment_by_comment / extract_success_operation
+from app.services import lolz  # build_pay_url
+from app.services import payments  # check_payment (lolz API + зачисление)
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 # ======== Константы ========
-_EXPIRE_HOURS = 3           # срок действия платежа
+_EXPIRE_HOURS = payments.EXPIRE_HOURS  # срок действия платежа (его же использует свипер)
 _MIN_DEPOSIT_RUB = 100      # минимальная сумма пополнения
 
 
@@ -73,16 +70,12 @@ def _is_expired(created_at: datetime | None) -> bool:
 
 # ======== Генерация комментариев ========
 
-def _gen_comment_local(length: int = 14) -> str:
-    return "".join(random.choices(string.digits, k=length))
+_rnd = random.SystemRandom()
 
 
-async def _gen_unique_comment() -> str:
-    for _ in range(5):
-        c = _gen_comment_local(14)
-        if not await get_payment_by_comment(c):
-            return c
-    return _gen_comment_local(16)
+def _gen_comment_local(length: int = 14) -> str:
+    # уникальность проверяет не генератор, а UNIQUE(comment) при вставке (create_payment_unique)
+    return "".join(_rnd.choices(string.digits, k=length))
 
 
 # ======== Клавиатура для просроченного счёта ========
@@ -121,24 +114,7 @@ async def msg_balance_deposit(message: Message, state: FSMContext):
         logger.exception("text deposit fallback failed")
 
 
-# === Сброс стейта, если пользователь ушёл в другой раздел ===
-_ALLOWED_PREFIXES = ("balance:deposit", "deposit:", "pay:")
-
-@router.callback_query(
-    DepositStates.waiting_amount,
-    F.data.func(lambda d: not (d and d.startswith(_ALLOWED_PREFIXES)))
-)
-async def clear_waiting_on_foreign_callback(cb: CallbackQuery, state: FSMContext):
-    await state.clear()
-    return
-
-@router.callback_query(
-    DepositStates.choosing_method,
-    F.data.func(lambda d: not (d and d.startswith(_ALLOWED_PREFIXES)))
-)
-async def clear_choosing_on_foreign_callback(cb: CallbackQuery, state: FSMContext):
-    await state.clear()
-    return
+# === Сброс стейта, если пользователь ушёл в другой раздел — app/middlewares/deposit_reset.py ===
 
 
 # === ввод суммы (целые рубли, минимум 100) ===
@@ -191,7 +167,7 @@ async def cb_pay_back(cq: CallbackQuery, state: FSMContext):
 
 
 # === выбор метода: lolz ===
-@router.callback_query(F.data == "pay:method:lolz")
+@router.callback_query(F.data == "pay:method:lolz", flags={"serialize": "drop"})
 async def cb_pay_method_lolz(cq: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     amount = int(data.get("amount", 0))
@@ -208,15 +184,13 @@ async def cb_pay_method_lolz(cq: CallbackQuery, state: FSMContext):
 
     await ensure_user(cq.from_user.id, cq.from_user.username)
 
-    # Создаём платёж
-    comment = await _gen_unique_comment()
-    await create_payment(
+    # Создаём платёж: одна запись, при коллизии comment БД сама отклонит вставку и мы повторим
+    _, comment = await create_payment_unique(
         user_id=cq.from_user.id,
         method="lolz",
         amount_rub=amount,
-        comment=comment,
         status="pending",
-        raw_json=None,
+        make_comment=_gen_comment_local,
     )
     logger.info("payment pending created: user=%s amount=%s comment=%s", cq.from_user.id, amount, comment)
 
@@ -241,23 +215,22 @@ async def cb_pay_method_lolz(cq: CallbackQuery, state: FSMContext):
 
 
 # === проверка оплаты ===
-@router.callback_query(F.data.startswith("pay:check:"))
+@router.callback_query(F.data.startswith("pay:check:"), flags={"serialize": "drop"})
 async def cb_pay_check(cq: CallbackQuery, state: FSMContext):
     try:
         comment = cq.data.split("pay:check:", 1)[1]
-        rec = await get_payment_by_comment(comment)
-        if not rec:
+        res = await payments.check_payment(cq.from_user.id, comment)
+        status = res["status"]
+        if status == "not_found":
             await cq.answer("Локальная запись платежа не найдена", show_alert=True)
             return
 
+        rec = res["payment"]
         amount = int(rec["amount_rub"])
         created_at = _coerce_dt(rec.get("created_at")) if isinstance(rec, dict) else None
         expired = _is_expired(created_at)
 
-        # Проверка в API Lolz
-        res = await lolz.find_payment_by_comment(comment)
-        status = res.get("status_code", 0)
-        if status in (0, 401, 403):
+        if status == "unavailable":
             await cq.answer(
                 "Проверка недоступна: нет/неверный API токен или ошибка сети.\n"
                 "Админу: проверь LOLZ_API_TOKEN в .env и перезапусти бота.",
@@ -265,23 +238,15 @@ async def cb_pay_check(cq: CallbackQuery, state: FSMContext):
             )
             return
 
-        op = lolz.extract_success_operation(res.get("json", {}), expected_amount_rub=amount)
-
-        # если платёж найден — зачисляем
-        if op:
-            await add_balance_rub(cq.from_user.id, amount)
-            await mark_payment_success(
-                comment,
-                ext_operation_id=op["operation_id"],
-                raw_json=json.dumps(res["json"]),
-            )
+        # если платёж найден — он уже зачислен сервисом
+        if status == "paid":
             await state.clear()
             await cq.answer("Оплата подтверждена")
             await cq.message.edit_text(
                 f"✅ Пополнение успешно\n"
                 f"Сумма: <b>{amount} ₽</b>\n"
                 f"Код: <code>{comment}</code>\n"
-                f"Операция: <code>{op['operation_id']}</code>",
+                f"Операция: <code>{res['operation_id']}</code>",
                 reply_markup=None
             )
             return
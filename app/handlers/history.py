@@ -0,0 +1,94 @@
+# app/handlers/history.py
+import logging
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest
+
+from app.db import list_user_purchases, get_user_purchase
+from app.keyboards.accounts import MAX_ROWS, _trim
+
+logger = logging.getLogger(__name__)
+router = Router(name="history")
+
+HEADER = "📦 <b>Мои покупки</b>"
+
+
+def _history_kb(items: list[dict], cursor: int, has_more: bool) -> InlineKeyboardMarkup:
+    """
+    cursor — before_id текущей страницы (0 = первая); кладём его в кнопки покупок, чтобы «Назад» вернул сюда же.
+    """
+    rows: list[list[InlineKeyboardButton]] = []
+    for it in items:
+        day = (it.get("created_at") or "")[:10]
+        label = f"{it.get('title') or 'Лот'} — {it['price_rub']}₽ • {day}"
+        rows.append([InlineKeyboardButton(text=_trim(label), callback_data=f"hist:show:{it['id']}:{cursor}")])
+
+    nav: list[InlineKeyboardButton] = []
+    if cursor:
+        nav.append(InlineKeyboardButton(text="⏮ В начало", callback_data="hist:page:0"))
+    if has_more:
+        nav.append(InlineKeyboardButton(text="Ещё ▶️", callback_data=f"hist:page:{items[-1]['id']}"))
+    if nav:
+        rows.append(nav)
+    rows.append([InlineKeyboardButton(text="⬅️ В главное меню", callback_data="main:menu")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def _history_page(user_id: int, cursor: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    # берём на одну строку больше — так узнаём, есть ли следующая страница, без COUNT(*)
+    items = await list_user_purchases(user_id, before_id=cursor or None, limit=MAX_ROWS + 1)
+    if not items:
+        return f"{HEADER}\n\nПокупок пока нет.", None
+    has_more = len(items) > MAX_ROWS
+    items = items[:MAX_ROWS]
+    return f"{HEADER}\n\nНажмите на покупку, чтобы снова показать данные для входа.", _history_kb(items, cursor, has_more)
+
+
+# ---------- вход ----------
+@router.message(Command("history"))
+@router.message(F.text == "📦 Мои покупки")
+async def history_entry(message: Message):
+    text, kb = await _history_page(message.from_user.id, 0)
+    await message.answer(text, reply_markup=kb)
+
+
+# ---------- страницы (keyset по id) ----------
+@router.callback_query(F.data.startswith("hist:page:"))
+async def history_page(cb: CallbackQuery):
+    cursor = int(cb.data.split(":")[2])
+    text, kb = await _history_page(cb.from_user.id, cursor)
+    try:
+        await cb.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            await cb.message.answer(text, reply_markup=kb)
+    await cb.answer()
+
+
+# ---------- повторный показ купленных данных ----------
+@router.callback_query(F.data.startswith("hist:show:"))
+async def history_show(cb: CallbackQuery):
+    _, _, sale_id_str, cursor = cb.data.split(":")
+    sale = await get_user_purchase(cb.from_user.id, int(sale_id_str))
+    if not sale:
+        await cb.answer("Покупка не найдена", show_alert=True)
+        return
+
+    text = (
+        f"🧾 <b>{sale.get('title') or 'Лот'}</b>\n"
+        f"Раздел: {sale['rank']} rank • ID лота: {sale['account_id']}\n"
+        f"Цена: <b>{sale['price_rub']} ₽</b>\n"
+        f"Дата: {sale.get('created_at') or '—'}\n\n"
+        f"Данные для входа:\n<code>{sale.get('creds') or '—'}</code>"
+    )
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data=f"hist:page:{cursor}")],
+    ])
+    try:
+        await cb.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            await cb.message.answer(text, reply_markup=kb)
+    await cb.answer()
@@ -0,0 +1,121 @@
+# app/handlers/inline.py
+import html
+import logging
+import os
+
+from aiogram import Router, F
+from aiogram.filters import CommandStart, CommandObject
+from aiogram.types import (
+    Message,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+    InlineKeyboardMarkup,
+    InlineKeyboardButton,
+)
+
+from app.callbacks import WT_BUY
+from app.catalog import parse_search, search_cached
+from app.db import ensure_user
+from app.db_ranks import get_account as get_rank_account, get_section
+
+logger = logging.getLogger(__name__)
+router = Router(name="inline")
+
+INLINE_PAGE = 20                                                    # результатов за один ответ (лимит Telegram — 50)
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "30"))       # сек: кэш ответа на стороне Telegram
+LOT_LINK_PREFIX = "lot-"                                            # /start lot-<rank>-<id>
+
+
+def _lot_text(it: dict) -> str:
+    return (
+        f"<b>{html.escape(it['button_title'] or '')}</b>\n"
+        f"Цена: {it['price_rub']}₽\n"
+        f"Rank: {html.escape(it['rank'])}"
+    )
+
+
+def _open_kb(bot_username: str, it: dict) -> InlineKeyboardMarkup:
+    # ссылка в бота на карточку лота: из любого чата — сразу к покупке
+    url = f"https://t.me/{bot_username}?start={LOT_LINK_PREFIX}{it['rank']}-{it['id']}"
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🛒 Открыть в боте", url=url)]])
+
+
+# ──────────────────────────────────────────────────────────────
+# Инлайн-поиск: @bot <слова и/или цена> из любого чата
+# ──────────────────────────────────────────────────────────────
+@router.inline_query()
+async def inline_search(iq: InlineQuery):
+    text, min_price, max_price = parse_search(iq.query)
+    offset = int(iq.offset) if (iq.offset or "").isdigit() else 0
+
+    # повторный запрос при неизменном складе — из кэша каталога, без выборки
+    found = await search_cached(text, min_price=min_price, max_price=max_price,
+                                limit=INLINE_PAGE, offset=offset)
+    me = await iq.bot.me()
+
+    results = []
+    for it in found["items"]:
+        result_id = f"{it['rank']}:{it['id']}"
+        description = f"{it['price_rub']}₽ · {it['rank']} rank"
+        if it.get("photo_file_id"):
+            results.append(InlineQueryResultCachedPhoto(
+                id=result_id,
+                photo_file_id=it["photo_file_id"],
+                title=it["button_title"],
+                description=description,
+                caption=_lot_text(it),
+                reply_markup=_open_kb(me.username, it),
+            ))
+        else:
+            results.append(InlineQueryResultArticle(
+                id=result_id,
+                title=it["button_title"],
+                description=description,
+                input_message_content=InputTextMessageContent(message_text=_lot_text(it)),
+                reply_markup=_open_kb(me.username, it),
+            ))
+
+    next_offset = offset + len(found["items"])
+    await iq.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,  # выдача одинакова для всех — Telegram отдаёт её из своего кэша
+        next_offset=str(next_offset) if next_offset < found["total"] else "",
+    )
+
+
+# ──────────────────────────────────────────────────────────────
+# Переход по ссылке из инлайн-результата: /start lot-<rank>-<id>
+# ──────────────────────────────────────────────────────────────
+@router.message(CommandStart(deep_link=True, magic=F.args.startswith(LOT_LINK_PREFIX)))
+async def start_lot(message: Message, command: CommandObject):
+    await ensure_user(message.from_user.id, message.from_user.username)
+    rank, _, acc_id_str = command.args[len(LOT_LINK_PREFIX):].rpartition("-")
+    try:
+        get_section(rank)
+        acc_id = int(acc_id_str)
+    except ValueError:
+        await message.answer("Лот не найден.")
+        return
+
+    row = await get_rank_account(rank, acc_id)
+    if not row or row.get("status") != "available":
+        await message.answer("Лот уже продан или снят с продажи.")
+        return
+
+    caption = "\n".join([
+        row.get("caption") or "",
+        "",
+        f"Цена: {row['price_rub']}₽",
+        f"ID: {row['id']}",
+        f"Rank: {rank}",
+    ])
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🛒 Купить", callback_data=WT_BUY.pack(rank, row["id"]))],
+    ])
+    if row.get("photo_file_id"):
+        await message.answer_photo(row["photo_file_id"], caption=caption, reply_markup=kb)
+    else:
+        await message.answer(caption, reply_markup=kb)
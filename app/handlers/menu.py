@@ -2,16 +2,20 @@
 import logging
 from math import ceil
 from pathlib import Path
+from typing import Optional
 
 from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery, FSInputFile
 
+from app.callbacks import ACC_BUY, ACC_NOP, ACC_PAGE, ACC_PICK, cursor_fields, cursor_of, legacy, route
 from app.keyboards.main_menu import main_menu_kb
 from app.keyboards.accounts import accounts_list_kb, account_card_kb, MAX_ROWS
+from app.catalog import count_all_available
 from app.db import (
     ensure_user, get_balance_rub, get_user,
-    list_accounts, count_accounts, get_account_by_id, purchase_account
+    list_accounts, count_accounts, get_account_by_id, purchase_account,
+    DEFAULT_SORT, SORTS, parse_cursor,
 )
 
 logger = logging.getLogger(__name__)
@@ -48,10 +52,25 @@ def _header_caption(total: int) -> str:
         "👉 <b>Выберите товар:</b>"
     )
 
+async def _list_page(page: int, sort: str,
+                     cursor: Optional[tuple[str, int, int]]) -> tuple[int, Optional[tuple[str, int, int]], list[dict]]:
+    """
+    Страница списка: keyset по курсору из callback (цена не зависит от номера страницы),
+    без курсора — OFFSET (старые кнопки). Назад упёрлись в начало — первая страница.
+    Возвращает (page, cursor, items).
+    """
+    offset = 0 if cursor else (page - 1) * MAX_ROWS
+    items = await list_accounts(CATEGORY, limit=MAX_ROWS, offset=offset, sort=sort, cursor=cursor)
+    if cursor and (not items or (cursor[0] == "p" and len(items) < MAX_ROWS)):
+        page, cursor = 1, None
+        items = await list_accounts(CATEGORY, limit=MAX_ROWS, sort=sort)
+    return page, cursor, items
+
 # ---------------- /start ----------------
 @router.message(CommandStart())
 async def start(message: Message):
     await ensure_user(message.from_user.id, message.from_user.username)
+    total = await count_all_available()
     await message.answer(
         "✈️ Добро пожаловать в магазин WarThunder!\n"
         "Здесь ты найдёшь проверенные аккаунты любого ранга,\n"
@@ -60,6 +79,7 @@ async def start(message: Message):
         "• 🎮 WarThunder — все доступные аккаунты\n"
         "• 👤 Профиль — баланс\n"
         "• 💳 Пополнить — моментальное пополнение через Lolz\n\n"
+        f"🛒 Сейчас в продаже: <b>{total}</b> лотов\n\n"
         "📢 Не забывай проверять новые лоты — обновления каждую неделю!\n\n"
         "💬 Если возникнут вопросы — свяжись с поддержкой через админа бота.",
         reply_markup=main_menu_kb()
@@ -70,8 +90,8 @@ async def start(message: Message):
 async def open_accounts(message: Message):
     total = await count_accounts(CATEGORY)
     page = 1
-    items = await list_accounts(CATEGORY, limit=MAX_ROWS, offset=0)
-    kb = accounts_list_kb(CATEGORY, items, total, page, per_page=MAX_ROWS)
+    items = await list_accounts(CATEGORY, limit=MAX_ROWS, offset=0, sort=DEFAULT_SORT)
+    kb = accounts_list_kb(CATEGORY, items, total, page, per_page=MAX_ROWS, sort=DEFAULT_SORT)
 
     caption = _header_caption(total)
     header_path = _find_header_image()
@@ -92,7 +112,7 @@ async def show_profile(message: Message):
     await ensure_user(message.from_user.id, message.from_user.username)
     u = await get_user(message.from_user.id)
     bal = await get_balance_rub(message.from_user.id)
-    username = u.get("username") or "—"
+    username = (u or {}).get("username") or "—"
     await message.answer(
         "👤 <b>Мой профиль</b>\n"
         f"ID: <code>{message.from_user.id}</code>\n"
@@ -129,13 +149,12 @@ async def cb_main_menu(cq: CallbackQuery):
     await cq.message.answer("Главное меню:", reply_markup=main_menu_kb())
 
 # --------- Пагинация / Назад: пересоздаём шапку+список одним сообщением ---------
-@router.callback_query(F.data.startswith("acc:page:"))
-async def cb_acc_page(cq: CallbackQuery):
+@route(ACC_PAGE)
+async def cb_acc_page(cq: CallbackQuery, callback_data: tuple):
     await cq.answer()
-    try:
-        page = int(cq.data.split("acc:page:", 1)[1])
-    except Exception:
-        page = 1
+    page = max(1, callback_data.page or 1)
+    sort = callback_data.sort if callback_data.sort in SORTS else DEFAULT_SORT
+    cursor = cursor_of(callback_data)
 
     # всегда удаляем текущее сообщение (это могла быть карточка)
     try:
@@ -146,10 +165,9 @@ async def cb_acc_page(cq: CallbackQuery):
     total = await count_accounts(CATEGORY)
     pages = max(1, ceil(total / MAX_ROWS)) if MAX_ROWS else 1
     page = max(1, min(page, pages))
-    offset = (page - 1) * MAX_ROWS
 
-    items = await list_accounts(CATEGORY, limit=MAX_ROWS, offset=offset)
-    kb = accounts_list_kb(CATEGORY, items, total, page, per_page=MAX_ROWS)
+    page, cursor, items = await _list_page(page, sort, cursor)
+    kb = accounts_list_kb(CATEGORY, items, total, page, per_page=MAX_ROWS, sort=sort, cursor=cursor)
 
     caption = _header_caption(total)
     header_path = _find_header_image()
@@ -163,20 +181,18 @@ async def cb_acc_page(cq: CallbackQuery):
     await cq.message.answer(caption, reply_markup=kb)
 
 # --------- Карточка товара ---------
-@router.callback_query(F.data.startswith("acc:pick:"))
-async def cb_acc_pick(cq: CallbackQuery):
-    await cq.answer()
-    # формат acc:pick:<id>:<page>
-    parts = cq.data.split(":")
-    acc_id = parts[2]
-    page = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 1
+@route(ACC_PICK)
+async def cb_acc_pick(cq: CallbackQuery, callback_data: tuple):
+    acc_id = callback_data.id
+    page = max(1, callback_data.page or 1)
+    sort = callback_data.sort if callback_data.sort in SORTS else DEFAULT_SORT
+    cursor = cursor_of(callback_data)
 
     acc = await get_account_by_id(acc_id)
     if not acc or acc.get("status") != "available":
         # перерисуем список
-        return await cb_acc_page(CallbackQuery(
-            id=cq.id, from_user=cq.from_user, chat_instance=cq.chat_instance, message=cq.message, data=f"acc:page:{page}"
-        ))
+        return await cb_acc_page(cq, ACC_PAGE.args(page, sort, **cursor_fields(cursor)))
+    await cq.answer()
 
     title = acc.get("button_title") or "Без названия"
     price = acc.get("price_rub") or 0
@@ -188,7 +204,7 @@ async def cb_acc_pick(cq: CallbackQuery):
         f"💵 Цена: <b>{price} ₽</b>\n\n"
         f"{caption}"
     )
-    kb = account_card_kb(acc_id=int(acc_id), page=page)
+    kb = account_card_kb(acc_id=acc_id, page=page, sort=sort, cursor=cursor)
 
     # удаляем сообщение со списком и показываем карточку
     try:
@@ -205,10 +221,10 @@ async def cb_acc_pick(cq: CallbackQuery):
         await cq.message.answer(text, reply_markup=kb)
 
 # --------- Покупка (с сообщением о нехватке денег) ---------
-@router.callback_query(F.data.startswith("acc:buy:"))
-async def cb_acc_buy(cq: CallbackQuery):
+@route(ACC_BUY, flags={"serialize": "drop"})
+async def cb_acc_buy(cq: CallbackQuery, callback_data: tuple):
     await cq.answer()
-    acc_id = int(cq.data.split("acc:buy:", 1)[1])
+    acc_id = callback_data.id
 
     # 1) проверим цену и баланс
     acc = await get_account_by_id(acc_id)
@@ -264,3 +280,31 @@ async def cb_acc_buy(cq: CallbackQuery):
     # что-то пошло не так
     logger.error("purchase_account failed: %r", result)
     await cq.answer("Ошибка при покупке. Попробуйте позже.", show_alert=True)
+
+
+@route(ACC_NOP)
+async def cb_acc_nop(cq: CallbackQuery):
+    await cq.answer()
+
+
+# --------- Кнопки старого формата (acc:...) в уже отправленных сообщениях ---------
+@legacy("acc")
+def _acc_legacy(args: list[str]) -> str:
+    """acc:<действие>:... → данные схемы: дальше тот же маршрут, что у новых кнопок (и те же флаги)."""
+    action, args = args[0], args[1:]
+    if action == "page":
+        # acc:page:<page>[:<sort>:<cursor>]
+        sort = args[1] if len(args) > 1 and args[1] in SORTS else DEFAULT_SORT
+        cursor = parse_cursor(args[2] if len(args) > 2 else None)
+        return ACC_PAGE.pack(int(args[0]), sort, **cursor_fields(cursor))
+    if action == "pick":
+        # acc:pick:<id>:<page>[:<sort>:<cursor>]
+        page = int(args[1]) if len(args) > 1 else 1
+        sort = args[2] if len(args) > 2 and args[2] in SORTS else DEFAULT_SORT
+        cursor = parse_cursor(args[3] if len(args) > 3 else None)
+        return ACC_PICK.pack(int(args[0]), page, sort, **cursor_fields(cursor))
+    if action == "buy":
+        return ACC_BUY.pack(int(args[0]))
+    if action == "nop":
+        return ACC_NOP.pack()
+    raise ValueError(f"unknown action {action!r}")
@@ -8,8 +8,12 @@ from app.db import (
     count_users_total,
     count_users_this_week,
     count_users_this_month,
+    reconcile_balances,
+    sales_by_day,
 )
 
+from app.catalog import inventory_by_rank
+
 logger = logging.getLogger(__name__)
 router = Router(name="stats_admin")
 
@@ -33,6 +37,8 @@ async def getstats_cmd(message: Message):
     total = await count_users_total()
     week  = await count_users_this_week()
     month = await count_users_this_month()
+    sales = await sales_by_day(7)
+    inventory = await inventory_by_rank()
 
     text = (
         "<b>Статистика пользователей</b>\n"
@@ -40,4 +46,29 @@ async def getstats_cmd(message: Message):
         f"• За 7 дней: <b>{week}</b>\n"
         f"• В этом месяце: <b>{month}</b>\n"
     )
+    if inventory:
+        text += "\n<b>Остатки</b>\n" + "\n".join(
+            f"• {rank} rank: {inv['cnt']} шт. на {inv['total_rub']} ₽ (от {inv['min_price']} ₽)"
+            for rank, inv in inventory.items()
+        ) + "\n"
+    if sales:
+        text += "\n<b>Продажи за 7 дней</b>\n" + "\n".join(
+            f"• {s['day']} • {s['rank']} rank: {s['cnt']} шт. на {s['total_rub']} ₽" for s in sales
+        )
     await message.reply(text)
+
+
+@router.message(Command("reconcile"))
+async def reconcile_cmd(message: Message):
+    """Сверка balance_ledger с users.balance_rub."""
+    if not _is_admin(message):
+        return await message.reply("⛔ Нет доступа.")
+    diffs = await reconcile_balances()
+    if not diffs:
+        return await message.reply("✅ Леджер сходится с балансами.")
+    lines = [
+        f"• <code>{d['user_id']}</code>: баланс {d['balance_rub']} ₽, леджер {d['ledger_rub']} ₽"
+        for d in diffs[:30]
+    ]
+    more = f"\n… и ещё {len(diffs) - 30}" if len(diffs) > 30 else ""
+    await message.reply(f"⚠️ Расхождений: <b>{len(diffs)}</b>\n" + "\n".join(lines) + more)
@@ -1,8 +1,11 @@
 # app/handlers/warthunder.py
+import html
 import logging
 from math import ceil
+from typing import Optional
 
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
 from aiogram.types import (
     Message,
     CallbackQuery,
@@ -13,28 +16,41 @@ from aiogram.types import (
 from aiogram.exceptions import TelegramBadRequest
 
 from app.keyboards.wt import wt_ranks_keyboard
-from app.keyboards.accounts import MAX_ROWS  # используем лимит строк как per_page
-
-from app.db import (
-    ensure_user,
-    get_balance_rub,
-    add_balance_rub,
-    get_account_by_id as get_account_rank8,
-    purchase_account as purchase_rank8,
-    list_accounts as list_rank8_accounts,
-    count_accounts as count_rank8_accounts,
+from app.states.warthunder import WtSearchStates
+from app.keyboards.accounts import MAX_ROWS, sort_buttons  # используем лимит строк как per_page
+
+from app.callbacks import (
+    WT_ALL, WT_BUY, WT_ITEM, WT_NOP, WT_PAGE, WT_RANKS, WT_RESULTS, WT_SEARCH, cursor_fields, cursor_of, legacy,
+    route,
+)
+from app.db import DEFAULT_SORT, SORTS, edge_cursor, ensure_user, parse_cursor
+from app.catalog import (
+    inventory_by_rank, count_all_available, list_all_available, parse_search, search_cached,
 )
 from app.db_ranks import (
     list_available as list_rank_accounts,
     count_available as count_rank_accounts,
     get_account as get_rank_account,
-    mark_sold as mark_rank_sold,
+    purchase_account as purchase_rank,
 )
 
 logger = logging.getLogger(__name__)
 router = Router(name="warthunder")
 
 PER_PAGE = MAX_ROWS
+RANKS_TEXT = "Выберите раздел WarThunder:"
+SEARCH_TEXT = (
+    "🔎 Поиск по всем разделам.\n"
+    "Отправьте слова из названия или описания и/или цену:\n"
+    "• <code>8 rank</code>\n"
+    "• <code>100-300</code> · <code>от 200</code> · <code>до 500</code>\n"
+    "• <code>ис-7 до 300</code>"
+)
+
+
+async def _ranks_kb() -> InlineKeyboardMarkup:
+    # остатки по всем разделам — один запрос к каталогу (app.catalog)
+    return wt_ranks_keyboard(await inventory_by_rank())
 
 
 # ──────────────────────────────────────────────────────────────
@@ -43,38 +59,46 @@ PER_PAGE = MAX_ROWS
 @router.message(F.text == "🎮 WarThunder")
 async def wt_entry(msg: Message):
     await ensure_user(msg.from_user.id, msg.from_user.username)
-    await msg.answer("Выберите раздел WarThunder:", reply_markup=wt_ranks_keyboard())
+    await msg.answer(RANKS_TEXT, reply_markup=await _ranks_kb())
 
 
 # ──────────────────────────────────────────────────────────────
-# Выбор ранга → первая страница
+# Раздел: страница списка (выбор ранга — первая страница)
 # ──────────────────────────────────────────────────────────────
-@router.callback_query(F.data.startswith("wt:rank:"))
-async def wt_rank_select(cb: CallbackQuery):
-    _, _, rank = cb.data.split(":")
-    await _render_list(cb, rank=rank, page=1)
+@route(WT_PAGE)
+async def wt_page(cb: CallbackQuery, callback_data: tuple):
+    # курсор — граничный лот соседней страницы (keyset), его нет у первой страницы
+    sort = callback_data.sort if callback_data.sort in SORTS else DEFAULT_SORT
+    await _render_list(cb, rank=callback_data.rank, page=callback_data.page or 1, sort=sort,
+                       cursor=cursor_of(callback_data))
 
 
 # ──────────────────────────────────────────────────────────────
-# Переход по страницам
+# Все лоты всех разделов (каталог)
 # ──────────────────────────────────────────────────────────────
-@router.callback_query(F.data.startswith("wt:page:"))
-async def wt_page(cb: CallbackQuery):
-    _, _, rank, page_str = cb.data.split(":")
-    page = int(page_str)
-    await _render_list(cb, rank=rank, page=page)
+@route(WT_ALL)
+async def wt_all(cb: CallbackQuery, callback_data: tuple):
+    await _render_all(cb, page=callback_data.page or 1)
+
+
+@route(WT_NOP)
+async def wt_nop(cb: CallbackQuery):
+    await cb.answer()
 
 
 # ──────────────────────────────────────────────────────────────
 # Назад к выбору рангов
 # ──────────────────────────────────────────────────────────────
-@router.callback_query(F.data == "wt:back")
-async def wt_back(cb: CallbackQuery):
+@route(WT_RANKS)
+async def wt_back(cb: CallbackQuery, state: FSMContext):
+    if await state.get_state() == WtSearchStates.waiting_query.state:
+        await state.clear()
+    kb = await _ranks_kb()
     try:
-        if (cb.message.text or "") == "Выберите раздел WarThunder:":
-            await cb.message.edit_reply_markup(reply_markup=wt_ranks_keyboard())
+        if (cb.message.text or "") == RANKS_TEXT:
+            await cb.message.edit_reply_markup(reply_markup=kb)
         else:
-            await cb.message.edit_text("Выберите раздел WarThunder:", reply_markup=wt_ranks_keyboard())
+            await cb.message.edit_text(RANKS_TEXT, reply_markup=kb)
     except TelegramBadRequest as e:
         if "message is not modified" in str(e):
             pass
@@ -83,15 +107,62 @@ async def wt_back(cb: CallbackQuery):
     await cb.answer()
 
 
+# ──────────────────────────────────────────────────────────────
+# Поиск: слова (FTS по названию/описанию) + диапазон цены
+# ──────────────────────────────────────────────────────────────
+@route(WT_SEARCH)
+async def wt_search(cb: CallbackQuery, state: FSMContext):
+    await state.set_state(WtSearchStates.waiting_query)
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data=WT_RANKS.pack())],
+    ])
+    await _show_list(cb, SEARCH_TEXT, kb)
+
+
+@router.message(WtSearchStates.waiting_query, F.text)
+async def wt_search_query(msg: Message, state: FSMContext):
+    text, min_price, max_price = parse_search(msg.text)
+    if not text and min_price is None and max_price is None:
+        await msg.answer("Введите слова для поиска или цену, например: <code>тигр до 300</code>")
+        return
+    # запрос живёт в данных FSM: страницы WT_RESULTS перечитывают его оттуда (callback_data ≤ 64 байт)
+    await state.set_state(None)
+    await state.update_data(search={"text": text, "min_price": min_price, "max_price": max_price})
+    view = await _search_view(text, min_price, max_price, page=1)
+    if view is None:
+        await msg.answer("Ничего не найдено. Попробуйте другой запрос.", reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[[InlineKeyboardButton(text="🔎 Новый поиск", callback_data=WT_SEARCH.pack())],
+                             [InlineKeyboardButton(text="⬅️ Назад", callback_data=WT_RANKS.pack())]]
+        ))
+        return
+    header, kb = view
+    await msg.answer(header, reply_markup=kb)
+
+
+@route(WT_RESULTS)
+async def wt_search_page(cb: CallbackQuery, state: FSMContext, callback_data: tuple):
+    page = callback_data.page or 1
+    search = (await state.get_data()).get("search")
+    if not search:
+        await cb.answer("Поиск устарел — начните заново.", show_alert=True)
+        return
+    view = await _search_view(search["text"], search["min_price"], search["max_price"], page=page)
+    if view is None:
+        await cb.answer(f"☹️ Страницы {page} не существует", show_alert=True)
+        return
+    header, kb = view
+    await _show_list(cb, header, kb)
+
+
 # ──────────────────────────────────────────────────────────────
 # Карточка товара
 # ──────────────────────────────────────────────────────────────
-@router.callback_query(F.data.startswith("wt:item:"))
-async def wt_item(cb: CallbackQuery):
-    _, _, rank, acc_id_str, *rest = cb.data.split(":")
-    acc_id = int(acc_id_str)
+@route(WT_ITEM)
+async def wt_item(cb: CallbackQuery, callback_data: tuple):
+    a = callback_data
+    rank = a.rank
 
-    row = await (get_account_rank8(acc_id) if rank == "8" else get_rank_account(rank, acc_id))
+    row = await get_rank_account(rank, a.id)
     if not row or row.get("status") != "available":
         await cb.answer("Лот недоступен", show_alert=True)
         return
@@ -105,9 +176,18 @@ async def wt_item(cb: CallbackQuery):
     ]
     caption = "\n".join(caption_lines)
 
-    back_cb = f"wt:rank:{rank}" if not rest else f"wt:page:{rank}:{rest[0]}"
+    # «Назад» — туда, откуда открыта карточка: список раздела (та же страница по тому же курсору),
+    # «Все лоты» или результаты поиска
+    if a.src == "r":
+        back_cb = WT_PAGE.pack(rank, a.page, a.sort, a.cdir, a.cprice, a.cid)
+    elif a.src == "a":
+        back_cb = WT_ALL.pack(a.page)
+    elif a.src == "s":
+        back_cb = WT_RESULTS.pack(a.page)
+    else:
+        back_cb = WT_PAGE.pack(rank, 1, DEFAULT_SORT, **cursor_fields(None))
     kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛒 Купить", callback_data=f"wt:buy:{rank}:{row['id']}")],
+        [InlineKeyboardButton(text="🛒 Купить", callback_data=WT_BUY.pack(rank, row["id"]))],
         [InlineKeyboardButton(text="⬅️ Назад", callback_data=back_cb)],
     ])
 
@@ -130,68 +210,92 @@ async def wt_item(cb: CallbackQuery):
 # ──────────────────────────────────────────────────────────────
 # Покупка
 # ──────────────────────────────────────────────────────────────
-@router.callback_query(F.data.startswith("wt:buy:"))
-async def wt_buy(cb: CallbackQuery):
-    _, _, rank, acc_id_str = cb.data.split(":")
-    acc_id = int(acc_id_str)
-
-    if rank == "8":
-        result = await purchase_rank8(cb.from_user.id, acc_id)
-        status = result.get("status")
-        if status == "ok":
-            await cb.message.answer(f"Покупка успешна!\nДанные:\n<code>{result['creds']}</code>", parse_mode="HTML")
-            await cb.answer()
-            return
-        if status == "insufficient":
-            await cb.answer("Недостаточно средств.", show_alert=True)
-            return
-        if status == "not_available":
-            await cb.answer("Лот недоступен", show_alert=True)
-            return
-
-        logger.error("purchase_rank8 failed: %r", result)
-        await cb.answer("Ошибка при покупке. Попробуйте позже.", show_alert=True)
-        return
+@route(WT_BUY, flags={"serialize": "drop"})
+async def wt_buy(cb: CallbackQuery, callback_data: tuple):
+    rank, acc_id = callback_data.rank, callback_data.id
 
-    # 7/6 ранги
-    row = await get_rank_account(rank, acc_id)
-    if not row or row.get("status") != "available":
-        await cb.answer("Лот недоступен", show_alert=True)
-        return
+    # одна транзакция на основную БД (+ ATTACH БД раздела, если она отдельная)
+    result = await purchase_rank(rank, cb.from_user.id, acc_id)
 
-    price = int(row["price_rub"])
-    balance = await get_balance_rub(cb.from_user.id)
-    if balance < price:
+    status = result.get("status")
+    if status == "ok":
+        await cb.message.answer(f"Покупка успешна!\nДанные:\n<code>{result['creds']}</code>", parse_mode="HTML")
+        await cb.answer()
+        return
+    if status == "insufficient":
         await cb.answer("Недостаточно средств.", show_alert=True)
         return
+    if status == "not_available":
+        await cb.answer("Лот недоступен", show_alert=True)
+        return
 
-    await add_balance_rub(cb.from_user.id, -price)
-    await mark_rank_sold(rank, acc_id)
+    logger.error("purchase rank=%s failed: %r", rank, result)
+    await cb.answer("Ошибка при покупке. Попробуйте позже.", show_alert=True)
 
-    await cb.message.answer(f"Покупка успешна!\nДанные:\n<code>{row['creds']}</code>", parse_mode="HTML")
-    await cb.answer()
+
+# ──────────────────────────────────────────────────────────────
+# Старые строковые кнопки (wt:<действие>:...) в уже отправленных сообщениях
+# ──────────────────────────────────────────────────────────────
+@legacy("wt")
+def _wt_legacy(args: list[str]) -> str:
+    """wt:<действие>:... → данные схемы: дальше тот же маршрут, что у новых кнопок (и те же флаги)."""
+    action, args = args[0], args[1:]
+    if action == "rank":
+        return WT_PAGE.pack(args[0], 1, DEFAULT_SORT, **cursor_fields(None))
+    if action == "page":
+        # wt:page:<rank>:<page>[:<sort>:<cursor>]
+        sort = args[2] if len(args) > 2 and args[2] in SORTS else DEFAULT_SORT
+        cursor = parse_cursor(args[3] if len(args) > 3 else None)
+        return WT_PAGE.pack(args[0], int(args[1]), sort, **cursor_fields(cursor))
+    if action == "all":
+        return WT_ALL.pack(int(args[0]))
+    if action == "back":
+        return WT_RANKS.pack()
+    if action == "search":
+        return WT_SEARCH.pack()
+    if action == "sr":
+        return WT_RESULTS.pack(int(args[0]))
+    if action == "item":
+        # wt:item:<rank>:<id>[:<page>[:a|s|:<sort>:<cursor>]]
+        rank, acc_id, rest = args[0], int(args[1]), args[2:]
+        page = int(rest[0]) if rest else 1
+        src = rest[1] if rest[1:] in (["a"], ["s"]) else ("r" if rest else "")
+        sort = rest[1] if src == "r" and len(rest) > 1 and rest[1] in SORTS else DEFAULT_SORT
+        cursor = parse_cursor(rest[2] if src == "r" and len(rest) > 2 else None)
+        return WT_ITEM.pack(rank, acc_id, src, page, sort, **cursor_fields(cursor))
+    if action == "buy":
+        return WT_BUY.pack(args[0], int(args[1]))
+    if action == "nop":
+        return WT_NOP.pack()
+    raise ValueError(f"unknown action {action!r}")
 
 
 # ──────────────────────────────────────────────────────────────
 # ВСПОМОГАТЕЛЬНЫЕ
 # ──────────────────────────────────────────────────────────────
-async def _render_list(cb: CallbackQuery, *, rank: str, page: int):
-    """Показать страницу со списком лотов выбранного ранга."""
+async def _render_list(cb: CallbackQuery, *, rank: str, page: int, sort: str = DEFAULT_SORT,
+                       cursor: Optional[tuple[str, int, int]] = None):
+    """
+    Показать страницу со списком лотов выбранного ранга в порядке sort.
+    cursor — keyset от соседней страницы (app.db.edge_cursor): страница по цене стоит как по id.
+    Без курсора (первая страница, старые кнопки) — OFFSET.
+    """
     per_page = PER_PAGE if PER_PAGE > 0 else 10
     page = max(1, page)
 
-    if rank == "8":
-        total = await count_rank8_accounts("WarThunder")
-        items = await list_rank8_accounts("WarThunder", limit=per_page, offset=(page - 1) * per_page)
-    else:
-        total = await count_rank_accounts(rank)
-        items = await list_rank_accounts(rank, limit=per_page, offset=(page - 1) * per_page)
-
+    total = await count_rank_accounts(rank)
     pages = max(1, ceil(total / per_page)) if total else 1
     if page > pages:
         await cb.answer(f"☹️ Страницы {page} не существует", show_alert=True)
         return
 
+    offset = 0 if cursor else (page - 1) * per_page
+    items = await list_rank_accounts(rank, limit=per_page, offset=offset, sort=sort, cursor=cursor)
+    if cursor and (not items or (cursor[0] == "p" and len(items) < per_page)):
+        # лоты раскупили или назад упёрлись в начало — показываем первую страницу
+        page, cursor = 1, None
+        items = await list_rank_accounts(rank, limit=per_page, sort=sort)
+
     if not items:
         await cb.answer(f"Пока нет доступных лотов для {rank} rank.", show_alert=True)
         return
@@ -203,23 +307,111 @@ async def _render_list(cb: CallbackQuery, *, rank: str, page: int):
         acc_id = it.get("id")
         rows.append([InlineKeyboardButton(
             text=f"{title} — {price}₽",
-            callback_data=f"wt:item:{rank}:{acc_id}:{page}"
+            callback_data=WT_ITEM.pack(rank, acc_id, "r", page, sort, **cursor_fields(cursor))
         )])
 
-    # Навигация
+    # Навигация: соседние страницы — keyset от крайних лотов этой
     nav: list[InlineKeyboardButton] = []
     if page > 1:
-        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"wt:page:{rank}:{page-1}"))
-    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data="wt:nop"))
+        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=WT_PAGE.pack(
+            rank, page - 1, sort, **cursor_fields(edge_cursor("p", items[0]))
+        )))
+    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data=WT_NOP.pack()))
     if page < pages:
-        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"wt:page:{rank}:{page+1}"))
+        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=WT_PAGE.pack(
+            rank, page + 1, sort, **cursor_fields(edge_cursor("n", items[-1]))
+        )))
     if nav:
         rows.append(nav)
+    if len(items) > 1 or page > 1:
+        rows.append(sort_buttons(sort, lambda s: WT_PAGE.pack(rank, 1, s, **cursor_fields(None))))
 
-    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="wt:back")])
+    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data=WT_RANKS.pack())])
     kb = InlineKeyboardMarkup(inline_keyboard=rows)
 
     header = f"Секция: {rank} rank ({total} шт.)"
+    await _show_list(cb, header, kb)
+
+
+async def _render_all(cb: CallbackQuery, *, page: int):
+    """Страница сквозного списка: новые лоты всех разделов одним запросом к каталогу."""
+    per_page = PER_PAGE if PER_PAGE > 0 else 10
+    page = max(1, page)
+
+    total = await count_all_available()
+    pages = max(1, ceil(total / per_page)) if total else 1
+    if page > pages:
+        await cb.answer(f"☹️ Страницы {page} не существует", show_alert=True)
+        return
+
+    items = await list_all_available(limit=per_page, offset=(page - 1) * per_page)
+    if not items:
+        await cb.answer("Пока нет доступных лотов.", show_alert=True)
+        return
+
+    rows: list[list[InlineKeyboardButton]] = []
+    for it in items:
+        rows.append([InlineKeyboardButton(
+            text=f"[{it['rank']}] {it.get('button_title')} — {it.get('price_rub')}₽",
+            callback_data=WT_ITEM.pack(it["rank"], it["id"], "a", page, "", **cursor_fields(None))
+        )])
+
+    nav: list[InlineKeyboardButton] = []
+    if page > 1:
+        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=WT_ALL.pack(page - 1)))
+    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data=WT_NOP.pack()))
+    if page < pages:
+        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=WT_ALL.pack(page + 1)))
+    rows.append(nav)
+
+    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data=WT_RANKS.pack())])
+    kb = InlineKeyboardMarkup(inline_keyboard=rows)
+
+    await _show_list(cb, f"Все лоты ({total} шт.)", kb)
+
+
+async def _search_view(text: str, min_price: Optional[int], max_price: Optional[int],
+                       *, page: int) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+    """Страница результатов поиска: (заголовок, клавиатура) или None, если на странице пусто."""
+    per_page = PER_PAGE if PER_PAGE > 0 else 10
+    page = max(1, page)
+
+    # страница и общее число совпадений — один запрос к каталогу
+    found = await search_cached(text, min_price=min_price, max_price=max_price,
+                                   limit=per_page, offset=(page - 1) * per_page)
+    if not found["items"]:
+        return None
+    total = found["total"]
+    pages = max(1, ceil(total / per_page))
+
+    rows: list[list[InlineKeyboardButton]] = []
+    for it in found["items"]:
+        rows.append([InlineKeyboardButton(
+            text=f"[{it['rank']}] {it.get('button_title')} — {it.get('price_rub')}₽",
+            callback_data=WT_ITEM.pack(it["rank"], it["id"], "s", page, "", **cursor_fields(None))
+        )])
+
+    nav: list[InlineKeyboardButton] = []
+    if page > 1:
+        nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=WT_RESULTS.pack(page - 1)))
+    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data=WT_NOP.pack()))
+    if page < pages:
+        nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=WT_RESULTS.pack(page + 1)))
+    rows.append(nav)
+
+    rows.append([InlineKeyboardButton(text="🔎 Новый поиск", callback_data=WT_SEARCH.pack())])
+    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data=WT_RANKS.pack())])
+
+    terms = [html.escape(text)] if text else []
+    if min_price is not None:
+        terms.append(f"от {min_price}₽")
+    if max_price is not None:
+        terms.append(f"до {max_price}₽")
+    header = f"Поиск: {' '.join(terms)} ({total} шт.)"
+    return header, InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def _show_list(cb: CallbackQuery, header: str, kb: InlineKeyboardMarkup):
     try:
         # если текущее сообщение текстовое — редактируем
         if (cb.message.text or ""):
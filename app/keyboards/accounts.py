@@ -1,41 +1,60 @@
 # app/keyboards/accounts.py
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from math import ceil
+from typing import Callable, Optional
+
+from app.callbacks import ACC_BUY, ACC_NOP, ACC_PAGE, ACC_PICK, cursor_fields
+from app.db import DEFAULT_SORT, SORTS, edge_cursor
 
 MAX_ROWS = 10  # максимум 10 рядов на страницу (по одному аккаунту в ряд)
 
+SORT_LABELS = {"new": "🆕 Новые", "cheap": "⬇️ Дешевле", "dear": "⬆️ Дороже"}
+
+def sort_buttons(current: str, callback: Callable[[str], str]) -> list[InlineKeyboardButton]:
+    """Ряд выбора сортировки (app.db.SORTS); callback(sort) — callback_data первой страницы."""
+    return [
+        InlineKeyboardButton(text=("• " if sort == current else "") + SORT_LABELS[sort], callback_data=callback(sort))
+        for sort in SORTS
+    ]
+
 def _trim(text: str, limit: int = 64) -> str:
     return (text[: limit - 1] + "…") if len(text) > limit else text
 
-def accounts_list_kb(category: str, items: list[dict], total: int, page: int, per_page: int = MAX_ROWS) -> InlineKeyboardMarkup:
+def accounts_list_kb(category: str, items: list[dict], total: int, page: int, per_page: int = MAX_ROWS,
+                     sort: str = DEFAULT_SORT, cursor: Optional[tuple[str, int, int]] = None) -> InlineKeyboardMarkup:
     """
     items: [{id, button_title, price_rub}]
-    В callback аккаунта кладём текущую страницу, чтобы «Назад» вернул туда же.
+    В callback аккаунта кладём текущую страницу, сортировку и курсор, по которому она открыта,
+    чтобы «Назад» вернул туда же. Соседние страницы — keyset-курсоры от крайних лотов (app.db.edge_cursor).
     """
     rows: list[list[InlineKeyboardButton]] = []
 
     for it in items:
         label = f"{it['button_title']} — {it['price_rub']} ₽"
-        rows.append([InlineKeyboardButton(text=_trim(label), callback_data=f"acc:pick:{it['id']}:{page}")])
+        rows.append([InlineKeyboardButton(text=_trim(label),
+                                          callback_data=ACC_PICK.pack(it["id"], page, sort, **cursor_fields(cursor)))])
 
     # пагинация
     pages = max(1, ceil(total / per_page)) if per_page else 1
     if pages > 1:
-        prev_p = max(1, page - 1)
-        next_p = min(pages, page + 1)
         nav = []
-        if page > 1:
-            nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"acc:page:{prev_p}"))
-        nav.append(InlineKeyboardButton(text=f"Стр. {page}/{pages}", callback_data="acc:nop"))
-        if page < pages:
-            nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"acc:page:{next_p}"))
+        if page > 1 and items:
+            nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=ACC_PAGE.pack(
+                page - 1, sort, **cursor_fields(edge_cursor("p", items[0])))))
+        nav.append(InlineKeyboardButton(text=f"Стр. {page}/{pages}", callback_data=ACC_NOP.pack()))
+        if page < pages and items:
+            nav.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=ACC_PAGE.pack(
+                page + 1, sort, **cursor_fields(edge_cursor("n", items[-1])))))
         rows.append(nav)
+    if len(items) > 1:
+        rows.append(sort_buttons(sort, lambda s: ACC_PAGE.pack(1, s, **cursor_fields(None))))
 
     rows.append([InlineKeyboardButton(text="⬅️ В главное меню", callback_data="main:menu")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
-def account_card_kb(acc_id: int, page: int) -> InlineKeyboardMarkup:
+def account_card_kb(acc_id: int, page: int, sort: str = DEFAULT_SORT,
+                    cursor: Optional[tuple[str, int, int]] = None) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🛒 Купить", callback_data=f"acc:buy:{acc_id}")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data=f"acc:page:{page}")],
+        [InlineKeyboardButton(text="🛒 Купить", callback_data=ACC_BUY.pack(acc_id))],
+        [InlineKeyboardButton(text="⬅️ Назад", callback_data=ACC_PAGE.pack(page, sort, **cursor_fields(cursor)))],
     ])
@@ -1,9 +1,13 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-def admin_choose_rank_kb() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="8 rank", callback_data="admin:add:rank:8")],
-        [InlineKeyboardButton(text="7 rank", callback_data="admin:add:rank:7")],
-        [InlineKeyboardButton(text="6 rank", callback_data="admin:add:rank:6")],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="admin:add:cancel")]
-    ])
+from app.db_ranks import list_sections
+
+
+def admin_choose_rank_kb(action: str = "add") -> InlineKeyboardMarkup:
+    """Выбор раздела для админ-действия: admin:<action>:rank:<key> (add — /addacc, import — /importacc)."""
+    rows = [
+        [InlineKeyboardButton(text=f"{s.key} rank", callback_data=f"admin:{action}:rank:{s.key}")]
+        for s in list_sections()
+    ]
+    rows.append([InlineKeyboardButton(text="❌ Отмена", callback_data=f"admin:{action}:cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -6,6 +6,7 @@ def main_menu_kb() -> ReplyKeyboardMarkup:
         keyboard=[
             [KeyboardButton(text="🎮 WarThunder")],
             [KeyboardButton(text="💰 Баланс"), KeyboardButton(text="👤 Профиль")],
+            [KeyboardButton(text="📦 Мои покупки")],
             [KeyboardButton(text="❓ Помощь"), KeyboardButton(text="📞 Поддержка")],
         ]
     )
@@ -1,9 +1,33 @@
+from typing import Callable, Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-def wt_ranks_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="💥8 rank", callback_data="wt:rank:8")],
-        [InlineKeyboardButton(text="👾7 rank", callback_data="wt:rank:7")],
-        [InlineKeyboardButton(text="🤖6 rank", callback_data="wt:rank:6")],
-        [InlineKeyboardButton(text="⬅️ В главное меню", callback_data="main:menu")]
-    ])
+from app.callbacks import WT_ALL, WT_PAGE, WT_SEARCH, cursor_fields
+from app.db import DEFAULT_SORT
+from app.db_ranks import list_sections
+
+
+def _shop_rank_cb(key: str) -> str:
+    return WT_PAGE.pack(key, 1, DEFAULT_SORT, **cursor_fields(None))
+
+
+def wt_ranks_keyboard(inventory: dict[str, dict] | None = None,
+                      rank_cb: Optional[Callable[[str], str]] = None) -> InlineKeyboardMarkup:
+    """
+    Кнопки разделов строятся из реестра app.db_ranks.SECTIONS.
+    inventory — остатки из app.catalog.inventory_by_rank(): если передан, к кнопкам
+    добавляются число лотов, кнопка «Все лоты» (сквозной список по всем разделам) и «Поиск».
+    rank_cb(ключ раздела) → callback_data кнопки раздела; по умолчанию — первая страница витрины.
+    """
+    rank_cb = rank_cb or _shop_rank_cb
+    rows = []
+    for s in list_sections():
+        text = s.title
+        if inventory is not None:
+            text = f"{s.title} · {inventory.get(s.key, {}).get('cnt', 0)} шт."
+        rows.append([InlineKeyboardButton(text=text, callback_data=rank_cb(s.key))])
+    if inventory is not None:
+        rows.append([InlineKeyboardButton(text="🌐 Все лоты", callback_data=WT_ALL.pack(1))])
+        rows.append([InlineKeyboardButton(text="🔎 Поиск", callback_data=WT_SEARCH.pack())])
+    rows.append([InlineKeyboardButton(text="⬅️ В главное меню", callback_data="main:menu")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
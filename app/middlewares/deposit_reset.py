@@ -0,0 +1,39 @@
+# app/middlewares/deposit_reset.py
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from app.states.deposit import DepositStates
+
+logger = logging.getLogger(__name__)
+
+# кнопки самого пополнения — состояние не трогают
+DEPOSIT_PREFIXES = ("balance:deposit", "deposit:", "pay:")
+_DEPOSIT_STATES = {DepositStates.waiting_amount.state, DepositStates.choosing_method.state}
+
+
+class DepositResetMiddleware(BaseMiddleware):
+    """
+    Пользователь ушёл из пополнения в другой раздел (любая чужая кнопка) — сбрасываем
+    «жду сумму»/«выбор метода», и кнопка отрабатывает как обычно.
+    Outer-middleware на dp.callback_query: срабатывает до фильтров всех роутеров,
+    от порядка include_router (таблица app.callbacks первой) не зависит.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        state = data.get("state")
+        if (
+            state is not None
+            and data.get("raw_state") in _DEPOSIT_STATES
+            and not (event.data or "").startswith(DEPOSIT_PREFIXES)
+        ):
+            await state.clear()
+            data["raw_state"] = None  # фильтры по состоянию дальше видят уже сброшенное
+        return await handler(event, data)
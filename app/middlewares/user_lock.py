@@ -0,0 +1,62 @@
+# app/middlewares/user_lock.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# флаг хендлера: flags={"serialize": True} (или route(..., flags=...) в app.callbacks)
+#   True   — апдейты пользователя в такие хендлеры выполняются по очереди
+#   "drop" — если предыдущий ещё идёт, колбэк отвечается уведомлением и не выполняется (двойной тап)
+SERIALIZE_FLAG = "serialize"
+BUSY_TEXT = "⏳ Предыдущее действие ещё выполняется…"
+
+
+class UserLockMiddleware(BaseMiddleware):
+    """
+    Последовательное выполнение помеченных хендлеров одного пользователя (покупка, проверка оплаты,
+    правки админки). Остальные хендлеры — навигация, списки — идут без блокировок, как раньше.
+
+    Вешается inner-middleware на dp.message / dp.callback_query: флаги хендлера уже известны.
+    Замок на пользователя живёт, пока им кто-то пользуется (счётчик ссылок): словарь не растёт
+    с числом пользователей, вытеснять по таймеру нечего.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._locks: Dict[int, list] = {}  # user_id -> [asyncio.Lock, сколько апдейтов держат/ждут]
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        mode = get_flag(data, SERIALIZE_FLAG)
+        user = data.get("event_from_user")
+        if not mode or user is None:
+            return await handler(event, data)
+
+        entry = self._locks.get(user.id)
+        if entry is None:
+            entry = self._locks[user.id] = [asyncio.Lock(), 0]
+        lock = entry[0]
+
+        if mode == "drop" and lock.locked():
+            logger.info("UserLock: drop busy update for user %s", user.id)
+            if isinstance(event, CallbackQuery):
+                await event.answer(BUSY_TEXT)
+            return None
+
+        entry[1] += 1
+        try:
+            async with lock:
+                return await handler(event, data)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[user.id]
@@ -0,0 +1,171 @@
+# app/services/importer.py
+import csv
+import io
+import logging
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from app.creds import normalize_creds
+from app.db_ranks import get_section, insert_accounts_bulk
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH = 500        # строк на одно намерение писателя (одна транзакция)
+MAX_TITLE_LEN = 64        # текст инлайн-кнопки
+MAX_PRICE_RUB = 1_000_000
+
+# колонки CSV (первая строка — заголовок) и их синонимы
+_CSV_COLUMNS = {
+    "creds": "creds", "login:password": "creds",
+    "button_title": "button_title", "title": "button_title",
+    "price_rub": "price_rub", "price": "price_rub",
+    "caption": "caption",
+}
+
+
+def _split_line(line: str) -> list[str]:
+    """Строка без заголовка: login:password | название | цена [| описание] (или через таб / ;)."""
+    for sep in ("|", "\t", ";"):
+        if sep in line:
+            return [p.strip() for p in line.split(sep)]
+    return [line.strip()]
+
+
+def _records(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+    """(номер строки, сырые поля). CSV распознаётся по заголовку с колонкой creds."""
+    it = iter(lines)
+    for first_no, first in enumerate(it, start=1):
+        if first.strip() and not first.lstrip().startswith("#"):
+            break
+    else:
+        return
+
+    header = first.strip().lower()
+    delimiter = next((d for d in (",", ";", "\t") if d in header), None)
+    if delimiter and "creds" in header.split(delimiter):
+        columns = [_CSV_COLUMNS.get(c.strip()) for c in next(csv.reader([first], delimiter=delimiter))]
+        for no, values in enumerate(csv.reader(it, delimiter=delimiter), start=first_no + 1):
+            if values and any(v.strip() for v in values):
+                yield no, {c: v.strip() for c, v in zip(columns, values) if c}
+        return
+
+    for no, line in chain([(first_no, first)], enumerate(it, start=first_no + 1)):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        parts = _split_line(line)
+        rec = {"creds": parts[0]}
+        if len(parts) > 1:
+            rec["button_title"] = parts[1]
+        if len(parts) > 2:
+            rec["price_rub"] = parts[2]
+        if len(parts) > 3:
+            rec["caption"] = " | ".join(parts[3:])
+        yield no, rec
+
+
+def _validate(rec: dict, default_title: Optional[str], default_price: Optional[int]) -> tuple[Optional[dict], str]:
+    """Проверенная строка лота или (None, ошибка)."""
+    creds = rec.get("creds") or ""
+    login, _, password = creds.partition(":")
+    if not login.strip() or not password.strip():
+        return None, "creds: нужен формат login:password"
+
+    title = rec.get("button_title") or default_title or ""
+    if not title:
+        return None, "нет названия"
+    if len(title) > MAX_TITLE_LEN:
+        return None, f"название длиннее {MAX_TITLE_LEN} символов"
+
+    raw_price = rec.get("price_rub")
+    if raw_price in (None, ""):
+        if default_price is None:
+            return None, "нет цены"
+        price = default_price
+    else:
+        try:
+            price = int(raw_price)
+        except ValueError:
+            return None, f"цена не число: {raw_price!r}"
+    if not 0 < price <= MAX_PRICE_RUB:
+        return None, f"цена вне диапазона 1..{MAX_PRICE_RUB}"
+
+    return {"creds": creds.strip(), "button_title": title, "price_rub": price,
+            "caption": rec.get("caption") or None}, ""
+
+
+async def import_accounts(
+    rank: str,
+    lines: Iterable[str],
+    *,
+    default_title: Optional[str] = None,
+    default_price: Optional[int] = None,
+    created_by: Optional[int] = None,
+    dry_run: bool = False,
+    batch: int = IMPORT_BATCH,
+) -> dict:
+    """
+    Массовая загрузка лотов в раздел из текста/CSV (строки читаются потоково).
+    Каждая пачка из batch проверенных строк — одно намерение писателя: executemany в одной транзакции.
+    Дубли (по нормализованным creds) отсекаются и внутри файла, и против всего инвентаря (creds_index).
+    Возвращает dict: {"status": "ok"|"error", "rank", "total", "added", "duplicates", "errors",
+                      "report": [{"line", "status": "error"|"duplicate", "message"}, ...]}
+    """
+    get_section(rank)  # неизвестный раздел — ValueError до чтения файла
+    report: list[dict] = []
+    seen: set[str] = set()
+    pending: list[tuple[int, dict]] = []
+    added = total = 0
+
+    async def flush() -> None:
+        nonlocal added
+        if not pending:
+            return
+        if dry_run:
+            added += len(pending)
+        else:
+            res = await insert_accounts_bulk(rank, [row for _, row in pending], created_by=created_by)
+            added += res["inserted"]
+            for no, row in pending:
+                if row["creds"] in res["duplicates"]:
+                    report.append({"line": no, "status": "duplicate", "message": "уже есть в инвентаре"})
+        pending.clear()
+
+    for no, rec in _records(lines):
+        total += 1
+        row, error = _validate(rec, default_title, default_price)
+        if row is None:
+            report.append({"line": no, "status": "error", "message": error})
+            continue
+        key = normalize_creds(row["creds"])
+        if key in seen:
+            report.append({"line": no, "status": "duplicate", "message": "повтор в файле"})
+            continue
+        seen.add(key)
+        pending.append((no, row))
+        if len(pending) >= batch:
+            await flush()
+    await flush()
+
+    report.sort(key=lambda r: r["line"])
+    duplicates = sum(1 for r in report if r["status"] == "duplicate")
+    errors = len(report) - duplicates
+    logger.info("import rank=%s total=%s added=%s duplicates=%s errors=%s dry_run=%s",
+                rank, total, added, duplicates, errors, dry_run)
+    return {
+        "status": "ok" if not errors else "error",
+        "rank": rank,
+        "total": total,
+        "added": added,
+        "duplicates": duplicates,
+        "errors": errors,
+        "report": report,
+    }
+
+
+def report_csv(report: list[dict]) -> str:
+    """Отчёт по строкам в CSV (line,status,message) — для файла/документа в чат."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(("line", "status", "message"))
+    w.writerows((r["line"], r["status"], r["message"]) for r in report)
+    return buf.getvalue()
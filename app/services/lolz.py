@@ -10,7 +10,8 @@ logger = logging.getLogger(__name__)
 # --- Константы / ENV ---
 LOLZ_USERNAME = "sainz"  # ← жёстко зашитый ник получателя
 LOLZ_PAY_BASE_URL = os.getenv("LOLZ_PAY_BASE_URL", "https://lzt.market/balance/transfer")
-BASE = "https://prod-api.lzt.market"  # API для проверки платежей (comment)
+# API для проверки платежей (comment); можно направить на локальный стенд tools/fake_lolz.py
+BASE = os.getenv("LOLZ_API_BASE_URL", "https://prod-api.lzt.market").rstrip("/")
 
 def _headers() -> dict:
     """
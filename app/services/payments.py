@@ -0,0 +1,75 @@
+# app/services/payments.py
+import asyncio
+import json
+import logging
+
+from app.db import get_payment_by_comment, credit_payment, expire_stale_payments
+from app.services import lolz
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_HOURS = 3              # срок действия платежа
+SWEEP_INTERVAL_S = 10 * 60    # как часто свипер помечает просроченные счета
+
+
+async def check_payment(user_id: int, comment: str) -> dict:
+    """
+    Ядро проверки «pay:check»: локальная запись → API lolz → зачисление.
+    Уже зачисленный счёт (status='success') отвечает "paid" без запроса к API.
+    Хендлер только рисует ответ, а load-тест (tools/loadtest_pay_check.py) зовёт эту функцию напрямую.
+    Возвращает dict: {"status": "paid", "payment": {...}, "operation_id": ...} |
+                      {"status": "not_paid", "payment": {...}} |
+                      {"status": "unavailable", "payment": {...}, "status_code": int} |
+                      {"status": "not_found"}  — счёта нет или он принадлежит другому пользователю
+    """
+    rec = await get_payment_by_comment(comment)
+    if not rec:
+        return {"status": "not_found"}
+    if int(rec["user_id"]) != int(user_id):
+        # callback_data подделывается: чужой счёт не проверяем и не зачисляем
+        logger.warning("pay:check by user=%s for foreign payment comment=%s owner=%s",
+                       user_id, comment, rec["user_id"])
+        return {"status": "not_found"}
+    if rec["status"] == "success":
+        # уже зачислен — в API не ходим
+        return {"status": "paid", "payment": rec, "operation_id": rec.get("ext_operation_id")}
+
+    amount = int(rec["amount_rub"])
+
+    # Проверка в API Lolz
+    res = await lolz.find_payment_by_comment(comment)
+    status_code = res.get("status_code", 0)
+    if status_code in (0, 401, 403):
+        return {"status": "unavailable", "payment": rec, "status_code": status_code}
+
+    op = lolz.extract_success_operation(res.get("json", {}), expected_amount_rub=amount)
+    if not op:
+        return {"status": "not_paid", "payment": rec}
+
+    # если платёж найден — зачисляем (атомарно и не более одного раза на счёт)
+    new_balance = await credit_payment(
+        comment,
+        ext_operation_id=op["operation_id"],
+        raw_json=json.dumps(res["json"]),
+    )
+    if new_balance is not None:
+        logger.info("payment success: user=%s amount=%s comment=%s op=%s",
+                    user_id, amount, comment, op["operation_id"])
+    return {"status": "paid", "payment": rec, "operation_id": op["operation_id"]}
+
+
+async def run_expiry_sweeper(expire_hours: int = EXPIRE_HOURS, interval_s: float = SWEEP_INTERVAL_S) -> None:
+    """
+    Фоновая задача: раз в interval_s помечает просроченные pending-счета как expired.
+    Запускается из main.py через asyncio.create_task.
+    """
+    while True:
+        try:
+            n = await expire_stale_payments(expire_hours)
+            if n:
+                logger.info("payments sweeper: expired %s stale invoices", n)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("payments sweeper failed")
+        await asyncio.sleep(interval_s)
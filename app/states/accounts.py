@@ -7,3 +7,7 @@ class AddAccountStates(StatesGroup):
     waiting_button_title = State()  # ждём название кнопки
     waiting_photo = State()         # ждём фото с подписью
     waiting_price = State()         # ждём цену (целое число ₽)
+
+class ImportAccountsStates(StatesGroup):
+    waiting_rank = State()          # выбор раздела (rank)
+    waiting_document = State()      # ждём .txt/.csv со строками лотов
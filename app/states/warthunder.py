@@ -0,0 +1,5 @@
+# app/states/warthunder.py
+from aiogram.fsm.state import State, StatesGroup
+
+class WtSearchStates(StatesGroup):
+    waiting_query = State()        # ждём слова и/или цену ("тигр 100-300", "до 500")
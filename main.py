@@ -15,8 +15,18 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.types import BotCommand  # 👈 добавили
 
-from app.db import init_db
+from app.db import DB_PATH, init_db, run_users_flusher, flush_users
+from app.db_ranks import ensure_creds_index, init_sections, list_sections
+from app.db_profile import run_checkpointer
+from app.archive import run_archiver
+from app.backup import run_backups
+from app import db_broadcast, fsm_storage
+from app.db_pool import close_pools
+from app.db_writer import close_writers
+from app.services.payments import run_expiry_sweeper
 from app.middlewares.debounce import DebounceMiddleware
+from app.middlewares.user_lock import UserLockMiddleware
+from app.middlewares.deposit_reset import DepositResetMiddleware
 
 # Импортируем роутеры напрямую, чтобы не зависеть от __init__.py
 from app.handlers.menu import router as menu_router
@@ -26,6 +36,9 @@ from app.handlers.deposit import router as deposit_router
 from app.handlers.admin import router as admin_router
 from app.handlers.errors import router as errors_router
 from app.handlers.stats_admin import router as stats_admin_router
+from app.handlers.history import router as history_router
+from app.handlers.inline import router as inline_router
+from app.callbacks import table as callbacks_table
 
 # ------------------ Логирование ------------------
 logging.basicConfig(
@@ -42,12 +55,22 @@ bot = Bot(
     token=BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
-dp = Dispatcher()
+# FSM в SQLite: суммы пополнения, черновики /addacc, рассылки и /change переживают перезапуск
+fsm = fsm_storage.SQLiteStorage()
+dp = Dispatcher(storage=fsm)
 
 # Дебаунс: отвечаем только на самый свежий апдейт от пользователя в коротком окне
 dp.update.middleware(DebounceMiddleware(window_ms=600))  # подбери 400–800 мс по ощущениям
+# Покупки, оплата и правки админки (flags={"serialize": ...}) — по одной на пользователя; навигация без блокировок
+user_lock = UserLockMiddleware()
+dp.message.middleware(user_lock)
+dp.callback_query.middleware(user_lock)
+# Чужая кнопка во время ввода суммы пополнения сбрасывает его (до фильтров любого роутера)
+dp.callback_query.outer_middleware(DepositResetMiddleware())
 
 # Подключаем роутеры
+dp.include_router(callbacks_table.router)  # колбэки магазина по префиксу (app.callbacks), до строковых фильтров
+dp.include_router(inline_router)   # инлайн-поиск и /start lot-<rank>-<id> (до общего /start)
 dp.include_router(menu_router)     # главное меню и магазин
 dp.include_router(profile_router)  # профиль
 dp.include_router(balance_router)  # баланс
@@ -58,23 +81,49 @@ dp.include_router(accounts_admin_router)
 dp.include_router(warthunder_router)
 dp.include_router(change_admin_router)
 dp.include_router(stats_admin_router)
+dp.include_router(history_router)  # история покупок (/history)
 
 # ------------------ Команды бота (кнопка меню) ------------------
 async def set_default_commands(bot: Bot):
     commands = [
         BotCommand(command="start", description="Restart bot 🤖"),
+        BotCommand(command="history", description="Мои покупки 📦"),
         # если захочешь, можно добавить:
         # BotCommand(command="menu", description="Главное меню"),
         # BotCommand(command="balance", description="Проверить баланс"),
     ]
     await bot.set_my_commands(commands)
 
+def _db_files() -> list[str]:
+    """Файлы всех БД бота — для checkpoint-планировщика и бэкапов."""
+    files = [DB_PATH, db_broadcast.DB_PATH, fsm_storage.DB_PATH]
+    files += [s.db_path for s in list_sections() if not s.in_main_db]
+    return files
+
 # ------------------ Точка входа ------------------
 async def main():
     if not BOT_TOKEN:
         raise RuntimeError("BOT_TOKEN не найден в .env")
 
+    # миграции схем (PRAGMA user_version): схема актуальна — по одному чтению PRAGMA на БД
     await init_db()
+    await init_sections()  # БД разделов из реестра (новый раздел создаётся здесь же)
+    await db_broadcast.init()
+    await fsm_storage.init()
+    await ensure_creds_index()  # индекс creds всех разделов (строится один раз, дальше — вставками)
+
+    # Фоновый свипер: pending-счета старше срока жизни помечаются expired одним UPDATE
+    sweeper = asyncio.create_task(run_expiry_sweeper())
+    # Write-behind ensure_user: новые/изменившиеся пользователи пишутся пачкой раз в пару секунд
+    users_flusher = asyncio.create_task(run_users_flusher())
+    # FSM: изменения состояний пишутся пачкой, брошенные состояния чистятся по TTL
+    fsm_flusher = asyncio.create_task(fsm.run_flusher())
+    # WAL checkpoint всех БД (основная, разделы, рассылка) в фоне
+    checkpointer = asyncio.create_task(run_checkpointer(_db_files))
+    # проданные/скрытые лоты — из горячих accounts в архив, пачками
+    archiver = asyncio.create_task(run_archiver())
+    # online-снимки всех БД (backup API мелкими шагами) с ротацией
+    backups = asyncio.create_task(run_backups(_db_files))
 
     # Установим команды для кнопки меню
     await set_default_commands(bot)
@@ -85,7 +134,19 @@ async def main():
     # Некоторые версии aiogram 3 поддерживают skip_updates=True (пропустить очередь при старте):
     # await dp.start_polling(bot, skip_updates=True)
 
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        sweeper.cancel()
+        users_flusher.cancel()
+        fsm_flusher.cancel()
+        checkpointer.cancel()
+        archiver.cancel()
+        backups.cancel()
+        await flush_users()  # не терять очередь ensure_user при остановке
+        await fsm.flush()    # и несброшенные состояния FSM
+        await close_writers()
+        await close_pools()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,43 @@
+# tests/conftest.py
+"""
+Общая настройка тестов: все БД бота — во временном каталоге (env выставляется до импорта app.*,
+модули читают пути при импорте). Корутины гоняются фикстурой run: после теста писатели и пулы
+закрываются в том же event loop (потоки aiosqlite не daemon).
+
+  python -m pytest -q
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="wtbot_tests_")
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ["DB_PATH"] = os.path.join(TMP, "db.sqlite3")
+os.environ["RANK7_DB_PATH"] = os.path.join(TMP, "accounts_rank7.sqlite3")
+os.environ["RANK6_DB_PATH"] = os.path.join(TMP, "accounts_rank6.sqlite3")
+os.environ["RANK_SECTIONS_FILE"] = os.path.join(TMP, "sections.json")  # нет файла — разделы по умолчанию
+os.environ["FSM_DB_PATH"] = os.path.join(TMP, "fsm.sqlite3")
+os.environ["BACKUP_DIR"] = os.path.join(TMP, "backups")
+
+from app.db_pool import close_pools  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """run(coro) — выполнить корутину в новом event loop и закрыть писателей/пулы в нём же."""
+    def _run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await close_writers()
+                await close_pools()
+        return asyncio.run(main())
+    return _run
@@ -0,0 +1,91 @@
+# tests/test_callbacks.py
+import asyncio
+
+import pytest
+from aiogram.types import CallbackQuery, User
+
+from app.callbacks import (
+    MAX_CALLBACK_BYTES, VERSION, WT_BUY, WT_ITEM, CallbackCodecError, CallbackSchema, CallbackTable,
+)
+
+# префиксы тестовых схем — свои, реестр схем общий на процесс
+T_NUM = CallbackSchema("tn", a=int, b=int)
+T_TXT = CallbackSchema("tt", s=str)
+
+
+def test_round_trip():
+    data = WT_ITEM.pack("7", 123456, "r", 3, "cheap", "n", 1500, 42)
+    assert data.startswith(VERSION + "wi:")
+    assert WT_ITEM.unpack(data) == ("7", 123456, "r", 3, "cheap", "n", 1500, 42)
+    assert WT_BUY.unpack(WT_BUY.pack(rank="6", id=0)) == ("6", 0)
+
+
+def test_empty_and_negative_fields():
+    args = WT_ITEM.unpack(WT_ITEM.pack("8", 5, "", 1, "new", "", None, None))
+    assert (args.src, args.cdir, args.cprice, args.cid) == ("", "", None, None)
+    assert T_NUM.unpack(T_NUM.pack(-37, 0)) == (-37, 0)
+
+
+def test_ints_are_base36():
+    assert T_NUM.pack(35, 36) == f"{VERSION}tn:z:10"
+
+
+def test_64_byte_limit():
+    head = len(f"{VERSION}tt:")
+    fits = "x" * (MAX_CALLBACK_BYTES - head)
+    assert len(T_TXT.pack(fits).encode()) == MAX_CALLBACK_BYTES
+    with pytest.raises(CallbackCodecError):
+        T_TXT.pack(fits + "x")
+    # лимит в байтах, а не символах
+    with pytest.raises(CallbackCodecError):
+        T_TXT.pack("я" * ((MAX_CALLBACK_BYTES - head) // 2 + 1))
+
+
+@pytest.mark.parametrize("data", [
+    f"{VERSION}tn:1",           # не хватает поля
+    f"{VERSION}tn:1:2:3",       # лишнее поле
+    f"{VERSION}tn:1:!",         # не base36
+    f"{VERSION}tt:x",           # чужая схема
+    "tn:1:2",                   # без версии (старая кнопка)
+])
+def test_unpack_rejects(data):
+    with pytest.raises(CallbackCodecError):
+        T_NUM.unpack(data)
+
+
+def test_schema_validation():
+    with pytest.raises(CallbackCodecError):
+        T_TXT.pack("a:b")
+    with pytest.raises(ValueError):
+        CallbackSchema("tn", x=int)        # префикс уже занят
+    with pytest.raises(TypeError):
+        CallbackSchema("tf", x=float)
+
+
+def _cq(data: str) -> CallbackQuery:
+    return CallbackQuery(id="1", from_user=User(id=1, is_bot=False, first_name="t"), chat_instance="1", data=data)
+
+
+def test_table_match():
+    table = CallbackTable("test")
+    schema = CallbackSchema("tr", id=int)
+
+    @table.route(schema, flags={"serialize": "drop"})
+    async def handler(callback, callback_data):
+        return callback_data
+
+    @table.legacy("old")
+    def _old(args: list[str]) -> str:
+        return schema.pack(int(args[0]))
+
+    async def match(data: str):
+        return await table._match(_cq(data))
+
+    hit = asyncio.run(match(schema.pack(7)))
+    assert hit["callback_data"] == (7,)
+    assert hit["handler"].flags == {"serialize": "drop"}
+    # старая строковая кнопка — тот же маршрут с теми же флагами
+    legacy = asyncio.run(match("old:9"))
+    assert legacy["callback_data"] == (9,) and legacy["handler"] is hit["handler"]
+    assert asyncio.run(match("old:x"))["handler"] is table._stale
+    assert asyncio.run(match("pay:check:1")) is False
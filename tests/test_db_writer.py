@@ -0,0 +1,93 @@
+# tests/test_db_writer.py
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.db_writer import DbWriter
+
+
+async def _create(db) -> None:
+    await db.execute("CREATE TABLE IF NOT EXISTS t(k TEXT PRIMARY KEY)")
+
+
+def _insert(k: str):
+    async def intent(db) -> str:
+        await db.execute("INSERT INTO t(k) VALUES (?)", (k,))
+        return k
+    return intent
+
+
+async def _failing(db) -> None:
+    # своя запись есть, потом ошибка — SAVEPOINT должен откатить только её
+    await db.execute("INSERT INTO t(k) VALUES ('bad')")
+    raise RuntimeError("boom")
+
+
+def _keys(path) -> set[str]:
+    conn = sqlite3.connect(path)
+    try:
+        return {r[0] for r in conn.execute("SELECT k FROM t")}
+    finally:
+        conn.close()
+
+
+def test_failing_intent_keeps_batch_neighbours(run, tmp_path):
+    path = str(tmp_path / "w.sqlite3")
+
+    async def scenario():
+        writer = DbWriter(path, name="test")
+        try:
+            await writer.submit(_create)
+            batches = writer.stats["batches"]
+            # всё ставится в очередь до первого шага задачи писателя — одна пачка
+            results = await asyncio.gather(
+                writer.submit(_insert("a")), writer.submit(_failing), writer.submit(_insert("b")),
+                return_exceptions=True,
+            )
+            return results, writer.stats["batches"] - batches
+        finally:
+            await writer.close()
+
+    (a, err, b), batches = run(scenario())
+    assert batches == 1
+    assert (a, b) == ("a", "b")
+    assert isinstance(err, RuntimeError)
+    assert _keys(path) == {"a", "b"}
+
+
+def test_future_resolves_after_commit(run, tmp_path):
+    path = str(tmp_path / "w.sqlite3")
+    seen: dict[str, object] = {}
+
+    async def scenario():
+        writer = DbWriter(path, name="test")
+        try:
+            await writer.submit(_create)
+            first = asyncio.ensure_future(writer.submit(_insert("a")))
+
+            async def later(db) -> None:
+                # та же пачка: намерение "a" уже выполнено, но COMMIT ещё впереди
+                seen["first_done"] = first.done()
+                seen["visible"] = "a" in _keys(path)
+
+            second = asyncio.ensure_future(writer.submit(later))
+            await first
+            seen["after"] = "a" in _keys(path)
+            await second
+        finally:
+            await writer.close()
+
+    run(scenario())
+    assert seen == {"first_done": False, "visible": False, "after": True}
+
+
+def test_closed_writer_rejects_intents(run, tmp_path):
+    async def scenario():
+        writer = DbWriter(str(tmp_path / "w.sqlite3"), name="test")
+        await writer.submit(_create)
+        await writer.close()
+        await writer.submit(_insert("a"))
+
+    with pytest.raises(RuntimeError):
+        run(scenario())
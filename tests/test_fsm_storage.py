@@ -0,0 +1,92 @@
+# tests/test_fsm_storage.py
+import sqlite3
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+
+from app import fsm_storage
+from app.db_migrate import migrate_async
+from app.fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+def _rows(path) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {k: (s, d, ts) for k, s, d, ts in conn.execute("SELECT key, state, data, updated_at FROM fsm_states")}
+    finally:
+        conn.close()
+
+
+async def _storage(path, **kwargs) -> SQLiteStorage:
+    await migrate_async(path, fsm_storage.MIGRATIONS, name="fsm")
+    return SQLiteStorage(path, **kwargs)
+
+
+def test_flush_writes_batch_and_survives_restart(run, tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def scenario():
+        storage = await _storage(path)
+        await storage.set_state(KEY, "Deposit:waiting_amount")
+        await storage.set_data(KEY, {"amount": 150})
+        before = _rows(path)
+        written = await storage.flush()
+        again = await storage.flush()
+        # новый экземпляр — пустой кэш, читаем из файла
+        fresh = await _storage(path)
+        return before, written, again, await fresh.get_state(KEY), await fresh.get_data(KEY)
+
+    before, written, again, state, data = run(scenario())
+    assert before == {}                       # до flush в файле ничего нет
+    assert (written, again) == (1, 0)         # две записи одного ключа — одна строка пачки
+    assert state == "Deposit:waiting_amount"
+    assert data == {"amount": 150}
+    assert _rows(path)["1:10:10"][1] == '{"amount":150}'
+
+
+def test_cleared_state_is_deleted_on_flush(run, tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def scenario():
+        storage = await _storage(path)
+        await storage.set_state(KEY, "S:one")
+        await storage.flush()
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        await storage.flush()
+
+    run(scenario())
+    assert _rows(path) == {}
+
+
+def test_ttl_hides_and_sweeps_abandoned_states(run, tmp_path, monkeypatch):
+    path = str(tmp_path / "fsm.sqlite3")
+    old_key = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+    async def scenario():
+        storage = await _storage(path, ttl_s=60)
+        await storage.set_state(KEY, "S:fresh")
+        await storage.set_state(old_key, "S:old")
+        await storage.flush()
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE fsm_states SET updated_at = ? WHERE key = '1:20:20'", (int(time.time()) - 120,))
+        conn.commit()
+        conn.close()
+
+        fresh = await _storage(path, ttl_s=60)
+        seen = await fresh.get_state(KEY), await fresh.get_state(old_key)
+        swept = await fresh.sweep()
+
+        # запись в кэше тоже стареет: через ttl_s её нет и без обращения к файлу
+        later = time.time() + 120
+        monkeypatch.setattr(fsm_storage.time, "time", lambda: later)
+        expired = await storage.get_state(KEY)
+        return seen, swept, expired
+
+    seen, swept, expired = run(scenario())
+    assert seen == ("S:fresh", None)
+    assert swept == 1
+    assert set(_rows(path)) == {"1:10:10"}
+    assert expired is None
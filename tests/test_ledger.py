@@ -0,0 +1,58 @@
+# tests/test_ledger.py
+import pytest
+
+from app import db
+
+
+async def _user(user_id: int, username: str) -> None:
+    await db.init_db()
+    await db.ensure_user(user_id, username)
+
+
+def test_ledger_sum_matches_balance(run):
+    uid = 1001
+
+    async def scenario():
+        await _user(uid, "ledger_sum")
+        await db.add_balance_rub(uid, 300, kind="deposit", ref="t1")
+        await db.add_balance_rub(uid, -120, kind="purchase", ref="t2")
+        await db.add_balance_rub_by_username("ledger_sum", 45)
+        return await db.get_balance_rub(uid), await db.list_ledger(uid), await db.reconcile_balances()
+
+    balance, ledger, mismatches = run(scenario())
+    assert balance == 225
+    assert sum(e["delta_rub"] for e in ledger) == balance
+    assert ledger[0]["balance_after"] == balance
+    assert [e["kind"] for e in ledger] == ["admin_give", "purchase", "deposit"]
+    assert mismatches == []
+
+
+def test_capped_debit_is_recorded(run):
+    uid = 1002
+
+    async def scenario():
+        await _user(uid, "ledger_cap")
+        await db.add_balance_rub(uid, 50, kind="deposit")
+        capped = await db.add_balance_rub_by_username("ledger_cap", -80)
+        empty = await db.add_balance_rub_by_username("ledger_cap", -10)
+        return capped, empty, await db.list_ledger(uid), await db.reconcile_balances()
+
+    capped, empty, ledger, mismatches = run(scenario())
+    assert capped == (0, -50)                 # списали сколько было, не ниже нуля
+    assert empty == (0, 0)                    # с нулевого баланса списывать нечего
+    assert [(e["delta_rub"], e["balance_after"]) for e in ledger] == [(-50, 0), (50, 50)]
+    assert ledger[0]["kind"] == "admin_take"
+    assert mismatches == []
+
+
+def test_credit_without_user_rolls_back(run):
+    async def scenario():
+        await db.init_db()
+        _, comment = await db.create_payment_unique(1003, "lolz", 100, "pending", make_comment=lambda: "ledger-orphan")
+        with pytest.raises(RuntimeError):
+            await db.credit_payment(comment, ext_operation_id=1, raw_json=None)
+        return await db.get_payment_by_comment(comment), await db.list_ledger(1003)
+
+    payment, ledger = run(scenario())
+    assert payment["status"] == "pending"
+    assert ledger == []
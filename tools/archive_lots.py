@@ -0,0 +1,80 @@
+# tools/archive_lots.py
+"""
+Разовый перенос проданных лотов в accounts_archive (то же делает фоновая задача бота).
+Показывает строки и страницы accounts и её индексов до/после (dbstat).
+
+  python tools/archive_lots.py --batch 500 [--vacuum]
+  python tools/archive_lots.py --restore hidden     # вернуть из архива скрытые лоты
+
+--restore — обратный перенос лотов с указанными статусами (через запятую) из архива в accounts.
+
+--vacuum — после переноса VACUUM файлов БД (вернуть освободившиеся страницы ФС);
+запускать при остановленном боте.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import db as main_db  # noqa: E402
+from app.archive import archive_lots, restore_lots  # noqa: E402
+from app.db_pool import close_pools  # noqa: E402
+from app.db_ranks import init_sections, list_sections  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+
+
+def _files() -> list[str]:
+    return [main_db.DB_PATH] + [s.db_path for s in list_sections() if not s.in_main_db]
+
+
+def _sizes(path: str) -> tuple[int, int]:
+    """(строк в accounts, страниц у accounts и её индексов)."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+        pages = conn.execute(
+            "SELECT COUNT(*) FROM dbstat WHERE name = 'accounts' "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'accounts')"
+        ).fetchone()[0]
+        return rows, pages
+    finally:
+        conn.close()
+
+
+async def run(args) -> None:
+    await main_db.init_db()
+    await init_sections()
+    before = {path: _sizes(path) for path in _files()}
+    try:
+        if args.restore:
+            statuses = tuple(s.strip() for s in args.restore.split(",") if s.strip())
+            moved = await restore_lots(statuses, batch=args.batch)
+        else:
+            moved = await archive_lots(batch=args.batch)
+    finally:
+        await close_writers()
+        await close_pools()
+    print(f"moved: {moved}")
+
+    for path in _files():
+        if args.vacuum:
+            conn = sqlite3.connect(path)
+            conn.execute("VACUUM")
+            conn.close()
+        (rows0, pages0), (rows1, pages1) = before[path], _sizes(path)
+        print(f"{path}: accounts rows {rows0} -> {rows1}, table+index pages {pages0} -> {pages1}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Перенос проданных лотов в архив (и обратно: --restore)")
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--restore", metavar="STATUSES", help="вернуть из архива лоты со статусами, напр. hidden")
+    ap.add_argument("--vacuum", action="store_true")
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# tools/backup_dbs.py
+"""
+Online-снимок всех БД бота (основная, разделы, рассылка, FSM) — то же, что фоновая задача.
+Можно запускать при работающем боте: копирование идёт backup API мелкими шагами,
+каждый снимок проверяется integrity_check, старые снимки сверх --keep удаляются.
+
+  python tools/backup_dbs.py [--dir backups] [--keep 7]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import db as main_db, db_broadcast, fsm_storage  # noqa: E402
+from app.backup import BACKUP_DIR, BACKUP_KEEP, backup_all  # noqa: E402
+from app.db_ranks import list_sections  # noqa: E402
+
+
+def _files() -> list[str]:
+    files = [main_db.DB_PATH, db_broadcast.DB_PATH, fsm_storage.DB_PATH]
+    files += [s.db_path for s in list_sections() if not s.in_main_db]
+    return files
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Online-бэкап всех БД с проверкой и ротацией")
+    ap.add_argument("--dir", default=BACKUP_DIR)
+    ap.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    args = ap.parse_args()
+
+    res = asyncio.run(backup_all(_files(), backup_dir=args.dir, keep=args.keep))
+    for f in res["files"]:
+        extra = f"pages={f['pages']} restarts={f['restarts']} {f['elapsed_s']}s" if "pages" in f else f.get("error", "")
+        print(f"[{f['status']}] {f['db']} {extra}")
+    print(f"snapshot: {res['dir']} removed: {res['removed']}")
+    sys.exit(0 if res["status"] == "ok" else 1)
+
+
+if __name__ == "__main__":
+    main()
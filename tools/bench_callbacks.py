@@ -0,0 +1,135 @@
+# tools/bench_callbacks.py
+"""
+Микробенчмарк маршрутизации колбэков: сколько стоит найти хендлер для нажатия кнопки.
+
+Сравнивает:
+  chain — прежняя цепочка фильтров aiogram: роутеры в порядке main.py, у магазина —
+          строковые F.data.startswith("wt:...")/("acc:...") по одному на действие;
+          фильтры проверяются по очереди до первого совпадения
+  table — app.callbacks: роутер таблицы первым, dict-lookup по префиксу + unpack;
+          чужие колбэки (pay:, chg:, ...) после промаха идут по той же цепочке
+
+  BOT_TOKEN=1:a python tools/bench_callbacks.py --rounds 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+tmp = tempfile.mkdtemp(prefix="wtbot_bench_")
+os.environ.setdefault("BOT_TOKEN", "1:bench")
+os.environ["DB_PATH"] = os.path.join(tmp, "db.sqlite3")
+
+from aiogram import F  # noqa: E402
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject  # noqa: E402
+from aiogram.types import CallbackQuery, User  # noqa: E402
+
+import main  # noqa: E402
+from app.callbacks import (  # noqa: E402
+    ACC_BUY, ACC_PAGE, ACC_PICK, WT_BUY, WT_ITEM, WT_NOP, WT_PAGE, table,
+)
+from app.handlers.menu import router as menu_router  # noqa: E402
+from app.handlers.warthunder import router as warthunder_router  # noqa: E402
+
+# фильтры магазина до перехода на app.callbacks (в порядке объявления, после остальных хендлеров роутера)
+_OLD_SHOP = {
+    menu_router: [F.data.startswith("acc:page:"), F.data.startswith("acc:pick:"), F.data.startswith("acc:buy:")],
+    warthunder_router: [F.data.startswith(p) for p in ("wt:rank:", "wt:page:", "wt:all:")]
+               + [F.data == "wt:back", F.data == "wt:search"]
+               + [F.data.startswith(p) for p in ("wt:sr:", "wt:item:", "wt:buy:")],
+}
+
+# (старая строка, новая строка) — типичные нажатия; последние — чужие роутеры
+SAMPLES = [
+    ("wt:page:7:3:cheap:n1500.42", WT_PAGE.pack("7", 3, "cheap", "n", 1500, 42)),
+    ("wt:item:7:42:3:cheap:n1500.42", WT_ITEM.pack("7", 42, "r", 3, "cheap", "n", 1500, 42)),
+    ("wt:buy:7:42", WT_BUY.pack("7", 42)),
+    ("wt:nop", WT_NOP.pack()),
+    ("acc:page:2:new:n900.10", ACC_PAGE.pack(2, "new", "n", 900, 10)),
+    ("acc:pick:10:2:new:n900.10", ACC_PICK.pack(10, 2, "new", "n", 900, 10)),
+    ("acc:buy:10", ACC_BUY.pack(10)),
+    ("pay:check:123", "pay:check:123"),
+    ("main:menu", "main:menu"),
+]
+
+
+def _walk(router):
+    yield router
+    for sub in router.sub_routers:
+        yield from _walk(sub)
+
+
+def _chains() -> tuple[list[HandlerObject], list[HandlerObject]]:
+    """(прежняя цепочка, цепочка после таблицы) — callback_query-хендлеры всех роутеров по порядку."""
+    old, new = [], []
+    for router in _walk(main.dp):
+        if router is table.router:
+            continue
+        new.extend(router.callback_query.handlers)
+        old.extend(router.callback_query.handlers)
+        old.extend(HandlerObject(callback=_noop, filters=[FilterObject(f)]) for f in _OLD_SHOP.get(router, ()))
+    return old, new
+
+
+async def _noop(callback: CallbackQuery) -> None:
+    pass
+
+
+def _event(data: str) -> CallbackQuery:
+    return CallbackQuery(id="1", from_user=User(id=1, is_bot=False, first_name="b"),
+                         chat_instance="1", data=data)
+
+
+async def _route_chain(chain: list[HandlerObject], event: CallbackQuery) -> int:
+    for i, h in enumerate(chain):
+        ok, _ = await h.check(event, raw_state=None)
+        if ok:
+            return i + 1
+    return len(chain)
+
+
+async def run(args) -> None:
+    old_chain, new_chain = _chains()
+    matcher = table.router.callback_query.handlers[0]
+    print(f"[i] callback-хендлеров: chain={len(old_chain)}, table: 1 + {len(new_chain)} строковых")
+
+    totals = {"chain": 0.0, "table": 0.0}
+    for old_data, new_data in SAMPLES:
+        old_ev, new_ev = _event(old_data), _event(new_data)
+        checks = await _route_chain(old_chain, old_ev)
+
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            await _route_chain(old_chain, old_ev)
+        t_chain = (time.perf_counter() - t0) / args.rounds
+
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            ok, _ = await matcher.check(new_ev, raw_state=None)
+            if not ok:
+                await _route_chain(new_chain, new_ev)
+        t_table = (time.perf_counter() - t0) / args.rounds
+
+        totals["chain"] += t_chain
+        totals["table"] += t_table
+        print(f"{old_data:<32} checks={checks:>3}  chain={t_chain * 1e6:8.2f} µs  "
+              f"table={t_table * 1e6:8.2f} µs  ({new_data})")
+
+    n = len(SAMPLES)
+    print(f"[avg] chain={totals['chain'] / n * 1e6:.2f} µs  table={totals['table'] / n * 1e6:.2f} µs  "
+          f"x{totals['chain'] / max(totals['table'], 1e-12):.1f}")
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Микробенчмарк маршрутизации callback_data")
+    ap.add_argument("--rounds", type=int, default=20000)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,134 @@
+# tools/bench_purchase_contention.py
+"""
+Бенчмарк конкуренции покупок 7/6 ранга: много покупателей одновременно жмут «Купить» на один лот.
+
+Сравнивает:
+  legacy — старый путь wt_buy (чтение лота, чтение баланса, списание, mark_sold на разных соединениях)
+  atomic — app.db_ranks.purchase_account (ATTACH + одна транзакция BEGIN IMMEDIATE)
+
+  python tools/bench_purchase_contention.py --buyers 200 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+tmp = tempfile.mkdtemp(prefix="wtbot_bench_")
+os.environ["DB_PATH"] = os.path.join(tmp, "db.sqlite3")
+os.environ["RANK7_DB_PATH"] = os.path.join(tmp, "accounts_rank7.sqlite3")
+
+from app import db as main_db  # noqa: E402
+from app import db_ranks  # noqa: E402
+from app.db_pool import close_pools  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+
+RANK = "7"
+PRICE = 100
+
+
+def _pct(vals: list[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, round(p / 100.0 * (len(vals) - 1)))]
+
+
+async def legacy_buy(user_id: int, acc_id: int) -> dict:
+    """Старый путь wt_buy для 7/6 ранга — только для сравнения."""
+    row = await db_ranks.get_account(RANK, acc_id)
+    if not row or row.get("status") != "available":
+        return {"status": "not_available"}
+    price = int(row["price_rub"])
+    if await main_db.get_balance_rub(user_id) < price:
+        return {"status": "insufficient"}
+    await main_db.add_balance_rub(user_id, -price, kind="purchase", ref=f"{RANK}:{acc_id}")
+    await db_ranks.mark_sold(RANK, acc_id)
+    return {"status": "ok"}
+
+
+async def atomic_buy(user_id: int, acc_id: int) -> dict:
+    return await db_ranks.purchase_account(RANK, user_id, acc_id)
+
+
+async def _setup(buyers: int) -> None:
+    for uid in range(1, buyers + 1):
+        await main_db.ensure_user(uid, f"buyer{uid}")
+    await main_db.flush_users()
+    conn = sqlite3.connect(main_db.DB_PATH)
+    conn.execute("UPDATE users SET balance_rub = ?", (PRICE * 10,))
+    conn.execute("DELETE FROM balance_ledger")
+    conn.execute(
+        "INSERT INTO balance_ledger(user_id, delta_rub, kind, balance_after) "
+        "SELECT user_id, balance_rub, 'opening', balance_rub FROM users"
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _round(fn, buyers: int) -> tuple[Counter, list[float], float]:
+    acc_id = await db_ranks.insert_account(
+        RANK, button_title="bench", creds="login:pass", photo_file_id=None, caption=None, price_rub=PRICE
+    )
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def one(uid: int) -> None:
+        t0 = time.perf_counter()
+        try:
+            res = await fn(uid, acc_id)
+            statuses[res["status"]] += 1
+        except Exception as e:
+            statuses[f"exc:{type(e).__name__}"] += 1
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(uid) for uid in range(1, buyers + 1)))
+    return statuses, latencies, time.perf_counter() - t0
+
+
+async def run(args) -> None:
+    await main_db.init_db()
+    db_ranks.init_rank_db(db_ranks.RANK7_DB)
+    await _setup(args.buyers)
+
+    for name, fn in (("legacy", legacy_buy), ("atomic", atomic_buy)):
+        total: Counter = Counter()
+        lats: list[float] = []
+        wall = 0.0
+        for _ in range(args.rounds):
+            st, lt, w = await _round(fn, args.buyers)
+            total.update(st)
+            lats.extend(lt)
+            wall += w
+        diffs = await main_db.reconcile_balances()
+        conn = sqlite3.connect(main_db.DB_PATH)
+        debited = conn.execute("SELECT SUM(? - balance_rub) FROM users", (PRICE * 10,)).fetchone()[0]
+        conn.close()
+        print(f"[{name}] buyers={args.buyers} rounds={args.rounds} wall={wall:.2f}s "
+              f"p50={_pct(lats, 50):.1f}ms p95={_pct(lats, 95):.1f}ms p99={_pct(lats, 99):.1f}ms")
+        print(f"[{name}] statuses={dict(total)} sold-per-lot={total.get('ok', 0) / args.rounds:.2f} "
+              f"debited={debited}₽ (лотов: {args.rounds}, корректно ≤ {PRICE * args.rounds}₽) "
+              f"ledger-diffs={len(diffs)}")
+        await _setup(args.buyers)
+    await close_writers()
+    await close_pools()
+    print(f"[OK] DB: {tmp}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк конкурентной покупки одного лота")
+    ap.add_argument("--buyers", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=3)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# tools/bench_storage_profile.py
+"""
+Бенчмарк профиля хранения SQLite (app/db_profile.py): конкурентные чтения и записи.
+
+Запускает одну и ту же нагрузку дважды, в отдельных процессах (профиль читается при импорте):
+  legacy — rollback journal, synchronous=FULL, без mmap, кэш по умолчанию (как было)
+  tuned  — профиль по умолчанию: WAL, synchronous=NORMAL, busy_timeout, mmap, кэш
+
+Нагрузка: читатели листают витрину 8 rank и остатки каталога, писатели меняют балансы
+(через писателя основной БД), всё одновременно в течение --seconds.
+
+  python tools/bench_storage_profile.py --readers 50 --writers 20 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROFILES = {
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT_MS": "",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "SQLITE_TEMP_STORE": "",
+    },
+    "tuned": {},
+}
+
+LOTS = 5000
+USERS = 200
+
+
+def _pct(vals: list[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, round(p / 100.0 * (len(vals) - 1)))]
+
+
+def _seed(path: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO accounts(category, button_title, creds, price_rub, status) VALUES ('WarThunder', ?, ?, ?, 'available')",
+        [(f"lot {i}", f"login{i}:pass", 100 + i % 900) for i in range(LOTS)]
+    )
+    conn.executemany(
+        "INSERT INTO users(user_id, username, balance_rub) VALUES (?, ?, 1000000)",
+        [(uid, f"bench{uid}") for uid in range(1, USERS + 1)]
+    )
+    conn.execute(
+        "INSERT INTO balance_ledger(user_id, delta_rub, kind, balance_after) "
+        "SELECT user_id, balance_rub, 'opening', balance_rub FROM users"
+    )
+    conn.commit()
+    conn.close()
+
+
+async def child(args) -> dict:
+    sys.path.insert(0, ROOT)
+    from app import db as main_db
+    from app import catalog, db_ranks
+    from app.db_pool import close_pools
+    from app.db_writer import close_writers
+
+    await main_db.init_db()
+    await db_ranks.init_sections()
+    _seed(main_db.DB_PATH)
+
+    deadline = time.perf_counter() + args.seconds
+    read_lat: list[float] = []
+    write_lat: list[float] = []
+    errors: Counter = Counter()
+
+    async def reader() -> None:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                await main_db.count_accounts("WarThunder")
+                await main_db.list_accounts("WarThunder", limit=10, offset=random.randrange(LOTS - 10))
+                await catalog.inventory_by_rank()
+            except Exception as e:
+                errors[f"read {type(e).__name__}: {e}"] += 1
+            read_lat.append((time.perf_counter() - t0) * 1000.0)
+
+    async def writer() -> None:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                await main_db.add_balance_rub(random.randint(1, USERS), random.choice((-1, 1)), kind="bench")
+            except Exception as e:
+                errors[f"write {type(e).__name__}: {e}"] += 1
+            write_lat.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*([reader() for _ in range(args.readers)] + [writer() for _ in range(args.writers)]))
+    wall = time.perf_counter() - t0
+
+    await close_writers()
+    await close_pools()
+    conn = sqlite3.connect(main_db.DB_PATH)
+    journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    return {
+        "journal_mode": journal,
+        "reads_per_s": len(read_lat) / wall,
+        "read_p50": _pct(read_lat, 50), "read_p95": _pct(read_lat, 95), "read_p99": _pct(read_lat, 99),
+        "writes_per_s": len(write_lat) / wall,
+        "write_p50": _pct(write_lat, 50), "write_p95": _pct(write_lat, 95), "write_p99": _pct(write_lat, 99),
+        "errors": dict(errors),
+    }
+
+
+def parent(args) -> None:
+    for name, overrides in PROFILES.items():
+        tmp = tempfile.mkdtemp(prefix=f"wtbot_profile_{name}_")
+        env = dict(os.environ)
+        env.update(overrides)
+        env.update({
+            "DB_PATH": os.path.join(tmp, "db.sqlite3"),
+            "RANK7_DB_PATH": os.path.join(tmp, "accounts_rank7.sqlite3"),
+            "RANK6_DB_PATH": os.path.join(tmp, "accounts_rank6.sqlite3"),
+            "RANK_SECTIONS_FILE": os.path.join(tmp, "sections.json"),  # нет файла — реестр по умолчанию
+        })
+        cmd = [sys.executable, __file__, "--child",
+               "--readers", str(args.readers), "--writers", str(args.writers), "--seconds", str(args.seconds)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"[{name}] journal={r['journal_mode']} readers={args.readers} writers={args.writers}")
+        print(f"[{name}] reads  {r['reads_per_s']:.0f}/s p50={r['read_p50']:.1f}ms "
+              f"p95={r['read_p95']:.1f}ms p99={r['read_p99']:.1f}ms")
+        print(f"[{name}] writes {r['writes_per_s']:.0f}/s p50={r['write_p50']:.1f}ms "
+              f"p95={r['write_p95']:.1f}ms p99={r['write_p99']:.1f}ms")
+        if r["errors"]:
+            print(f"[{name}] errors={r['errors']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк профиля хранения SQLite (чтение/запись одновременно)")
+    ap.add_argument("--readers", type=int, default=50)
+    ap.add_argument("--writers", type=int, default=20)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+    else:
+        parent(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# tools/bench_writer.py
+"""
+Бенчмарк записи в основную БД: много конкурентных хендлеров меняют баланс.
+
+Сравнивает:
+  direct — как было: своё соединение, BEGIN IMMEDIATE и COMMIT на каждую запись
+  writer — app.db.add_balance_rub через единственного писателя (очередь + group commit)
+
+  python tools/bench_writer.py --tasks 200 --writes 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import aiosqlite
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+tmp = tempfile.mkdtemp(prefix="wtbot_writer_")
+os.environ["DB_PATH"] = os.path.join(tmp, "db.sqlite3")
+os.environ["RANK7_DB_PATH"] = os.path.join(tmp, "accounts_rank7.sqlite3")
+os.environ["RANK6_DB_PATH"] = os.path.join(tmp, "accounts_rank6.sqlite3")
+
+from app import db as main_db  # noqa: E402
+from app.db_pool import close_pools  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+
+
+def _pct(vals: list[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, round(p / 100.0 * (len(vals) - 1)))]
+
+
+async def direct_add(user_id: int, delta: int) -> None:
+    """Старый путь add_balance_rub — только для сравнения."""
+    async with aiosqlite.connect(main_db.DB_PATH) as db:
+        await db.execute("BEGIN IMMEDIATE")
+        await main_db._apply_balance_delta(db, user_id, delta, "bench", None)
+        await db.commit()
+
+
+async def writer_add(user_id: int, delta: int) -> None:
+    await main_db.add_balance_rub(user_id, delta, kind="bench")
+
+
+async def _run(fn, tasks: int, writes: int) -> tuple[Counter, list[float], float]:
+    latencies: list[float] = []
+    errors: Counter = Counter()
+
+    async def one(uid: int) -> None:
+        for _ in range(writes):
+            t0 = time.perf_counter()
+            try:
+                await fn(uid, 1)
+            except Exception as e:
+                errors[f"{type(e).__name__}: {e}"] += 1
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(uid) for uid in range(1, tasks + 1)))
+    return errors, latencies, time.perf_counter() - t0
+
+
+async def run(args) -> None:
+    await main_db.init_db()
+    for uid in range(1, args.tasks + 1):
+        await main_db.ensure_user(uid, f"bench{uid}")
+    await main_db.flush_users()
+
+    for name, fn in (("direct", direct_add), ("writer", writer_add)):
+        writer = main_db._writer()
+        before = dict(writer.stats)
+        errors, lats, wall = await _run(fn, args.tasks, args.writes)
+        total = len(lats)
+        ok = total - sum(errors.values())
+        print(f"[{name}] tasks={args.tasks} writes={total} ok={ok} wall={wall:.2f}s "
+              f"throughput={ok / wall if wall else 0:.0f} writes/s "
+              f"p50={_pct(lats, 50):.1f}ms p95={_pct(lats, 95):.1f}ms p99={_pct(lats, 99):.1f}ms")
+        if name == "writer":
+            batches = writer.stats["batches"] - before["batches"]
+            intents = writer.stats["intents"] - before["intents"]
+            print(f"[{name}] transactions={batches} avg-batch={intents / batches if batches else 0:.1f}")
+        if errors:
+            print(f"[{name}] errors={dict(errors)}")
+
+    diffs = await main_db.reconcile_balances()
+    print(f"ledger-diffs={len(diffs)}")
+    await close_writers()
+    await close_pools()
+    print(f"[OK] DB: {tmp}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк конкурентной записи: прямые коммиты vs писатель")
+    ap.add_argument("--tasks", type=int, default=200)
+    ap.add_argument("--writes", type=int, default=10)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# tools/export_accounts.py
+"""
+Выгрузка лотов из БД разделов (любых или всех из реестра app.db_ranks) потоково:
+строки читаются fetchmany пачками и сразу пишутся в файл — память не зависит от размера склада.
+
+  python tools/export_accounts.py                         # все разделы, только login:password
+  python tools/export_accounts.py --rank 7 --format csv
+  python tools/export_accounts.py --rank 8 --rank 6 --format jsonl --min-price 100 --max-price 500
+  python tools/export_accounts.py --rank 7 --min-id 100 --max-id 200 --mark hidden --out -
+
+Форматы: creds (только login:password, как старые скрипты), txt (id/раздел/название/цена/creds
+через таб), csv, jsonl.
+--mark STATUS — выгруженные лоты помечаются STATUS (например, hidden): каждая пачка помечается
+UPDATE ... RETURNING в своей короткой транзакции, в файл попадают ровно помеченные строки,
+лот, купленный параллельно, не выгрузится. Писателя бота транзакции не держат дольше пачки.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Callable, Iterator, Optional, TextIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db_profile import apply_profile_sync  # noqa: E402
+from app.db_ranks import RankSection, get_section, list_sections  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+EXPORT_DIR = os.path.join(ROOT, "exports")
+BATCH = 1000
+COLUMNS = ("rank", "id", "category", "button_title", "price_rub", "creds")
+
+
+def _where(section: RankSection, args) -> tuple[str, dict]:
+    """Фильтры выгрузки для раздела (именованные параметры)."""
+    clauses = ["status = :status"]
+    params: dict = {"status": args.status}
+    if section.category:
+        clauses.append("category = :section_category")
+        params["section_category"] = section.category
+    if args.category:
+        clauses.append("category = :category")
+        params["category"] = args.category
+    for opt, clause in (("min_price", "price_rub >= :min_price"), ("max_price", "price_rub <= :max_price"),
+                        ("min_id", "id >= :min_id"), ("max_id", "id <= :max_id")):
+        if getattr(args, opt) is not None:
+            clauses.append(clause)
+            params[opt] = getattr(args, opt)
+    return " AND ".join(clauses), params
+
+
+def _select(conn: sqlite3.Connection, section: RankSection, args) -> Iterator[list[sqlite3.Row]]:
+    """Пачки строк одним курсором (один read-снимок; в WAL писателей не блокирует)."""
+    where, params = _where(section, args)
+    cur = conn.execute(
+        f"SELECT id, category, button_title, price_rub, creds FROM accounts WHERE {where} ORDER BY id DESC",
+        params
+    )
+    while True:
+        rows = cur.fetchmany(args.batch)
+        if not rows:
+            return
+        yield rows
+
+
+def _claim(conn: sqlite3.Connection, section: RankSection, args) -> Iterator[list[sqlite3.Row]]:
+    """
+    Пачки с пометкой: UPDATE ... RETURNING в короткой транзакции на пачку.
+    Помеченные строки выпадают из фильтра status, поэтому следующая пачка берёт следующие.
+    """
+    where, params = _where(section, args)
+    params.update(mark=args.mark, limit=args.batch)
+    sql = (
+        f"UPDATE accounts SET status = :mark WHERE id IN "
+        f"(SELECT id FROM accounts WHERE {where} ORDER BY id DESC LIMIT :limit) "
+        f"RETURNING id, category, button_title, price_rub, creds"
+    )
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not rows:
+            return
+        # RETURNING не упорядочен — в файле пачка идёт так же, как без --mark
+        yield sorted(rows, key=lambda r: r["id"], reverse=True)
+
+
+def _row_writer(fmt: str, f: TextIO) -> Callable[[str, sqlite3.Row], None]:
+    if fmt == "creds":
+        def write(rank: str, r: sqlite3.Row) -> None:
+            creds = (r["creds"] or "").strip()
+            if creds:
+                f.write(creds + "\n")
+    elif fmt == "txt":
+        def write(rank: str, r: sqlite3.Row) -> None:
+            f.write(f'{rank}\t{r["id"]}\t{r["category"]}\t{r["button_title"]}\t{r["price_rub"]} ₽\t'
+                    f'{(r["creds"] or "").strip()}\n')
+    elif fmt == "csv":
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+
+        def write(rank: str, r: sqlite3.Row) -> None:
+            w.writerow((rank, r["id"], r["category"], r["button_title"], r["price_rub"], r["creds"]))
+    else:
+        def write(rank: str, r: sqlite3.Row) -> None:
+            f.write(json.dumps({"rank": rank, **dict(r)}, ensure_ascii=False) + "\n")
+    return write
+
+
+def export(args, out: TextIO) -> dict[str, int]:
+    """Выгрузить разделы в out. Возвращает {раздел: выгружено строк}."""
+    sections = [get_section(r) for r in args.rank] if args.rank else list_sections()
+    write = _row_writer(args.format, out)
+    counts: dict[str, int] = {}
+    for section in sections:
+        if not os.path.exists(section.db_path):
+            print(f"[WARN] {section.key}: нет БД {section.db_path}", file=sys.stderr)
+            continue
+        conn = sqlite3.connect(section.db_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            apply_profile_sync(conn)
+            batches = _claim(conn, section, args) if args.mark else _select(conn, section, args)
+            n = 0
+            for rows in batches:
+                for r in rows:
+                    write(section.key, r)
+                n += len(rows)
+                out.flush()  # помеченная пачка уже на диске до следующей
+            counts[section.key] = n
+        finally:
+            conn.close()
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Потоковая выгрузка лотов из БД разделов")
+    ap.add_argument("--rank", action="append", help="раздел из реестра (можно несколько); по умолчанию все")
+    ap.add_argument("--format", choices=("creds", "txt", "csv", "jsonl"), default="creds")
+    ap.add_argument("--status", default="available", help="какие лоты выгружать (по умолчанию available)")
+    ap.add_argument("--category")
+    ap.add_argument("--min-price", type=int)
+    ap.add_argument("--max-price", type=int)
+    ap.add_argument("--min-id", type=int)
+    ap.add_argument("--max-id", type=int)
+    ap.add_argument("--mark", help="пометить выгруженные лоты этим статусом (например, hidden)")
+    ap.add_argument("--batch", type=int, default=BATCH)
+    ap.add_argument("--out", help="файл ('-' — stdout); по умолчанию exports/accounts_<время>.<формат>")
+    args = ap.parse_args()
+    if args.mark == args.status:
+        raise SystemExit("[ERROR] --mark совпадает с --status")
+
+    out_path: Optional[str] = args.out
+    if out_path is None:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        ext = "txt" if args.format in ("creds", "txt") else args.format
+        out_path = os.path.join(EXPORT_DIR, f"accounts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}")
+
+    if out_path == "-":
+        counts = export(args, sys.stdout)
+    else:
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            counts = export(args, f)
+        print(f"[OK] Файл: {os.path.abspath(out_path)}", file=sys.stderr)
+    print(f"[OK] Выгружено: {sum(counts.values())} {counts}" + (f", помечено {args.mark}" if args.mark else ""),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# tools/fake_lolz.py
+"""
+Локальный стенд lolz API для deposit.py / app/services/lolz.py.
+
+Реализует:
+  GET  /user/payments?comment=...   — как prod-api.lzt.market (payments по комменту)
+  GET  /balance/transfer?...        — «оплата»: создаёт success_in платёж по comment/amount
+  GET  /_stats                      — счётчики вызовов (для load-теста)
+  POST /_reset                      — сбросить счётчики и платежи (кроме fixtures)
+
+Бот направляется на стенд через .env:
+  LOLZ_API_BASE_URL=http://127.0.0.1:8088
+  LOLZ_PAY_BASE_URL=http://127.0.0.1:8088/balance/transfer
+
+Запуск:
+  python tools/fake_lolz.py --port 8088 --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --fixtures fx.json
+
+Формат fixtures (JSON): {"<comment>": {"amount": "150", "status": "success_in"}, ...}
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+class FakeLolz:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        auth_error_rate: float = 0.0,
+        fixtures: dict | None = None,
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate            # доля ответов 502
+        self.auth_error_rate = auth_error_rate  # доля ответов 401
+        self.fixtures = dict(fixtures or {})
+        self.payments: dict[str, dict] = {}     # comment -> payment
+        self.calls: Counter = Counter()
+        self._rnd = random.Random(seed)
+        self._next_op = 100_000
+        self.reset()
+
+    # ---------- состояние ----------
+    def reset(self) -> None:
+        self.calls.clear()
+        self.payments.clear()
+        for comment, fx in self.fixtures.items():
+            self.add_payment(comment, fx.get("amount", "0"), status=fx.get("status", "success_in"))
+
+    def add_payment(self, comment: str, amount, *, status: str = "success_in") -> dict:
+        self._next_op += 1
+        pay = {
+            "operation_id": self._next_op,
+            "operation_date": int(time.time()),
+            "operation_type": "receiving_money",
+            "payment_status": status,
+            "sum": str(amount),
+            "incoming_sum": str(amount),
+            "comment": comment,
+        }
+        self.payments[comment] = pay
+        return pay
+
+    # ---------- поведение ----------
+    async def _delay(self) -> None:
+        ms = self.latency_ms + (self._rnd.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if ms > 0:
+            await asyncio.sleep(ms / 1000.0)
+
+    def _injected_error(self) -> web.Response | None:
+        r = self._rnd.random()
+        if r < self.auth_error_rate:
+            self.calls["payments_401"] += 1
+            return web.json_response({"errors": ["unauthorized"]}, status=401)
+        if r < self.auth_error_rate + self.error_rate:
+            self.calls["payments_502"] += 1
+            return web.json_response({"errors": ["bad gateway"]}, status=502)
+        return None
+
+    # ---------- handlers ----------
+    async def user_payments(self, request: web.Request) -> web.Response:
+        self.calls["payments"] += 1
+        await self._delay()
+        err = self._injected_error()
+        if err is not None:
+            return err
+        comment = request.query.get("comment", "")
+        pay = self.payments.get(comment)
+        payments = {str(pay["operation_id"]): pay} if pay else {}
+        return web.json_response({"payments": payments, "hasNextPage": False})
+
+    async def balance_transfer(self, request: web.Request) -> web.Response:
+        self.calls["transfer"] += 1
+        comment = request.query.get("comment", "")
+        amount = request.query.get("amount", "0")
+        if not comment:
+            return web.json_response({"errors": ["comment required"]}, status=400)
+        pay = self.add_payment(comment, amount)
+        return web.json_response({"status": "ok", "operation_id": pay["operation_id"]})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "payments": len(self.payments)})
+
+    async def reset_handler(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"status": "ok"})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/user/payments", self.user_payments)
+        app.router.add_get("/balance/transfer", self.balance_transfer)
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_post("/_reset", self.reset_handler)
+        return app
+
+
+async def start_server(fake: FakeLolz, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    """Поднять стенд в текущем event loop. Возвращает (runner, base_url); port=0 — любой свободный."""
+    runner = web.AppRunner(fake.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=4096)
+    await site.start()
+    real_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{real_port}"
+
+
+def _load_fixtures(path: str | None) -> dict:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Локальный стенд lolz API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 502 (0..1)")
+    ap.add_argument("--auth-error-rate", type=float, default=0.0, help="доля ответов 401 (0..1)")
+    ap.add_argument("--fixtures", default=None, help="JSON {comment: {amount, status}}")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    fake = FakeLolz(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        auth_error_rate=args.auth_error_rate,
+        fixtures=_load_fixtures(args.fixtures),
+        seed=args.seed,
+    )
+    print(f"[OK] fake lolz: http://{args.host}:{args.port}")
+    print(f"[OK] LOLZ_API_BASE_URL=http://{args.host}:{args.port}")
+    print(f"[OK] LOLZ_PAY_BASE_URL=http://{args.host}:{args.port}/balance/transfer")
+    web.run_app(fake.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
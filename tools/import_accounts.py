@@ -0,0 +1,75 @@
+# tools/import_accounts.py
+"""
+Массовая загрузка лотов в раздел из .txt/.csv (то же, что /importacc в боте).
+
+Строки: login:password | название | цена [| описание]  (разделитель | ; или таб)
+или CSV с заголовком: creds,title,price[,caption]
+
+  python tools/import_accounts.py lots.txt --rank 7 --title "7 rank" --price 300
+  python tools/import_accounts.py lots.csv --rank 8 --dry-run --report report.csv
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import init_db  # noqa: E402
+from app.db_pool import close_pools  # noqa: E402
+from app.db_ranks import init_sections  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+from app.services.importer import IMPORT_BATCH, import_accounts, report_csv  # noqa: E402
+
+
+async def run(args) -> dict:
+    await init_db()
+    await init_sections()
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as f:
+            return await import_accounts(
+                args.rank, f,
+                default_title=args.title,
+                default_price=args.price,
+                created_by=args.created_by,
+                dry_run=args.dry_run,
+                batch=args.batch,
+            )
+    finally:
+        await close_writers()
+        await close_pools()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Массовая загрузка лотов в раздел")
+    ap.add_argument("file")
+    ap.add_argument("--rank", required=True)
+    ap.add_argument("--title", help="название для строк без названия")
+    ap.add_argument("--price", type=int, help="цена для строк без цены")
+    ap.add_argument("--created-by", type=int, help="Telegram user_id, записывается в created_by")
+    ap.add_argument("--batch", type=int, default=IMPORT_BATCH)
+    ap.add_argument("--dry-run", action="store_true", help="только проверить строки и дубли внутри файла")
+    ap.add_argument("--report", help="CSV-отчёт по незагруженным строкам ('-' — stdout)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    res = asyncio.run(run(args))
+    print(f"[{res['status']}] rank={res['rank']} total={res['total']} added={res['added']} "
+          f"duplicates={res['duplicates']} errors={res['errors']} {time.perf_counter() - t0:.2f}s"
+          + (" (dry-run)" if args.dry_run else ""))
+    if args.report == "-":
+        sys.stdout.write(report_csv(res["report"]))
+    elif args.report:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            f.write(report_csv(res["report"]))
+    else:
+        for r in res["report"][:20]:
+            print(f"  line {r['line']}: {r['status']} — {r['message']}")
+        if len(res["report"]) > 20:
+            print(f"  ... ещё {len(res['report']) - 20} (см. --report)")
+    sys.exit(0 if res["status"] == "ok" else 1)
+
+
+if __name__ == "__main__":
+    main()
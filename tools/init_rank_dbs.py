@@ -1,32 +1,21 @@
-import sqlite3
+import os
+import sys
 from pathlib import Path
 
-SCHEMA = '''
-CREATE TABLE IF NOT EXISTS accounts (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    category TEXT,
-    button_title TEXT NOT NULL,
-    creds TEXT NOT NULL,
-    photo_file_id TEXT,
-    caption TEXT,
-    price_rub INTEGER NOT NULL,
-    status TEXT NOT NULL DEFAULT 'available',
-    created_at TEXT DEFAULT (datetime('now'))
-);
-CREATE INDEX IF NOT EXISTS idx_accounts_status ON accounts(status);
-'''
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db_ranks import init_rank_db, list_sections  # noqa: E402
+
 
 def init_db(path: Path):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(path))
-    try:
-        conn.executescript(SCHEMA)
-        conn.commit()
-    finally:
-        conn.close()
+    init_rank_db(str(path))
+
 
 if __name__ == "__main__":
-    base = Path("data")
-    init_db(base / "accounts_rank7.sqlite3")
-    init_db(base / "accounts_rank6.sqlite3")
-    print("Initialized: data/accounts_rank7.sqlite3, data/accounts_rank6.sqlite3")
+    # БД всех разделов из реестра (app.db_ranks.SECTIONS), кроме живущих в основной БД
+    done = []
+    for section in list_sections():
+        if not section.in_main_db:
+            init_rank_db(section.db_path)
+            done.append(section.db_path)
+    print("Initialized: " + ", ".join(done))
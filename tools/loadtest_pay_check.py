@@ -0,0 +1,160 @@
+# tools/loadtest_pay_check.py
+"""
+Нагрузочный тест «pay:check» против локального стенда lolz (tools/fake_lolz.py).
+
+Гоняет тысячи параллельных проверок оплаты через app.services.payments.check_payment
+на временной БД и печатает p50/p95/p99 латентности и число вызовов upstream.
+
+Примеры:
+  python tools/loadtest_pay_check.py --flows 2000 --concurrency 500 --latency-ms 80 --error-rate 0.02
+  python tools/loadtest_pay_check.py --base-url http://127.0.0.1:8088   # внешний стенд
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+def _pct(sorted_vals: list[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+async def run(args) -> None:
+    import httpx
+    from fake_lolz import FakeLolz, start_server
+
+    runner = None
+    fake = None
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        fake = FakeLolz(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            auth_error_rate=args.auth_error_rate,
+            seed=args.seed,
+        )
+        runner, base_url = await start_server(fake)
+
+    # env читается модулями при импорте — выставляем до импорта app.*
+    tmp = tempfile.mkdtemp(prefix="wtbot_load_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "db.sqlite3")
+    os.environ["RANK7_DB_PATH"] = os.path.join(tmp, "accounts_rank7.sqlite3")
+    os.environ["RANK6_DB_PATH"] = os.path.join(tmp, "accounts_rank6.sqlite3")
+    os.environ["LOLZ_API_BASE_URL"] = base_url
+    os.environ["LOLZ_PAY_BASE_URL"] = f"{base_url}/balance/transfer"
+    os.environ.setdefault("LOLZ_API_TOKEN", "loadtest")
+
+    from app.db import init_db, ensure_user, create_payment_unique, get_balance_rub
+    from app.db_pool import close_pools
+    from app.db_writer import close_writers
+    from app.services import payments
+
+    await init_db()
+
+    # ---- подготовка: пользователи + pending-платежи; часть «оплачиваем» на стенде ----
+    flows: list[tuple[int, str, int, bool]] = []
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        for i in range(args.flows):
+            uid = 10_000 + i
+            amount = 100 + (i % 50)
+            paid = (i % 100) < int(args.paid_ratio * 100)
+            await ensure_user(uid, f"load{i}")
+            _, comment = await create_payment_unique(uid, "lolz", amount, "pending",
+                                                     make_comment=lambda i=i: f"{90000000000000 + i}")
+            if paid:
+                if fake is not None:
+                    fake.add_payment(comment, amount)
+                else:
+                    await client.get(f"{base_url}/balance/transfer", params={"comment": comment, "amount": amount})
+            flows.append((uid, comment, amount, paid))
+        if fake is None:
+            await client.post(f"{base_url}/_reset")
+    if fake is not None:
+        fake.calls.clear()
+
+    # ---- нагрузка ----
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+
+    async def one(uid: int, comment: str) -> None:
+        async with sem:
+            for _ in range(args.checks_per_flow):
+                t0 = time.perf_counter()
+                try:
+                    res = await payments.check_payment(uid, comment)
+                    statuses[res["status"]] += 1
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one(uid, c) for uid, c, _, _ in flows))
+    wall = time.perf_counter() - t_start
+
+    # ---- upstream-счётчики ----
+    if fake is not None:
+        calls = dict(fake.calls)
+    else:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            calls = (await client.get(f"{base_url}/_stats")).json().get("calls", {})
+
+    # ---- сверка: каждый оплаченный счёт зачислен ровно один раз ----
+    over, under = 0, 0
+    for uid, _, amount, paid in flows:
+        bal = await get_balance_rub(uid)
+        expected = amount if paid else 0
+        if bal > expected:
+            over += 1
+        elif bal < expected and statuses.get("unavailable", 0) == 0:
+            under += 1
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"flows={args.flows} checks={total} concurrency={args.concurrency} wall={wall:.2f}s "
+          f"rps={total / wall if wall else 0:.0f}")
+    print(f"latency ms: p50={_pct(latencies, 50):.1f} p95={_pct(latencies, 95):.1f} "
+          f"p99={_pct(latencies, 99):.1f} max={latencies[-1] if latencies else 0:.1f}")
+    print(f"statuses: {dict(statuses)}")
+    if errors:
+        print(f"exceptions: {dict(errors)}")
+    print(f"upstream calls: {calls} (на проверку: {calls.get('payments', 0) / total if total else 0:.2f})")
+    print(f"balances: over-credited={over} under-credited={under}")
+    print(f"DB: {os.environ['DB_PATH']}")
+
+    await close_writers()
+    await close_pools()
+    if runner is not None:
+        await runner.cleanup()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-тест pay:check против fake lolz")
+    ap.add_argument("--flows", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=500)
+    ap.add_argument("--checks-per-flow", type=int, default=1, help="сколько раз юзер жмёт «Проверить оплату»")
+    ap.add_argument("--paid-ratio", type=float, default=0.5)
+    ap.add_argument("--base-url", default=None, help="внешний стенд; по умолчанию поднимаем свой")
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--auth-error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
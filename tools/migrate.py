@@ -0,0 +1,52 @@
+# tools/migrate.py
+"""
+Версии схем всех БД бота (PRAGMA user_version) и применение недостающих миграций.
+Бот мигрирует БД сам при старте; скрипт — для проверки/подготовки без запуска бота.
+
+  python tools/migrate.py            # применить миграции
+  python tools/migrate.py --status   # только показать версии
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import db as main_db, db_broadcast, fsm_storage  # noqa: E402
+from app.db_migrate import migrate  # noqa: E402
+from app.db_ranks import RANK_MIGRATIONS, list_sections  # noqa: E402
+
+
+def _targets() -> list[tuple[str, str, list]]:
+    targets = [("main", main_db.DB_PATH, main_db.MIGRATIONS)]
+    targets += [(f"rank:{s.key}", s.db_path, RANK_MIGRATIONS) for s in list_sections() if not s.in_main_db]
+    targets.append(("broadcast", db_broadcast.DB_PATH, db_broadcast.MIGRATIONS))
+    targets.append(("fsm", fsm_storage.DB_PATH, fsm_storage.MIGRATIONS))
+    return targets
+
+
+def _version(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Миграции схем БД (PRAGMA user_version)")
+    ap.add_argument("--status", action="store_true", help="только показать версии, ничего не менять")
+    args = ap.parse_args()
+
+    for name, path, migrations in _targets():
+        before = _version(path)
+        after = before if args.status else migrate(path, migrations, name=name)
+        state = "ok" if after == len(migrations) else "pending"
+        print(f"{name:<12} v{before} -> v{after} / v{len(migrations)} [{state}] {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# tools/reconcile_balances.py
+"""
+Сверка balance_ledger с users.balance_rub (одним запросом).
+Код выхода 1, если есть расхождения — удобно для cron.
+
+  python tools/reconcile_balances.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import DB_PATH, reconcile_balances  # noqa: E402
+from app.db_pool import close_pools  # noqa: E402
+from app.db_writer import close_writers  # noqa: E402
+
+
+async def _reconcile() -> list[dict]:
+    try:
+        return await reconcile_balances()
+    finally:
+        await close_writers()
+        await close_pools()
+
+
+def main():
+    if not os.path.exists(DB_PATH):
+        raise SystemExit(f"[ERROR] База не найдена: {DB_PATH}")
+    diffs = asyncio.run(_reconcile())
+    if not diffs:
+        print(f"[OK] Леджер сходится с балансами. DB: {DB_PATH}")
+        return
+    for d in diffs:
+        print(f"[DIFF] user_id={d['user_id']} balance={d['balance_rub']} ledger={d['ledger_rub']}")
+    print(f"[ERROR] Расхождений: {len(diffs)}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()